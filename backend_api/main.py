@@ -1,8 +1,25 @@
-from fastapi import FastAPI
+import json
+
+from fastapi import FastAPI, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
-from controller.gui_api import chat_api, ingest_api, dashboard_api
+from controller.gui_api import (
+    chat_api,
+    chat_async_api,
+    chat_stream_api,
+    retrieve_batch_api,
+    ingest_api,
+    ingest_status_api,
+    ingest_cancel_api,
+    ingest_jobs_api,
+    dashboard_api,
+    metrics_api,
+    startup_api,
+    shutdown_api,
+)
 
 app = FastAPI(
     title="RAG AI Assistant API",
@@ -17,6 +34,37 @@ class ChatRequest(BaseModel):
     top_k: Optional[int] = 3
 
 
+class BatchRetrieveRequest(BaseModel):
+    queries: List[str]
+    top_k: Optional[int] = 5
+
+
+class IngestRequest(BaseModel):
+    incremental: Optional[bool] = True
+    # Required for a run that removes all / most indexed documents
+    allow_remove_all: Optional[bool] = False
+
+
+# ---------- Helpers ----------
+
+def _sse(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+async def _sse_stream(events):
+    """
+    Relay generation events as SSE. If the client disconnects, Starlette
+    cancels this generator, which closes the upstream Ollama request.
+    """
+    try:
+        async for event in events:
+            yield _sse(event)
+    except Exception as e:
+        yield _sse({"type": "error", "message": str(e)})
+    finally:
+        await events.aclose()
+
+
 # ---------- API Endpoints ----------
 
 @app.post("/chat")
@@ -27,12 +75,76 @@ def chat_endpoint(req: ChatRequest):
     return chat_api(req.query, req.top_k)
 
 
+@app.post("/chat/async")
+async def chat_async_endpoint(req: ChatRequest):
+    """
+    Homepage chatbot API (async; waits on Ollama without a worker thread)
+    """
+    return await chat_async_api(req.query, req.top_k)
+
+
+@app.post("/chat/stream")
+async def chat_stream_endpoint(req: ChatRequest):
+    """
+    Homepage chatbot API, streamed as Server-Sent Events
+    (token events, then one done event with citations and metrics)
+    """
+    return StreamingResponse(
+        _sse_stream(chat_stream_api(req.query, req.top_k)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/retrieve/batch")
+def retrieve_batch_endpoint(req: BatchRetrieveRequest):
+    """
+    Batched retrieval API (evaluation / batch QA), results in input order
+    """
+    return retrieve_batch_api(req.queries, req.top_k)
+
+
 @app.post("/ingest")
-def ingest_endpoint():
+def ingest_endpoint(req: Optional[IngestRequest] = None):
+    """
+    Document ingestion & indexing API: starts a background job and returns
+    it at once (202). If a job is already queued or running, that job is
+    returned with 409 instead of starting a second one.
+    """
+    incremental = req.incremental if req is not None else True
+    allow_remove_all = bool(req.allow_remove_all) if req is not None else False
+    job, created = ingest_api(incremental, allow_remove_all)
+    return JSONResponse(jsonable_encoder(job), status_code=202 if created else 409)
+
+
+@app.get("/ingest/jobs")
+def ingest_jobs_endpoint():
+    """
+    Recent ingest jobs, newest first
+    """
+    return ingest_jobs_api()
+
+
+@app.get("/ingest/{job_id}")
+def ingest_status_endpoint(job_id: str):
+    """
+    Ingest job status: state, per-stage progress, ETA, result or error
     """
-    Document ingestion & indexing API
+    job = ingest_status_api(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown ingest job {job_id}")
+    return job
+
+
+@app.post("/ingest/{job_id}/cancel")
+def ingest_cancel_endpoint(job_id: str):
+    """
+    Cancel an ingest job; checkpoints it already committed are kept
     """
-    return ingest_api()
+    job = ingest_cancel_api(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown ingest job {job_id}")
+    return job
 
 
 @app.get("/dashboard")
@@ -41,3 +153,21 @@ def dashboard_endpoint():
     Analytics dashboard API
     """
     return dashboard_api()
+
+
+@app.get("/metrics")
+def metrics_endpoint():
+    """
+    Prometheus scrape endpoint (text exposition format)
+    """
+    return PlainTextResponse(metrics_api(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.on_event("startup")
+def startup_event():
+    startup_api()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await shutdown_api()
@@ -0,0 +1,139 @@
+# backend_api/test_chat_stream.py
+#
+# POST /chat/stream through FastAPI's TestClient, on a small flat index with
+# the SQLite backend, a stub embedding model and a local fake Ollama server
+# (no models or Ollama needed): the response is an SSE stream of token
+# events followed by exactly one done event whose answer is the tokens
+# joined; an upstream failure ends the stream with an error event.
+
+import json
+import os
+import tempfile
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+
+tmp_dir = tempfile.TemporaryDirectory()
+tmp = Path(tmp_dir.name)
+os.chdir(tmp)                   # the controller opens data/vector_index
+os.environ["METADATA_BACKEND"] = "sqlite"
+os.environ["SQLITE_PATH"] = str(tmp / "metadata.db")
+os.environ["EMBED_MODEL"] = "stub-embedding"
+os.environ["RETRIEVAL_MODE"] = "dense"
+os.environ["MODEL_PRELOAD"] = "0"
+
+from fastapi.testclient import TestClient
+
+from database.metadata_backend import open_metadata_store
+from generation.rag_generator import RAGGenerator
+from indexing.model_registry import embedding_backend, registry
+from indexing.vector_indexer import VectorIndexer
+
+DIM = 64
+N_TOKENS = 5
+
+
+class StubEmbeddingModel:
+    """
+    Hashed bag of words, normalized: texts sharing words are similar.
+    """
+
+    def encode(self, texts, batch_size=None, normalize_embeddings=True, **kwargs):
+        single = isinstance(texts, str)
+        vectors = np.zeros((1 if single else len(texts), DIM), dtype=np.float32)
+        for row, text in zip(vectors, [texts] if single else texts):
+            for word in text.lower().split():
+                row[zlib.crc32(word.encode()) % DIM] += 1
+            row /= max(np.linalg.norm(row), 1e-6)
+        return vectors[0] if single else vectors
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    status = 200
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        lines = [{"message": {"content": f"t{i} "}, "done": False} for i in range(N_TOKENS)]
+        lines.append({"message": {"content": ""}, "done": True})
+        body = "".join(json.dumps(line) + "\n" for line in lines).encode()
+        self.send_response(self.status)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+model = registry.get("embedding", "stub-embedding", lambda name: StubEmbeddingModel(), variant=embedding_backend())
+
+texts = [f"grid loss reduction measure {i}" for i in range(6)]
+indexer = VectorIndexer(index_dir=Path("data/vector_index"), index_type="flat")
+indexer.add(model.encode(texts), ids=list(range(len(texts))))
+indexer.save()
+db = open_metadata_store()
+db.insert_chunk_metadata_batch(
+    {
+        "chunk_id": f"grid_{vid}",
+        "vector_id": vid,
+        "document_name": "grid",
+        "page_or_section": None,
+        "chunk_text": text,
+    }
+    for vid, text in enumerate(texts)
+)
+db.close()
+
+server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOllamaHandler)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+
+from backend_api.main import app
+from controller import gui_api
+
+gui_api._controller.generator = RAGGenerator(
+    ollama_url=f"http://127.0.0.1:{server.server_port}/api/chat", retries=0
+)
+client = TestClient(app)
+
+
+def sse_events(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n"))
+        data = json.loads(fields["data"])
+        assert fields["event"] == data["type"], block
+        events.append(data)
+    return events
+
+
+resp = client.post("/chat/stream", json={"query": "grid loss reduction", "top_k": 2})
+assert resp.status_code == 200
+assert resp.headers["content-type"].startswith("text/event-stream")
+events = sse_events(resp.text)
+print([e["type"] for e in events])
+
+assert [e["type"] for e in events] == ["token"] * N_TOKENS + ["done"]
+done = events[-1]
+assert done["answer"] == "".join(e["content"] for e in events[:-1]).strip()
+assert len(done["citations"]) == 2
+assert all(c["document_name"] == "grid" for c in done["citations"])
+assert done["metrics"]["time_to_first_token_ms"] is not None
+assert done["metrics"]["n_chunks_used"] == 2
+
+# Upstream error: no done event, one error event
+FakeOllamaHandler.status = 500
+events = sse_events(client.post("/chat/stream", json={"query": "grid loss", "top_k": 2}).text)
+print(events)
+assert [e["type"] for e in events] == ["error"]
+
+server.shutdown()
+gui_api._controller.close()
+os.chdir("/")
+tmp_dir.cleanup()
+
+print("OK")
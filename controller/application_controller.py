@@ -1,13 +1,36 @@
 # controller/application_controller.py
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, AsyncIterator, Callable, Optional, Tuple
 from pathlib import Path
+import asyncio
+import os
+import threading
 import time
 
+import numpy as np
+
 from indexing.indexing_pipeline import run_indexing_pipeline
+from indexing.metrics import (
+    REGISTRY,
+    REQUEST_LATENCY,
+    Trace,
+    atraced_iter,
+    cache_metrics,
+    latency_summary,
+    stage_timer,
+    tracing,
+)
+from indexing.model_registry import (
+    get_cross_encoder,
+    get_embedding_cache,
+    get_embedding_model,
+    registry,
+)
 from retrieval.retrieval_engine import RetrievalEngine
+from retrieval.reranker import CrossEncoderReranker
 from generation.rag_generator import RAGGenerator
-from database.metadata_store import MetadataStore
+from generation.semantic_cache import SemanticCache
+from controller.ingest_jobs import IngestJob, IngestJobManager
 
 
 class ApplicationController:
@@ -19,7 +42,154 @@ class ApplicationController:
     def __init__(self):
         self.retrieval_engine = RetrievalEngine()
         self.generator = RAGGenerator()
-        self.db = MetadataStore()
+
+        # Share the retrieval engine's connection pool
+        self.db = self.retrieval_engine.db
+
+        # Optional cross-encoder reranking (RERANK_ENABLED=1): retrieve
+        # top_k * RERANK_CANDIDATES chunks, keep the best top_k
+        self.reranker = None
+        self.rerank_candidates = int(os.getenv("RERANK_CANDIDATES", 4))
+        if os.getenv("RERANK_ENABLED", "0") == "1":
+            self.reranker = CrossEncoderReranker()
+
+        # Optional semantic answer cache (ANSWER_CACHE_ENABLED=1)
+        self.answer_cache = None
+        if os.getenv("ANSWER_CACHE_ENABLED", "0") == "1":
+            self.answer_cache = SemanticCache(
+                threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", 0.92)),
+                maxsize=int(os.getenv("ANSWER_CACHE_SIZE", 512)),
+            )
+        # Index version the cached answers were generated on
+        self._answer_cache_version = self.retrieval_engine.indexer.version
+
+        # Background ingest jobs (one writer at a time)
+        self.ingest_jobs = IngestJobManager(self._run_ingest_job)
+
+        # Per-request stage spans in metrics["trace"] (TRACE_REQUESTS=1);
+        # stage histograms are always recorded
+        self.trace_requests = os.getenv("TRACE_REQUESTS", "0") == "1"
+        for metric in cache_metrics(self._caches):
+            REGISTRY.register(metric)
+
+    def preload_models(self) -> Dict[str, Any]:
+        """
+        Load and warm up the models now rather than on the first request.
+        """
+        embedder = self.retrieval_engine.embedder
+        get_embedding_model(embedder.model_name, embedder.backend)
+        if self.reranker is not None:
+            get_cross_encoder(self.reranker.model_name)
+        return registry.stats()
+
+    # --------------------------------------------------
+    # Request metrics
+    # --------------------------------------------------
+    def _new_trace(self) -> Optional[Trace]:
+        return Trace() if self.trace_requests else None
+
+    @staticmethod
+    def _finish_request(endpoint: str, t0: float, metrics: Dict[str, Any], trace: Optional[Trace]):
+        elapsed = time.perf_counter() - t0
+        REQUEST_LATENCY.observe(elapsed, endpoint)
+        metrics["controller_total_ms"] = round(elapsed * 1000, 2)
+        if trace is not None:
+            metrics["trace"] = trace.spans
+
+    def _caches(self) -> Dict[str, Any]:
+        embedder = self.retrieval_engine.embedder
+        # Only report the chunk embedding cache once ingestion opened it
+        embedding_cache = None
+        if registry.is_loaded("embedding_cache", embedder.model_name, embedder.backend):
+            embedding_cache = get_embedding_cache(embedder.model_name, embedder.backend)
+        return {
+            "query_embedding": embedder.query_cache,
+            "chunk": self.retrieval_engine.chunk_cache,
+            "answer": self.answer_cache,
+            "chunk_embedding": embedding_cache,
+        }
+
+    # --------------------------------------------------
+    # 0. SEMANTIC ANSWER CACHE
+    # --------------------------------------------------
+    def _cached_answer(
+        self, query: str, top_k: int
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[np.ndarray]]:
+        """
+        Look the query up in the answer cache.
+        Returns (cached result or None, query embedding or None).
+        """
+        if self.answer_cache is None:
+            return None, None
+
+        # Answers cite vector ids of the index version they were generated
+        # on; drop them once any process (CLI, another worker) publishes a
+        # new version
+        self.retrieval_engine.maybe_reload()
+        version = self.retrieval_engine.indexer.version
+        if version != self._answer_cache_version:
+            self.answer_cache.clear()
+            self._answer_cache_version = version
+
+        # Reused by retrieval on a miss, so the query is embedded once
+        with stage_timer("query_embedding"):
+            embedding = self.retrieval_engine.embedder.embed_query(query)
+
+        hit = self.answer_cache.lookup(embedding, top_k)
+        if hit is None:
+            return None, embedding
+
+        result, similarity = hit
+        result["metrics"] = {
+            "cache_hit": True,
+            "cache_similarity": round(similarity, 4),
+            "n_chunks_used": len(result["citations"]),
+            "answer_chars": len(result["answer"]),
+        }
+        return result, embedding
+
+    def _store_answer(self, embedding: Optional[np.ndarray], top_k: int, result: Dict[str, Any]):
+        result["metrics"]["cache_hit"] = False
+        if self.answer_cache is None or embedding is None or not result["answer"]:
+            return
+        # Not if the index was swapped while this answer was generated
+        if self.retrieval_engine.indexer.version != self._answer_cache_version:
+            return
+        self.answer_cache.put(
+            embedding, top_k, {k: v for k, v in result.items() if k != "type"}
+        )
+
+    # --------------------------------------------------
+    # Retrieval (+ optional reranking)
+    # --------------------------------------------------
+    def _retrieve(
+        self, query: str, top_k: int, embedding: Optional[np.ndarray] = None
+    ) -> Tuple[List[Dict], Dict[str, Any]]:
+        """
+        Returns (chunks for the prompt, retrieval/rerank metrics).
+        embedding is the query embedding if the answer cache already computed it.
+        """
+        t0 = time.perf_counter()
+
+        if self.reranker is None:
+            chunks = self.retrieval_engine.retrieve(query, top_k=top_k, query_embedding=embedding)
+            return chunks, {"retrieval_ms": round((time.perf_counter() - t0) * 1000, 2)}
+
+        candidates = self.retrieval_engine.retrieve(
+            query, top_k=top_k * self.rerank_candidates, query_embedding=embedding
+        )
+        t1 = time.perf_counter()
+        with stage_timer("rerank"):
+            chunks, metrics = self.reranker.rerank(query, candidates, top_n=top_k)
+        metrics["retrieval_ms"] = round((t1 - t0) * 1000, 2)
+        return chunks, metrics
+
+    @staticmethod
+    def _cached_events(result: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return [
+            {"type": "token", "content": result["answer"]},
+            {"type": "done", **result},
+        ]
 
     # --------------------------------------------------
     # 1. CHAT / QUERY FLOW (Homepage)
@@ -29,36 +199,176 @@ class ApplicationController:
         Handle a user query end-to-end.
         """
         t0 = time.perf_counter()
+        trace = self._new_trace()
 
-        # Retrieve relevant chunks
-        chunks = self.retrieval_engine.retrieve(query, top_k=top_k)
+        with tracing(trace):
+            cached, embedding = self._cached_answer(query, top_k)
+            if cached is not None:
+                self._finish_request("answer", t0, cached["metrics"], trace)
+                return cached
 
-        # Generate answer
-        result = self.generator.generate(query, chunks)
+            # Retrieve relevant chunks
+            chunks, retrieval_metrics = self._retrieve(query, top_k, embedding)
 
-        t1 = time.perf_counter()
+            # Generate answer
+            result = self.generator.generate(query, chunks)
 
-        result["metrics"]["controller_total_ms"] = round((t1 - t0) * 1000, 2)
+        result["metrics"].update(retrieval_metrics)
+        self._finish_request("answer", t0, result["metrics"], trace)
+        self._store_answer(embedding, top_k, result)
 
         return result
 
+    async def aanswer_query(self, query: str, top_k: int = 3) -> Dict[str, Any]:
+        """
+        Async variant of answer_query. Retrieval runs in a worker thread,
+        generation awaits Ollama on the shared connection pool.
+        """
+        t0 = time.perf_counter()
+        trace = self._new_trace()
+
+        # Worker threads run in a copy of this context, so they see the trace
+        with tracing(trace):
+            cached, embedding = await asyncio.to_thread(self._cached_answer, query, top_k)
+            if cached is not None:
+                self._finish_request("answer", t0, cached["metrics"], trace)
+                return cached
+
+            chunks, retrieval_metrics = await asyncio.to_thread(self._retrieve, query, top_k, embedding)
+
+            result = await self.generator.agenerate(query, chunks)
+
+        result["metrics"].update(retrieval_metrics)
+        self._finish_request("answer", t0, result["metrics"], trace)
+        self._store_answer(embedding, top_k, result)
+
+        return result
+
+    async def aanswer_query_stream(self, query: str, top_k: int = 3) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of aanswer_query: yields token events,
+        then a final "done" event with citations and metrics.
+        """
+        t0 = time.perf_counter()
+        trace = self._new_trace()
+
+        with tracing(trace):
+            cached, embedding = await asyncio.to_thread(self._cached_answer, query, top_k)
+            if cached is None:
+                chunks, retrieval_metrics = await asyncio.to_thread(self._retrieve, query, top_k, embedding)
+
+        if cached is not None:
+            self._finish_request("answer_stream", t0, cached["metrics"], trace)
+            for event in self._cached_events(cached):
+                yield event
+            return
+
+        events = self.generator.agenerate_stream(query, chunks)
+        async for event in atraced_iter(events, trace):
+            if event["type"] == "done":
+                event["metrics"].update(retrieval_metrics)
+                self._finish_request("answer_stream", t0, event["metrics"], trace)
+                self._store_answer(embedding, top_k, event)
+            yield event
+
+    def retrieve_batch(self, queries: List[str], top_k: int = 5) -> Dict[str, Any]:
+        """
+        Batch retrieval (no generation) for evaluation / batch-QA jobs.
+        """
+        t0 = time.perf_counter()
+
+        results = self.retrieval_engine.retrieve_many(queries, top_k=top_k)
+
+        t1 = time.perf_counter()
+        REQUEST_LATENCY.observe(t1 - t0, "retrieve_batch")
+
+        return {
+            "results": [
+                {"query": q, "chunks": chunks} for q, chunks in zip(queries, results)
+            ],
+            "metrics": {
+                "n_queries": len(queries),
+                "total_ms": round((t1 - t0) * 1000, 2),
+            },
+        }
+
     # --------------------------------------------------
     # 2. DOCUMENT INGESTION FLOW
     # --------------------------------------------------
-    def ingest_documents(self) -> Dict[str, Any]:
+    def ingest_documents(
+        self,
+        incremental: bool = True,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+        cancel_event: Optional[threading.Event] = None,
+        allow_remove_all: bool = False,
+    ) -> Dict[str, Any]:
         """
         Trigger indexing pipeline and return ingestion stats.
+        Runs in the calling thread; see start_ingest for the background job.
+        allow_remove_all lets a run drop all / most indexed documents.
         """
         t0 = time.perf_counter()
 
-        stats = run_indexing_pipeline()
+        try:
+            stats = run_indexing_pipeline(
+                incremental=incremental,
+                progress=progress,
+                cancel_event=cancel_event,
+                allow_remove_all=allow_remove_all,
+            )
+        except Exception:
+            # Cancelled or failed: checkpoints committed before that are live
+            indexer = self.retrieval_engine.indexer
+            self._after_ingest(changed=indexer.saved_version() != indexer.version)
+            raise
 
         t1 = time.perf_counter()
 
         stats["total_ingestion_time_ms"] = round((t1 - t0) * 1000, 2)
 
+        self._after_ingest(changed=bool(stats["vectors_added"] or stats["vectors_removed"]))
+
         return stats
 
+    def _after_ingest(self, changed: bool):
+        # Serve the new index version right away (other workers pick it up
+        # on their next request)
+        self.retrieval_engine.reload_index()
+
+        # Cached rows and answers may cite chunks that changed or no longer exist
+        if changed:
+            self.retrieval_engine.invalidate_chunk_cache()
+            if self.answer_cache is not None:
+                self.answer_cache.clear()
+
+    def _run_ingest_job(self, job: IngestJob) -> Dict[str, Any]:
+        return self.ingest_documents(
+            incremental=job.params.get("incremental", True),
+            progress=job.update_progress,
+            cancel_event=job.cancel_event,
+            allow_remove_all=job.params.get("allow_remove_all", False),
+        )
+
+    def start_ingest(
+        self, incremental: bool = True, allow_remove_all: bool = False
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        Start ingestion as a background job. Returns (job, created); if a
+        job is already queued or running, that one is returned instead.
+        """
+        job, created = self.ingest_jobs.submit(
+            incremental=incremental, allow_remove_all=allow_remove_all
+        )
+        return job.as_dict(), created
+
+    def get_ingest_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self.ingest_jobs.get(job_id)
+        return job.as_dict() if job is not None else None
+
+    def cancel_ingest_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self.ingest_jobs.cancel(job_id)
+        return job.as_dict() if job is not None else None
+
     # --------------------------------------------------
     # 3. DASHBOARD / ANALYTICS
     # --------------------------------------------------
@@ -66,22 +376,30 @@ class ApplicationController:
         """
         Collect system-level metrics for dashboard.
         """
-        cursor = self.db.cursor
-
-        cursor.execute("SELECT COUNT(DISTINCT document_name) AS docs FROM document_chunks")
-        docs = cursor.fetchone()["docs"]
-
-        cursor.execute("SELECT COUNT(*) AS chunks FROM document_chunks")
-        chunks = cursor.fetchone()["chunks"]
-
-        cursor.execute("SELECT COUNT(DISTINCT vector_id) AS vectors FROM document_chunks")
-        vectors = cursor.fetchone()["vectors"]
+        stats = self.db.get_system_stats()
+        embedder = self.retrieval_engine.embedder
+        stats["query_embedding_cache"] = embedder.query_cache.stats()
+        stats["chunk_cache"] = self.retrieval_engine.chunk_cache.stats()
+        if self.retrieval_engine.bm25 is not None:
+            stats["bm25_index"] = self.retrieval_engine.bm25.stats()
+        if embedder.batcher is not None:
+            stats["embedding_batcher"] = embedder.batcher.stats()
+        if self.answer_cache is not None:
+            stats["answer_cache"] = self.answer_cache.stats()
+        stats["models"] = registry.stats()
+        stats["latency"] = latency_summary()
+        active = self.ingest_jobs.active()
+        stats["ingest_job"] = active.as_dict() if active is not None else None
+        return stats
 
-        return {
-            "documents": docs,
-            "chunks": chunks,
-            "vectors": vectors,
-        }
+    def metrics_text(self) -> str:
+        """
+        All metrics in the Prometheus text format (for GET /metrics).
+        """
+        return REGISTRY.render()
 
     def close(self):
         self.db.close()
+
+    async def aclose(self):
+        await self.generator.aclose()
@@ -1,9 +1,25 @@
+import os
+
 from controller.application_controller import ApplicationController
 
-# Create ONE shared controller instance
+# Create ONE shared controller instance (models load on first use, or at
+# server startup via startup_api)
 _controller = ApplicationController()
 
 
+def startup_api():
+    """
+    Preload and warm up the models on server startup (MODEL_PRELOAD=1).
+    """
+    if os.getenv("MODEL_PRELOAD", "1") == "1":
+        stats = _controller.preload_models()
+        for model in stats["models"]:
+            print(
+                f"Loaded {model['kind']} model {model['name']} {model['variant']} in {model['load_s']}s "
+                f"(warmup {model['warmup_s']}s, +{model['rss_delta_mb']} MB RSS)"
+            )
+
+
 def chat_api(query: str, top_k: int = 3):
     """
     Called by the Chat UI.
@@ -11,11 +27,54 @@ def chat_api(query: str, top_k: int = 3):
     return _controller.answer_query(query, top_k)
 
 
-def ingest_api():
+async def chat_async_api(query: str, top_k: int = 3):
     """
-    Called by the Document Ingestion UI.
+    Called by the Chat UI (async, does not hold a worker thread).
     """
-    return _controller.ingest_documents()
+    return await _controller.aanswer_query(query, top_k)
+
+
+def chat_stream_api(query: str, top_k: int = 3):
+    """
+    Called by the Chat UI for token streaming.
+    """
+    return _controller.aanswer_query_stream(query, top_k)
+
+
+def retrieve_batch_api(queries, top_k: int = 5):
+    """
+    Called by batch evaluation / QA tooling.
+    """
+    return _controller.retrieve_batch(queries, top_k)
+
+
+def ingest_api(incremental: bool = True, allow_remove_all: bool = False):
+    """
+    Called by the Document Ingestion UI: starts a background ingest job.
+    Returns (job, created); created is False if a job was already active.
+    """
+    return _controller.start_ingest(incremental, allow_remove_all)
+
+
+def ingest_status_api(job_id: str):
+    """
+    Polled by the Document Ingestion UI (None if the job is unknown).
+    """
+    return _controller.get_ingest_job(job_id)
+
+
+def ingest_cancel_api(job_id: str):
+    """
+    Called by the Document Ingestion UI to stop a running job.
+    """
+    return _controller.cancel_ingest_job(job_id)
+
+
+def ingest_jobs_api():
+    """
+    Recent ingest jobs, newest first.
+    """
+    return _controller.ingest_jobs.list()
 
 
 def dashboard_api():
@@ -23,3 +82,17 @@ def dashboard_api():
     Called by the Analysis Dashboard UI.
     """
     return _controller.get_system_stats()
+
+
+def metrics_api():
+    """
+    Scraped by Prometheus: latency histograms, ingest and cache metrics.
+    """
+    return _controller.metrics_text()
+
+
+async def shutdown_api():
+    """
+    Release pooled HTTP connections on server shutdown.
+    """
+    await _controller.aclose()
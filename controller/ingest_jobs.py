@@ -0,0 +1,153 @@
+# controller/ingest_jobs.py
+
+import itertools
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from indexing.stream_pipeline import PipelineCancelled
+
+# Job states: queued -> running -> succeeded | failed | cancelled
+ACTIVE_STATES = ("queued", "running")
+
+
+class IngestJob:
+    """
+    One background ingest run: state, live progress, and the result or
+    error when it ends.
+    """
+
+    def __init__(self, job_id: str, params: Dict[str, Any]):
+        self.job_id = job_id
+        self.params = params
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.progress: Dict[str, Any] = {}
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.cancel_event = threading.Event()
+
+    def update_progress(self, progress: Dict[str, Any]):
+        # Replaced wholesale, so readers never see a half-updated dict
+        self.progress = progress
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "params": self.params,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "cancel_requested": self.cancel_event.is_set(),
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class IngestJobManager:
+    """
+    Runs ingest jobs in a background thread, one at a time.
+
+    submit() returns at once. While a job is queued or running, submitting
+    again returns that job instead of starting a second writer. The last
+    max_finished finished jobs are kept for status queries.
+
+    run_job(job) does the work; it should pass job.update_progress and
+    job.cancel_event down to the pipeline and return its stats.
+    """
+
+    def __init__(self, run_job: Callable[[IngestJob], Dict[str, Any]], max_finished: int = 20):
+        self.run_job = run_job
+        self.max_finished = max_finished
+
+        self._jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+        self._active: Optional[IngestJob] = None
+        self._lock = threading.Lock()
+        self._counter = itertools.count(1)
+
+    def submit(self, **params) -> Tuple[IngestJob, bool]:
+        """
+        Returns (job, created); created is False if an active job was returned.
+        """
+        with self._lock:
+            if self._active is not None:
+                return self._active, False
+
+            job = IngestJob(f"ingest-{next(self._counter)}-{uuid.uuid4().hex[:8]}", params)
+            self._jobs[job.job_id] = job
+            self._active = job
+            self._prune()
+
+        threading.Thread(target=self._run, args=(job,), name=job.job_id, daemon=True).start()
+        return job, True
+
+    def _run(self, job: IngestJob):
+        if job.cancel_event.is_set():
+            self._finish(job, "cancelled")
+            return
+
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            job.result = self.run_job(job)
+            self._finish(job, "succeeded")
+        except PipelineCancelled:
+            self._finish(job, "cancelled")
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            traceback.print_exc()
+            self._finish(job, "failed")
+
+    def _finish(self, job: IngestJob, status: str):
+        with self._lock:
+            job.status = status
+            job.finished_at = time.time()
+            if self._active is job:
+                self._active = None
+
+    def _prune(self):
+        finished = [j for j in self._jobs.values() if j.status not in ACTIVE_STATES]
+        for job in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job.job_id]
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[IngestJob]:
+        """
+        Request cancellation; the job stops at the next progress poll and
+        keeps the checkpoints it already committed.
+        """
+        job = self.get(job_id)
+        if job is not None and job.status in ACTIVE_STATES:
+            job.cancel_event.set()
+        return job
+
+    def active(self) -> Optional[IngestJob]:
+        return self._active
+
+    def list(self) -> List[Dict[str, Any]]:
+        # Snapshot under the lock: submit() adds and prunes entries
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job.as_dict() for job in reversed(jobs)]
+
+    def wait(self, job_id: str, timeout: Optional[float] = None, poll_s: float = 0.1) -> Optional[IngestJob]:
+        """
+        Block until the job has finished (for scripts and tests).
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        job = self.get(job_id)
+        while job is not None and job.status in ACTIVE_STATES:
+            if deadline is not None and time.monotonic() > deadline:
+                break
+            time.sleep(poll_s)
+        return job
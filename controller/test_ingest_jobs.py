@@ -0,0 +1,53 @@
+# controller/test_ingest_jobs.py
+#
+# IngestJobManager with a fake run_job: submit returns at once, a second
+# submit while one is active returns the same job, cancellation and
+# failures end the job in the right state.
+
+import time
+
+from controller.ingest_jobs import IngestJobManager
+from indexing.stream_pipeline import PipelineCancelled
+
+
+def fake_ingest(job):
+    if job.params.get("fail"):
+        raise ValueError("bad document")
+    for step in range(50):
+        if job.cancel_event.is_set():
+            raise PipelineCancelled("pipeline cancelled")
+        job.update_progress({"files_done": step + 1, "files_total": 50})
+        time.sleep(0.01)
+    return {"documents_indexed": 50}
+
+
+manager = IngestJobManager(fake_ingest)
+
+t0 = time.perf_counter()
+job, created = manager.submit()
+assert created and time.perf_counter() - t0 < 0.1
+
+same, created = manager.submit()
+assert same is job and not created
+
+time.sleep(0.1)
+assert job.status == "running" and job.progress["files_done"] > 0
+
+manager.wait(job.job_id, timeout=5)
+assert job.status == "succeeded" and job.result == {"documents_indexed": 50}, job.as_dict()
+
+# Cancel
+job, _ = manager.submit()
+time.sleep(0.05)
+manager.cancel(job.job_id)
+manager.wait(job.job_id, timeout=5)
+assert job.status == "cancelled" and job.progress["files_done"] < 50
+
+# Failure
+job, _ = manager.submit(fail=True)
+manager.wait(job.job_id, timeout=5)
+assert job.status == "failed" and "bad document" in job.error
+
+assert [j["status"] for j in manager.list()] == ["failed", "cancelled", "succeeded"]
+assert manager.active() is None
+print("OK")
@@ -0,0 +1,52 @@
+# database/bench_metadata_store.py
+#
+# Compare rows/sec of per-row inserts vs. batched inserts.
+# Rows are written with vector IDs far above any real ones and removed afterwards.
+#
+#   python -m database.bench_metadata_store [n_rows]
+
+import sys
+import time
+
+from database.metadata_backend import open_metadata_store
+
+N_ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+BASE_VECTOR_ID = 10 ** 12
+
+
+def make_rows(offset: int):
+    return [
+        {
+            "chunk_id": f"bench_doc_{offset + i}",
+            "vector_id": BASE_VECTOR_ID + offset + i,
+            "document_name": "bench_doc.txt",
+            "page_or_section": None,
+            "chunk_text": "Benchmark chunk text. " * 20,
+        }
+        for i in range(N_ROWS)
+    ]
+
+
+db = open_metadata_store()
+results = {}
+
+try:
+    rows = make_rows(0)
+    t0 = time.perf_counter()
+    for row in rows:
+        db.insert_chunk_metadata(row)
+    results["per_row"] = N_ROWS / (time.perf_counter() - t0)
+
+    for batch_size in (100, 1000):
+        rows = make_rows(N_ROWS * (1 + len(results)))
+        t0 = time.perf_counter()
+        db.insert_chunk_metadata_batch(rows, batch_size=batch_size)
+        results[f"batch_{batch_size}"] = N_ROWS / (time.perf_counter() - t0)
+finally:
+    db.delete_by_vector_ids(range(BASE_VECTOR_ID, BASE_VECTOR_ID + N_ROWS * 4))
+    db.close()
+
+print(f"\n=== METADATA INSERT BENCHMARK ({N_ROWS} rows) ===")
+for name, rps in results.items():
+    speedup = rps / results["per_row"]
+    print(f"{name:<12} {rps:>10.0f} rows/sec   x{speedup:.1f}")
@@ -0,0 +1,138 @@
+# database/connection_pool.py
+
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Tuple, Type
+
+
+class PoolTimeoutError(RuntimeError):
+    pass
+
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of DB-API connections.
+    - at most max_size connections are ever open
+    - callers block (up to acquire_timeout_s) when all are checked out
+    - idle connections are health-checked before reuse
+    - connections that raised one of drop_errors are discarded, not reused
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        max_size: int = 8,
+        acquire_timeout_s: float = 30.0,
+        health_check_interval_s: float = 30.0,
+        drop_errors: Tuple[Type[BaseException], ...] = (),
+    ):
+        self._connect = connect
+        self.max_size = max_size
+        self.acquire_timeout_s = acquire_timeout_s
+        self.health_check_interval_s = health_check_interval_s
+        self.drop_errors = drop_errors
+
+        # LIFO keeps a small hot set of connections in use
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._n_open = 0
+        self._closed = False
+
+    def _open(self):
+        with self._lock:
+            if self._n_open >= self.max_size:
+                return None
+            self._n_open += 1
+        try:
+            return self._connect()
+        except Exception:
+            with self._lock:
+                self._n_open -= 1
+            raise
+
+    def _discard(self, conn):
+        with self._lock:
+            self._n_open -= 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, conn) -> bool:
+        try:
+            return bool(conn.is_connected())
+        except Exception:
+            return False
+
+    def acquire(self):
+        if self._closed:
+            raise RuntimeError("Connection pool is closed.")
+
+        deadline = time.monotonic() + self.acquire_timeout_s
+
+        while True:
+            try:
+                conn, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._open()
+                if conn is not None:
+                    return conn
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeoutError(
+                        f"No DB connection available after {self.acquire_timeout_s}s "
+                        f"(pool size {self.max_size})"
+                    )
+                # Wake up periodically in case a discarded slot frees up
+                try:
+                    conn, last_used = self._idle.get(timeout=min(remaining, 0.1))
+                except queue.Empty:
+                    continue
+
+            if time.monotonic() - last_used < self.health_check_interval_s:
+                return conn
+            if self._is_healthy(conn):
+                return conn
+
+            # Dropped by the server while idle: replace it
+            self._discard(conn)
+
+    def release(self, conn, broken: bool = False):
+        if broken or self._closed:
+            self._discard(conn)
+            return
+        self._idle.put((conn, time.monotonic()))
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        except self.drop_errors:
+            self.release(conn, broken=True)
+            raise
+        except BaseException:
+            try:
+                conn.rollback()
+            except Exception:
+                self.release(conn, broken=True)
+                raise
+            self.release(conn)
+            raise
+        else:
+            self.release(conn)
+
+    @property
+    def size(self) -> int:
+        return self._n_open
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
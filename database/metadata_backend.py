@@ -0,0 +1,84 @@
+# database/metadata_backend.py
+
+import os
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+METADATA_BACKENDS = ("mysql", "sqlite")
+
+DEFAULT_SQLITE_PATH = Path("data/metadata.sqlite3")
+
+
+class MetadataBackend(ABC):
+    """
+    Interface of a chunk metadata store: rows keyed by vector_id with
+    chunk_id, document_name, page_or_section and chunk_text.
+
+    Implementations must be safe to share between threads, and
+    transaction() must be re-entrant (nested blocks join the outer one).
+    """
+
+    @abstractmethod
+    @contextmanager
+    def transaction(self):
+        ...
+
+    @abstractmethod
+    def insert_chunk_metadata(self, metadata: Dict):
+        ...
+
+    @abstractmethod
+    def insert_chunk_metadata_batch(self, rows: Iterable[Dict], batch_size: int = 1000) -> int:
+        ...
+
+    @abstractmethod
+    def delete_by_vector_ids(self, vector_ids: List[int], batch_size: int = 1000) -> int:
+        ...
+
+    @abstractmethod
+    def delete_all_chunks(self):
+        ...
+
+    @abstractmethod
+    def fetch_by_vector_ids(self, vector_ids: List[int]) -> List[Dict]:
+        ...
+
+    @abstractmethod
+    def iter_chunk_texts(self, batch_size: int = 1000) -> Iterator[str]:
+        """
+        chunk_text of every row, read in vector_id order in pages of batch_size.
+        """
+
+    @abstractmethod
+    def get_system_stats(self) -> Dict:
+        ...
+
+    @abstractmethod
+    def close(self):
+        ...
+
+
+def open_metadata_store(backend: Optional[str] = None, **kwargs) -> MetadataBackend:
+    """
+    Create the metadata store selected by METADATA_BACKEND:
+      - "mysql"  (default): MetadataStore, configured by DB_* variables
+      - "sqlite": embedded SQLiteMetadataStore at SQLITE_PATH, no server needed
+    Backends are imported lazily, so the SQLite one works without the
+    MySQL driver installed.
+    """
+    backend = (backend or os.getenv("METADATA_BACKEND", "mysql")).lower()
+
+    if backend == "mysql":
+        from database.metadata_store import MetadataStore
+        return MetadataStore(**kwargs)
+    if backend == "sqlite":
+        from database.sqlite_store import SQLiteMetadataStore
+        return SQLiteMetadataStore(**kwargs)
+
+    raise ValueError(f"Unknown METADATA_BACKEND {backend!r}, expected one of {METADATA_BACKENDS}")
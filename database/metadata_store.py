@@ -1,53 +1,246 @@
 # database/metadata_store.py
 
 import os
+import threading
+from contextlib import contextmanager
 from dotenv import load_dotenv
 import mysql.connector
-from typing import Dict, List
+from mysql.connector import errors as mysql_errors
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from database.connection_pool import ConnectionPool
+from database.metadata_backend import MetadataBackend
 
 load_dotenv()
 
+INSERT_CHUNK_QUERY = """
+INSERT INTO document_chunks
+(chunk_id, vector_id, document_name, page_or_section, chunk_text)
+VALUES (%s, %s, %s, %s, %s)
+"""
+
+# Errors that mean the connection itself is gone (server restart, idle timeout)
+CONNECTION_ERRORS = (mysql_errors.OperationalError, mysql_errors.InterfaceError)
+
+
+def _chunk_values(metadata: Dict) -> tuple:
+    return (
+        metadata["chunk_id"],
+        metadata["vector_id"],
+        metadata["document_name"],
+        metadata.get("page_or_section"),
+        metadata["chunk_text"],
+    )
+
 
-class MetadataStore:
+def _connect_mysql():
+    return mysql.connector.connect(
+        host=os.getenv("DB_HOST", "127.0.0.1"),
+        port=int(os.getenv("DB_PORT", 3306)),
+        user=os.getenv("DB_USER", "root"),
+        password=os.getenv("DB_PASSWORD"),
+        database=os.getenv("DB_NAME", "rag_metadata"),
+    )
+
+
+class MetadataStore(MetadataBackend):
     """
-    Stores and retrieves chunk metadata linked to vector IDs.
+    Stores and retrieves chunk metadata linked to vector IDs (MySQL backend).
+
+    Backed by a bounded connection pool; every call uses its own cursor,
+    so one instance can be shared by concurrent request threads.
+
+    Pooled connections run in autocommit mode, so a read outside
+    transaction() never leaves a REPEATABLE READ snapshot open on a
+    connection that goes back to the pool; transaction() starts and ends
+    its own.
     """
 
-    def __init__(self):
-        self.conn = mysql.connector.connect(
-            host=os.getenv("DB_HOST", "127.0.0.1"),
-            port=int(os.getenv("DB_PORT", 3306)),
-            user=os.getenv("DB_USER", "root"),
-            password=os.getenv("DB_PASSWORD"),
-            database=os.getenv("DB_NAME", "rag_metadata"),
+    def __init__(
+        self,
+        pool_size: Optional[int] = None,
+        connect: Optional[Callable] = None,
+    ):
+        self._connect_raw = connect or _connect_mysql
+        self.pool = ConnectionPool(
+            self._connect,
+            max_size=pool_size or int(os.getenv("DB_POOL_SIZE", 8)),
+            acquire_timeout_s=float(os.getenv("DB_POOL_TIMEOUT_S", 30)),
+            drop_errors=CONNECTION_ERRORS,
         )
-        self.cursor = self.conn.cursor(dictionary=True)
+        self._local = threading.local()
+
+    # --------------------------------------------------
+    # Connection / transaction handling
+    # --------------------------------------------------
+    def _connect(self):
+        conn = self._connect_raw()
+        conn.autocommit = True
+        return conn
+
+    @contextmanager
+    def _cursor(self):
+        """
+        Yield (conn, cursor). Inside transaction() the thread's pinned
+        connection is used, otherwise one is borrowed from the pool.
+        """
+        conn = getattr(self._local, "tx_conn", None)
+
+        if conn is not None:
+            cursor = conn.cursor(dictionary=True)
+            try:
+                yield conn, cursor
+            finally:
+                cursor.close()
+            return
+
+        with self.pool.connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            try:
+                yield conn, cursor
+            finally:
+                cursor.close()
+
+    def _read(self, query: str, params=None, one: bool = False):
+        """
+        Run a read query; retry once on a fresh connection if the
+        pooled one was dropped by the server.
+        """
+        for attempt in range(2):
+            try:
+                with self._cursor() as (_, cursor):
+                    cursor.execute(query, params)
+                    return cursor.fetchone() if one else cursor.fetchall()
+            except CONNECTION_ERRORS:
+                if attempt == 1 or getattr(self._local, "tx_conn", None) is not None:
+                    raise
+
+    def _commit(self, conn):
+        # Inside transaction() the outermost block commits
+        if getattr(self._local, "tx_conn", None) is None:
+            conn.commit()
 
+    @contextmanager
+    def transaction(self):
+        """
+        Group writes into one transaction on one connection:
+        commit on success, rollback on error. Nested use joins the outer one.
+        """
+        if getattr(self._local, "tx_conn", None) is not None:
+            self._local.tx_depth += 1
+            try:
+                yield self
+            finally:
+                self._local.tx_depth -= 1
+            return
+
+        with self.pool.connection() as conn:
+            conn.start_transaction()
+            self._local.tx_conn = conn
+            self._local.tx_depth = 1
+            try:
+                yield self
+                conn.commit()
+            finally:
+                # pool.connection() rolls back if an exception propagates
+                self._local.tx_conn = None
+                self._local.tx_depth = 0
+
+    # --------------------------------------------------
+    # Writes
+    # --------------------------------------------------
     def insert_chunk_metadata(self, metadata: Dict):
-        query = """
-        INSERT INTO document_chunks
-        (chunk_id, vector_id, document_name, page_or_section, chunk_text)
-        VALUES (%s, %s, %s, %s, %s)
-        """
-        values = (
-            metadata["chunk_id"],
-            metadata["vector_id"],
-            metadata["document_name"],
-            metadata.get("page_or_section"),
-            metadata["chunk_text"],
-        )
-        self.cursor.execute(query, values)
-        self.conn.commit()
+        with self._cursor() as (conn, cursor):
+            cursor.execute(INSERT_CHUNK_QUERY, _chunk_values(metadata))
+            self._commit(conn)
+
+    def insert_chunk_metadata_batch(self, rows: Iterable[Dict], batch_size: int = 1000) -> int:
+        """
+        Insert many chunk rows with executemany (multi-row VALUES) in batches,
+        all inside a single transaction. Returns the number of rows inserted.
+        """
+        inserted = 0
+        batch = []
+
+        with self.transaction(), self._cursor() as (_, cursor):
+            for metadata in rows:
+                batch.append(_chunk_values(metadata))
+                if len(batch) >= batch_size:
+                    cursor.executemany(INSERT_CHUNK_QUERY, batch)
+                    inserted += len(batch)
+                    batch = []
 
+            if batch:
+                cursor.executemany(INSERT_CHUNK_QUERY, batch)
+                inserted += len(batch)
+
+        return inserted
+
+    def delete_by_vector_ids(self, vector_ids: List[int], batch_size: int = 1000) -> int:
+        vector_ids = list(vector_ids)
+        deleted = 0
+
+        with self.transaction(), self._cursor() as (_, cursor):
+            for i in range(0, len(vector_ids), batch_size):
+                batch = vector_ids[i:i + batch_size]
+                placeholders = ",".join(["%s"] * len(batch))
+                query = f"""
+                DELETE FROM document_chunks
+                WHERE vector_id IN ({placeholders})
+                """
+                cursor.execute(query, batch)
+                deleted += cursor.rowcount
+
+        return deleted
+
+    def delete_all_chunks(self):
+        with self._cursor() as (conn, cursor):
+            cursor.execute("DELETE FROM document_chunks")
+            self._commit(conn)
+
+    # --------------------------------------------------
+    # Reads
+    # --------------------------------------------------
     def fetch_by_vector_ids(self, vector_ids: List[int]):
         placeholders = ",".join(["%s"] * len(vector_ids))
         query = f"""
         SELECT * FROM document_chunks
         WHERE vector_id IN ({placeholders})
         """
-        self.cursor.execute(query, vector_ids)
-        return self.cursor.fetchall()
+        return self._read(query, list(vector_ids))
+
+    def iter_chunk_texts(self, batch_size: int = 1000) -> Iterator[str]:
+        # Keyset pagination: each page is a short indexed range read
+        last = -1
+        while True:
+            rows = self._read(
+                """
+                SELECT vector_id, chunk_text FROM document_chunks
+                WHERE vector_id > %s ORDER BY vector_id LIMIT %s
+                """,
+                [last, batch_size],
+            )
+            if not rows:
+                return
+            for row in rows:
+                yield row["chunk_text"]
+            last = rows[-1]["vector_id"]
+
+    def get_system_stats(self) -> Dict:
+        row = self._read(
+            """
+            SELECT COUNT(DISTINCT document_name) AS docs,
+                   COUNT(*) AS chunks,
+                   COUNT(DISTINCT vector_id) AS vectors
+            FROM document_chunks
+            """,
+            one=True,
+        )
+        return {
+            "documents": row["docs"],
+            "chunks": row["chunks"],
+            "vectors": row["vectors"],
+        }
 
     def close(self):
-        self.cursor.close()
-        self.conn.close()
+        self.pool.close()
@@ -0,0 +1,225 @@
+# database/sqlite_store.py
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from database.metadata_backend import DEFAULT_SQLITE_PATH, MetadataBackend
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS document_chunks (
+    vector_id       INTEGER PRIMARY KEY,
+    chunk_id        TEXT NOT NULL,
+    document_name   TEXT NOT NULL,
+    page_or_section TEXT,
+    chunk_text      TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_document_chunks_document
+    ON document_chunks (document_name);
+"""
+
+# Keyed by vector_id, so re-inserting a row (e.g. a resumed ingest) replaces it
+INSERT_CHUNK_QUERY = """
+INSERT OR REPLACE INTO document_chunks
+(chunk_id, vector_id, document_name, page_or_section, chunk_text)
+VALUES (?, ?, ?, ?, ?)
+"""
+
+# Stay well below SQLite's limit on bound parameters per statement
+MAX_PARAMS = 900
+
+
+def _chunk_values(metadata: Dict) -> tuple:
+    return (
+        metadata["chunk_id"],
+        metadata["vector_id"],
+        metadata["document_name"],
+        metadata.get("page_or_section"),
+        metadata["chunk_text"],
+    )
+
+
+def _dict_row(cursor: sqlite3.Cursor, row: tuple) -> Dict:
+    return {col[0]: value for col, value in zip(cursor.description, row)}
+
+
+class SQLiteMetadataStore(MetadataBackend):
+    """
+    Embedded chunk metadata store (SQLite, WAL mode).
+
+    Lookups are in-process B-tree reads on the vector_id primary key, with
+    no network round trip. Each thread gets its own connection; in WAL
+    mode readers never block on the writer, and writers serialize on
+    SQLite's database lock (waiting up to busy_timeout_s).
+    """
+
+    def __init__(self, path: Optional[Path] = None, busy_timeout_s: Optional[float] = None):
+        self.path = Path(path or os.getenv("SQLITE_PATH", DEFAULT_SQLITE_PATH))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.busy_timeout_s = busy_timeout_s or float(os.getenv("SQLITE_BUSY_TIMEOUT_S", 30))
+
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+
+    # --------------------------------------------------
+    # Connection / transaction handling
+    # --------------------------------------------------
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None: transactions are opened explicitly below
+            conn = sqlite3.connect(
+                self.path,
+                timeout=self.busy_timeout_s,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            conn.row_factory = _dict_row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.tx_depth = 0
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """
+        Group writes into one transaction: commit on success, rollback on
+        error. Nested use joins the outer one.
+        """
+        conn = self._conn()
+        if self._local.tx_depth > 0:
+            self._local.tx_depth += 1
+            try:
+                yield self
+            finally:
+                self._local.tx_depth -= 1
+            return
+
+        # Take the write lock up front instead of failing on upgrade later
+        conn.execute("BEGIN IMMEDIATE")
+        self._local.tx_depth = 1
+        try:
+            yield self
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+        finally:
+            self._local.tx_depth = 0
+
+    # --------------------------------------------------
+    # Writes
+    # --------------------------------------------------
+    def insert_chunk_metadata(self, metadata: Dict):
+        with self.transaction():
+            self._conn().execute(INSERT_CHUNK_QUERY, _chunk_values(metadata))
+
+    def insert_chunk_metadata_batch(self, rows: Iterable[Dict], batch_size: int = 1000) -> int:
+        inserted = 0
+        batch = []
+
+        with self.transaction():
+            conn = self._conn()
+            for metadata in rows:
+                batch.append(_chunk_values(metadata))
+                if len(batch) >= batch_size:
+                    conn.executemany(INSERT_CHUNK_QUERY, batch)
+                    inserted += len(batch)
+                    batch = []
+
+            if batch:
+                conn.executemany(INSERT_CHUNK_QUERY, batch)
+                inserted += len(batch)
+
+        return inserted
+
+    def delete_by_vector_ids(self, vector_ids: List[int], batch_size: int = 1000) -> int:
+        vector_ids = list(vector_ids)
+        batch_size = min(batch_size, MAX_PARAMS)
+        deleted = 0
+
+        with self.transaction():
+            conn = self._conn()
+            for i in range(0, len(vector_ids), batch_size):
+                batch = vector_ids[i:i + batch_size]
+                placeholders = ",".join("?" * len(batch))
+                cursor = conn.execute(
+                    f"DELETE FROM document_chunks WHERE vector_id IN ({placeholders})",
+                    batch,
+                )
+                deleted += cursor.rowcount
+
+        return deleted
+
+    def delete_all_chunks(self):
+        with self.transaction():
+            self._conn().execute("DELETE FROM document_chunks")
+
+    # --------------------------------------------------
+    # Reads
+    # --------------------------------------------------
+    def fetch_by_vector_ids(self, vector_ids: List[int]) -> List[Dict]:
+        vector_ids = [int(v) for v in vector_ids]
+        conn = self._conn()
+        rows = []
+
+        for i in range(0, len(vector_ids), MAX_PARAMS):
+            batch = vector_ids[i:i + MAX_PARAMS]
+            placeholders = ",".join("?" * len(batch))
+            rows.extend(
+                conn.execute(
+                    f"SELECT * FROM document_chunks WHERE vector_id IN ({placeholders})",
+                    batch,
+                ).fetchall()
+            )
+
+        return rows
+
+    def iter_chunk_texts(self, batch_size: int = 1000) -> Iterator[str]:
+        conn = self._conn()
+        last = -1
+        while True:
+            rows = conn.execute(
+                "SELECT vector_id, chunk_text FROM document_chunks "
+                "WHERE vector_id > ? ORDER BY vector_id LIMIT ?",
+                (last, batch_size),
+            ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield row["chunk_text"]
+            last = rows[-1]["vector_id"]
+
+    def get_system_stats(self) -> Dict:
+        row = self._conn().execute(
+            """
+            SELECT COUNT(DISTINCT document_name) AS docs,
+                   COUNT(*) AS chunks,
+                   COUNT(DISTINCT vector_id) AS vectors
+            FROM document_chunks
+            """
+        ).fetchone()
+        return {
+            "documents": row["docs"],
+            "chunks": row["chunks"],
+            "vectors": row["vectors"],
+        }
+
+    def close(self):
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
@@ -0,0 +1,157 @@
+# database/test_connection_pool.py
+#
+# 32 parallel fetch_by_vector_ids calls against a local stand-in database
+# (no MySQL needed). Each fake query sleeps like a network round trip and
+# refuses concurrent use of one connection, so cross-talk would raise.
+#
+# Then a stand-in with REPEATABLE READ snapshots: a pooled reader must see
+# rows committed on another connection after its first read.
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from database.metadata_store import MetadataStore
+
+N_REQUESTS = 32
+QUERY_LATENCY_S = 0.02
+
+TABLE = {
+    vid: {
+        "chunk_id": f"doc_{vid}",
+        "vector_id": vid,
+        "document_name": "doc.pdf",
+        "page_or_section": None,
+        "chunk_text": f"chunk text {vid}",
+    }
+    for vid in range(1000)
+}
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rows = []
+        self.rowcount = 0
+
+    def execute(self, query, params=None):
+        if not self.conn.lock.acquire(blocking=False):
+            raise RuntimeError("connection used by two threads at once")
+        try:
+            time.sleep(QUERY_LATENCY_S)
+            self.rows = [dict(TABLE[v]) for v in params or [] if v in TABLE]
+            self.rowcount = len(self.rows)
+        finally:
+            self.conn.lock.release()
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.lock = threading.Lock()
+
+    def cursor(self, dictionary=True):
+        return FakeCursor(self)
+
+    def is_connected(self):
+        return True
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def run(pool_size: int) -> float:
+    db = MetadataStore(pool_size=pool_size, connect=FakeConnection)
+    requests = [[i * 3, i * 3 + 1, i * 3 + 2] for i in range(N_REQUESTS)]
+
+    def retrieve(ids):
+        rows = db.fetch_by_vector_ids(ids)
+        assert sorted(r["vector_id"] for r in rows) == ids, "cross-talk between requests"
+        return rows
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=N_REQUESTS) as ex:
+        list(ex.map(retrieve, requests))
+    elapsed = time.perf_counter() - t0
+
+    assert db.pool.size <= pool_size
+    db.close()
+    return N_REQUESTS / elapsed
+
+
+class SnapshotConnection(FakeConnection):
+    """
+    InnoDB-like: without autocommit, the first read opens a transaction
+    whose snapshot lasts until commit / rollback.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.autocommit = False
+        self.snapshot = None
+
+    def start_transaction(self):
+        self.snapshot = None
+
+    def visible(self):
+        if self.autocommit and self.snapshot is None:
+            return SNAPSHOT_TABLE
+        if self.snapshot is None:
+            self.snapshot = dict(SNAPSHOT_TABLE)
+        return self.snapshot
+
+    def cursor(self, dictionary=True):
+        return SnapshotCursor(self)
+
+    def commit(self):
+        self.snapshot = None
+
+    rollback = commit
+
+
+class SnapshotCursor(FakeCursor):
+    def execute(self, query, params=None):
+        table = self.conn.visible()
+        self.rows = [dict(table[v]) for v in params or [] if v in table]
+        self.rowcount = len(self.rows)
+
+
+SNAPSHOT_TABLE = {vid: TABLE[vid] for vid in range(10)}
+
+
+def check_read_after_commit():
+    db = MetadataStore(pool_size=1, connect=SnapshotConnection)
+    assert len(db.fetch_by_vector_ids([1, 2])) == 2
+
+    # An ingest commits new rows on another connection
+    SNAPSHOT_TABLE.update({vid: TABLE[vid] for vid in range(10, 20)})
+
+    rows = db.fetch_by_vector_ids([1, 15])
+    assert db.pool.size == 1
+    assert sorted(r["vector_id"] for r in rows) == [1, 15], "pooled reader kept a stale snapshot"
+    db.close()
+
+
+check_read_after_commit()
+
+qps_single = run(pool_size=1)
+qps_pooled = run(pool_size=8)
+
+print(f"pool_size=1 : {qps_single:7.1f} req/s")
+print(f"pool_size=8 : {qps_pooled:7.1f} req/s   x{qps_pooled / qps_single:.1f}")
+assert qps_pooled > qps_single * 3
+print("OK: no cross-talk, throughput scales with the pool")
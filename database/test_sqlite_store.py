@@ -0,0 +1,70 @@
+# database/test_sqlite_store.py
+#
+# Embedded SQLite backend: runs without a database server.
+
+import tempfile
+import threading
+from pathlib import Path
+
+from database.metadata_backend import open_metadata_store
+
+
+def make_rows(start, n):
+    return [
+        {
+            "chunk_id": f"doc_{i}",
+            "vector_id": i,
+            "document_name": f"doc_{i // 10}.pdf",
+            "page_or_section": f"Page {i % 10 + 1}",
+            "chunk_text": f"chunk text {i}",
+        }
+        for i in range(start, start + n)
+    ]
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    db = open_metadata_store("sqlite", path=Path(tmp) / "metadata.sqlite3")
+
+    assert db.insert_chunk_metadata_batch(make_rows(0, 2500), batch_size=1000) == 2500
+    rows = db.fetch_by_vector_ids(list(range(0, 2500, 2)))
+    assert len(rows) == 1250 and rows[0]["chunk_text"].startswith("chunk text")
+    print(db.get_system_stats())
+    assert db.get_system_stats() == {"documents": 250, "chunks": 2500, "vectors": 2500}
+
+    # Rollback: nothing from a failed transaction is kept
+    try:
+        with db.transaction():
+            db.delete_all_chunks()
+            db.insert_chunk_metadata_batch(make_rows(5000, 10))
+            raise RuntimeError("fail mid-transaction")
+    except RuntimeError:
+        pass
+    assert db.get_system_stats()["chunks"] == 2500
+    assert db.fetch_by_vector_ids([5000]) == []
+
+    # Readers on other threads see committed data while a write is running
+    errors = []
+
+    def reader():
+        try:
+            for _ in range(50):
+                assert len(db.fetch_by_vector_ids([1, 2, 3])) == 3
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=reader) for _ in range(8)]
+    with db.transaction():
+        for t in threads:
+            t.start()
+        db.delete_by_vector_ids(range(1000, 2000))
+        for t in threads:
+            t.join()
+    assert not errors, errors
+    assert db.get_system_stats()["chunks"] == 1500
+
+    # Full scan in pages
+    assert sum(1 for _ in db.iter_chunk_texts(batch_size=400)) == 1500
+
+    db.close()
+
+print("OK")
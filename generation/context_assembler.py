@@ -0,0 +1,211 @@
+# generation/context_assembler.py
+
+import math
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Neighbouring chunks share 100 chars (char chunker) or a few whole
+# sentences (token chunker); shorter matches are treated as coincidence.
+MIN_OVERLAP_CHARS = 20
+MAX_OVERLAP_CHARS = 2000
+
+
+def estimate_tokens(text: str, chars_per_token: float = 4.0) -> int:
+    """
+    Tokenizer-free estimate (~4 chars per token for English with
+    Llama-style BPE vocabularies).
+    """
+    return math.ceil(len(text) / chars_per_token) if text else 0
+
+
+def _split_chunk_id(chunk: Dict[str, Any]) -> Tuple[Optional[str], Optional[int]]:
+    """
+    "<doc>_<i>" / "<doc>_p<page>_<i>" -> ("<doc>[_p<page>]", i)
+    """
+    chunk_id = chunk.get("chunk_id") or ""
+    prefix, _, index = chunk_id.rpartition("_")
+    if not prefix or not index.isdigit():
+        return None, None
+    return f"{chunk.get('document_name')}|{prefix}", int(index)
+
+
+def merge_overlapping(first: str, second: str) -> str:
+    """
+    Join two consecutive chunk texts, dropping the span they share.
+    """
+    if second in first:
+        return first
+    # Candidate overlap starts: where second's opening chars occur in first's tail
+    head = second[:MIN_OVERLAP_CHARS]
+    pos = first.find(head, max(0, len(first) - MAX_OVERLAP_CHARS))
+    while pos != -1:
+        if second.startswith(first[pos:]):
+            return first[:pos] + second
+        pos = first.find(head, pos + 1)
+    return f"{first} {second}"
+
+
+class _Block:
+    """
+    A run of chunks from the same document (and page), adjacent by chunk
+    index, rendered as one source with the overlaps removed.
+    """
+
+    def __init__(self, key: Optional[str], rank: int):
+        self.key = key
+        self.rank = rank                      # best rank among members
+        self.members: Dict[int, Dict] = {}    # chunk index -> chunk
+        self.text = ""
+
+    def text_with(self, index: int, chunk: Dict) -> str:
+        members = dict(self.members)
+        members[index] = chunk
+        text = ""
+        for i in sorted(members):
+            piece = (members[i].get("chunk_text") or "").strip()
+            text = merge_overlapping(text, piece) if text else piece
+        return text
+
+    def is_adjacent(self, index: int) -> bool:
+        return index - 1 in self.members or index + 1 in self.members
+
+    def as_source(self) -> Dict[str, Any]:
+        chunks = [self.members[i] for i in sorted(self.members)]
+        best = min(chunks, key=lambda c: c.get("_rank", 0))
+        return {
+            "document_name": best.get("document_name"),
+            "page_or_section": best.get("page_or_section"),
+            "vector_id": best.get("vector_id"),
+            "vector_ids": [c.get("vector_id") for c in chunks],
+            "chunk_text": self.text,
+            "score": best.get("score"),
+        }
+
+
+class ContextAssembler:
+    """
+    Turns ranked chunks (best first) into prompt sources under a token budget:
+      - exact duplicates and chunks contained in an already chosen span are dropped
+      - adjacent chunks of the same document/page are merged into one
+        source, with their overlapping text included once
+      - chunks are taken in score order while the context stays within
+        token_budget (CONTEXT_TOKEN_BUDGET, 0 = unlimited); one that does
+        not fit is skipped and smaller, lower-ranked ones may still fit
+
+    count_tokens defaults to a character-based estimate; pass a real
+    tokenizer's counter for exact numbers.
+
+    Stats separate tokens_deduplicated (duplicates and merged overlaps)
+    from tokens_dropped_by_budget (chunks skipped because they did not fit).
+    """
+
+    def __init__(
+        self,
+        token_budget: Optional[int] = None,
+        count_tokens: Optional[Callable[[str], int]] = None,
+    ):
+        if token_budget is None:
+            token_budget = int(os.getenv("CONTEXT_TOKEN_BUDGET", 2048))
+        self.token_budget = token_budget
+
+        if count_tokens is None:
+            chars_per_token = float(os.getenv("CONTEXT_CHARS_PER_TOKEN", 4.0))
+            count_tokens = lambda text: estimate_tokens(text, chars_per_token)
+        self.count_tokens = count_tokens
+
+    def assemble(self, chunks: List[Dict[str, Any]]) -> Tuple[List[Dict], List[Dict], Dict[str, Any]]:
+        """
+        Returns (sources for the prompt, chunks actually used, stats).
+        Sources are ordered by their best chunk's rank.
+        """
+        blocks: List[_Block] = []
+        used: List[Dict] = []
+        used_tokens = 0
+        seen_ids = set()
+        n_duplicates = n_over_budget = 0
+        dropped_tokens = 0
+
+        naive_tokens = sum(self.count_tokens((c.get("chunk_text") or "").strip()) for c in chunks)
+
+        for rank, chunk in enumerate(chunks):
+            text = (chunk.get("chunk_text") or "").strip()
+            vid = chunk.get("vector_id")
+            if not text or (vid is not None and vid in seen_ids):
+                n_duplicates += 1
+                continue
+            if any(text in b.text for b in blocks):
+                n_duplicates += 1
+                seen_ids.add(vid)
+                continue
+
+            chunk = dict(chunk, _rank=rank)
+            key, index = _split_chunk_id(chunk)
+
+            block = None
+            if key is not None:
+                block = next((b for b in blocks if b.key == key and b.is_adjacent(index)), None)
+
+            if block is not None:
+                new_text = block.text_with(index, chunk)
+                cost = self.count_tokens(new_text) - self.count_tokens(block.text)
+            else:
+                new_text = text
+                cost = self.count_tokens(text)
+
+            if self.token_budget and used_tokens + cost > self.token_budget:
+                n_over_budget += 1
+                dropped_tokens += self.count_tokens(text)
+                continue
+
+            if block is None:
+                block = _Block(key, rank)
+                blocks.append(block)
+                index = index if index is not None else rank
+            block.members[index] = chunk
+            block.text = new_text
+            used_tokens += cost
+            seen_ids.add(vid)
+            used.append(chunk)
+
+        blocks = self._join_bridged(blocks)
+        blocks.sort(key=lambda b: b.rank)
+        context_tokens = sum(self.count_tokens(b.text) for b in blocks)
+
+        stats = {
+            "context_tokens": context_tokens,
+            "context_tokens_naive": naive_tokens,
+            "tokens_deduplicated": max(0, naive_tokens - dropped_tokens - context_tokens),
+            "tokens_dropped_by_budget": dropped_tokens,
+            "n_chunks_retrieved": len(chunks),
+            "n_sources": len(blocks),
+            "n_chunks_deduplicated": n_duplicates,
+            "n_chunks_over_budget": n_over_budget,
+        }
+        used = [{k: v for k, v in c.items() if k != "_rank"} for c in used]
+        return [b.as_source() for b in blocks], used, stats
+
+    @staticmethod
+    def _join_bridged(blocks: List[_Block]) -> List[_Block]:
+        """
+        A chunk can link two runs that were separate when they were
+        started (e.g. chunks 3 and 5, then 4); fold those together.
+        """
+        joined: List[_Block] = []
+        for block in sorted(blocks, key=lambda b: b.rank):
+            target = None
+            if block.key is not None:
+                target = next(
+                    (
+                        b for b in joined
+                        if b.key == block.key
+                        and any(b.is_adjacent(i) or i in b.members for i in block.members)
+                    ),
+                    None,
+                )
+            if target is None:
+                joined.append(block)
+                continue
+            for index, chunk in block.members.items():
+                target.text = target.text_with(index, chunk)
+                target.members[index] = chunk
+        return joined
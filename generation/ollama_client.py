@@ -0,0 +1,86 @@
+# generation/ollama_client.py
+
+import asyncio
+import json
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+
+# Failures where the request never produced a response, so it is safe to retry
+RETRYABLE_ERRORS = (
+    httpx.ConnectError,
+    httpx.ConnectTimeout,
+    httpx.ReadError,
+    httpx.RemoteProtocolError,
+)
+
+
+class AsyncOllamaClient:
+    """
+    Async client for the Ollama chat API.
+    - one shared keep-alive connection pool (bounded)
+    - separate connect / read timeouts
+    - retries connection resets that happen before any data arrived
+    """
+
+    def __init__(
+        self,
+        url: str = "http://127.0.0.1:11434/api/chat",
+        max_connections: int = 16,
+        max_keepalive_connections: int = 8,
+        connect_timeout_s: float = 5.0,
+        read_timeout_s: float = 120.0,
+        retries: int = 2,
+        retry_backoff_s: float = 0.2,
+    ):
+        self.url = url
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        )
+        self.timeout = httpx.Timeout(
+            read_timeout_s,
+            connect=connect_timeout_s,
+            # waiting for a free pooled connection counts against the connect budget
+            pool=connect_timeout_s,
+        )
+        self.retries = retries
+        self.retry_backoff_s = retry_backoff_s
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created lazily so it binds to the serving event loop
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout)
+        return self._client
+
+    async def stream_chat(self, payload: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        POST a streaming chat request and yield each NDJSON message.
+        Closing the iterator closes the HTTP response.
+        """
+        for attempt in range(self.retries + 1):
+            received = False
+            try:
+                async with self.client.stream("POST", self.url, json=payload) as resp:
+                    resp.raise_for_status()
+                    async for line in resp.aiter_lines():
+                        if not line:
+                            continue
+                        try:
+                            data = json.loads(line)
+                        except json.JSONDecodeError:
+                            continue
+                        received = True
+                        yield data
+                return
+            except RETRYABLE_ERRORS:
+                if received or attempt == self.retries:
+                    raise
+                await asyncio.sleep(self.retry_backoff_s * (2 ** attempt))
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
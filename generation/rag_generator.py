@@ -1,7 +1,12 @@
+import contextlib
 import time
 import json
 import requests
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator, Iterator, Optional
+
+from generation.ollama_client import AsyncOllamaClient
+from generation.context_assembler import ContextAssembler
+from indexing.metrics import observe_stage
 
 
 class RAGGenerator:
@@ -17,11 +22,27 @@ class RAGGenerator:
         model_name: str = "llama3.1:8b",
         ollama_url: str = "http://127.0.0.1:11434/api/chat",
         timeout_s: int = 120,
+        connect_timeout_s: float = 5.0,
+        max_connections: int = 16,
+        retries: int = 2,
+        context_token_budget: Optional[int] = None,
     ):
         self.model_name = model_name
         self.ollama_url = ollama_url
         self.timeout_s = timeout_s
 
+        # Shared keep-alive pool for the async path
+        self.async_client = AsyncOllamaClient(
+            url=ollama_url,
+            max_connections=max_connections,
+            connect_timeout_s=connect_timeout_s,
+            read_timeout_s=timeout_s,
+            retries=retries,
+        )
+
+        # Merges/dedupes retrieved chunks and caps the context size
+        self.assembler = ContextAssembler(token_budget=context_token_budget)
+
     def build_prompt(self, query: str, chunks: List[Dict[str, Any]]) -> str:
         """
         Build a grounded prompt using retrieved chunks.
@@ -29,10 +50,11 @@ class RAGGenerator:
         context_blocks = []
 
         for i, c in enumerate(chunks, start=1):
+            vector_ids = c.get("vector_ids") or [c.get("vector_id", "?")]
             src = (
                 f"{c.get('document_name','unknown')} | "
                 f"{c.get('page_or_section','N/A')} | "
-                f"vector_id={c.get('vector_id','?')}"
+                f"vector_id={','.join(str(v) for v in vector_ids)}"
             )
             text = (c.get("chunk_text") or "").strip()
             context_blocks.append(f"[Source {i}]\n{src}\n{text}")
@@ -57,21 +79,18 @@ Instructions:
   (document_name, page/section, vector_id).
 """.strip()
 
-    def generate(
-        self,
-        query: str,
-        chunks: List[Dict[str, Any]],
-        temperature: float = 0.2,
-        stream: bool = True,
-    ) -> Dict[str, Any]:
+    def _prepare(self, query: str, chunks: List[Dict[str, Any]]):
         """
-        Generate answer from Ollama with streaming + metrics.
+        Assemble the context and build the prompt.
+        Returns (prompt, chunks used, context metrics).
         """
-        t0 = time.perf_counter()
-        prompt = self.build_prompt(query, chunks)
-        t_prompt = time.perf_counter()
+        sources, used, stats = self.assembler.assemble(chunks)
+        prompt = self.build_prompt(query, sources)
+        stats["prompt_tokens"] = self.assembler.count_tokens(prompt)
+        return prompt, used, stats
 
-        payload = {
+    def _payload(self, prompt: str, temperature: float, stream: bool) -> Dict[str, Any]:
+        return {
             "model": self.model_name,
             "messages": [
                 {"role": "system", "content": "You are a helpful offline assistant."},
@@ -83,37 +102,200 @@ Instructions:
             },
         }
 
+    @staticmethod
+    def _citations(chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [
+            {
+                "document_name": c.get("document_name"),
+                "page_or_section": c.get("page_or_section"),
+                "vector_id": c.get("vector_id"),
+                "score": c.get("score"),
+            }
+            for c in chunks
+        ]
+
+    def _done_event(
+        self,
+        chunks: List[Dict[str, Any]],
+        prompt: str,
+        answer_parts: List[str],
+        t0: float,
+        t_prompt: float,
+        t_call0: float,
+        t_first: Optional[float],
+        context_stats: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        t_call1 = time.perf_counter()
+        answer = "".join(answer_parts).strip()
+
+        observe_stage("prompt_build", t_prompt - t0, t0)
+        if t_first is not None:
+            observe_stage("time_to_first_token", t_first - t_call0, t_call0)
+        observe_stage("generation", t_call1 - t_call0, t_call0)
+
+        metrics = {
+            "prompt_build_ms": round((t_prompt - t0) * 1000, 2),
+            "time_to_first_token_ms": (
+                round((t_first - t_call0) * 1000, 2) if t_first is not None else None
+            ),
+            "ollama_call_ms": round((t_call1 - t_call0) * 1000, 2),
+            "total_latency_ms": round((t_call1 - t0) * 1000, 2),
+            "n_chunks_used": len(chunks),
+            "prompt_chars": len(prompt),
+            "answer_chars": len(answer),
+            **context_stats,
+        }
+
+        return {
+            "type": "done",
+            "answer": answer,
+            "citations": self._citations(chunks),
+            "metrics": metrics,
+        }
+
+    def generate_stream(
+        self,
+        query: str,
+        chunks: List[Dict[str, Any]],
+        temperature: float = 0.2,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream an answer from Ollama as events:
+          {"type": "token", "content": "..."}            (0..n times)
+          {"type": "done", "answer", "citations", "metrics"}  (last)
+        Closing the generator closes the upstream Ollama request.
+        """
+        t0 = time.perf_counter()
+        prompt, chunks, context_stats = self._prepare(query, chunks)
+        t_prompt = time.perf_counter()
+
         answer_parts = []
+        t_first = None
         t_call0 = time.perf_counter()
 
         resp = requests.post(
             self.ollama_url,
-            json=payload,
-            stream=stream,
+            json=self._payload(prompt, temperature, stream=True),
+            stream=True,
             timeout=self.timeout_s,
         )
-        resp.raise_for_status()
 
-        # ---- STREAMING RESPONSE ----
-        if stream:
+        try:
+            resp.raise_for_status()
+
             for line in resp.iter_lines(decode_unicode=True):
                 if not line:
                     continue
                 try:
                     data = json.loads(line)
-                    if "message" in data and "content" in data["message"]:
-                        chunk = data["message"]["content"]
-                        answer_parts.append(chunk)
-                        print(chunk, end="", flush=True)
                 except json.JSONDecodeError:
                     continue
-            print()
-        else:
-            data = resp.json()
-            answer_parts.append(data["message"]["content"])
+
+                token = data.get("message", {}).get("content")
+                if token:
+                    if t_first is None:
+                        t_first = time.perf_counter()
+                    answer_parts.append(token)
+                    yield {"type": "token", "content": token}
+
+                if data.get("done"):
+                    break
+        finally:
+            resp.close()
+
+        yield self._done_event(
+            chunks, prompt, answer_parts, t0, t_prompt, t_call0, t_first, context_stats
+        )
+
+    async def agenerate_stream(
+        self,
+        query: str,
+        chunks: List[Dict[str, Any]],
+        temperature: float = 0.2,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Async variant of generate_stream over the pooled HTTP client.
+        Cancelling the consumer closes the upstream request.
+        """
+        t0 = time.perf_counter()
+        prompt, chunks, context_stats = self._prepare(query, chunks)
+        t_prompt = time.perf_counter()
+
+        answer_parts = []
+        t_first = None
+        t_call0 = time.perf_counter()
+
+        messages = self.async_client.stream_chat(self._payload(prompt, temperature, stream=True))
+        try:
+            async for data in messages:
+                token = data.get("message", {}).get("content")
+                if token:
+                    if t_first is None:
+                        t_first = time.perf_counter()
+                    answer_parts.append(token)
+                    yield {"type": "token", "content": token}
+
+                if data.get("done"):
+                    break
+        finally:
+            await messages.aclose()
+
+        yield self._done_event(
+            chunks, prompt, answer_parts, t0, t_prompt, t_call0, t_first, context_stats
+        )
+
+    async def agenerate(
+        self,
+        query: str,
+        chunks: List[Dict[str, Any]],
+        temperature: float = 0.2,
+    ) -> Dict[str, Any]:
+        """
+        Async variant of generate(): does not block a worker thread
+        while Ollama is generating.
+        """
+        events = self.agenerate_stream(query, chunks, temperature=temperature)
+        # Close the stream (and its upstream request) once done arrives
+        async with contextlib.aclosing(events):
+            async for event in events:
+                if event["type"] == "done":
+                    event.pop("type")
+                    return event
+
+    def generate(
+        self,
+        query: str,
+        chunks: List[Dict[str, Any]],
+        temperature: float = 0.2,
+        stream: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        Generate answer from Ollama with streaming + metrics.
+        """
+        if stream:
+            for event in self.generate_stream(query, chunks, temperature=temperature):
+                if event["type"] == "done":
+                    event.pop("type")
+                    return event
+
+        t0 = time.perf_counter()
+        prompt, chunks, context_stats = self._prepare(query, chunks)
+        t_prompt = time.perf_counter()
+
+        t_call0 = time.perf_counter()
+
+        resp = requests.post(
+            self.ollama_url,
+            json=self._payload(prompt, temperature, stream=False),
+            timeout=self.timeout_s,
+        )
+        resp.raise_for_status()
+        answer = resp.json()["message"]["content"].strip()
 
         t_call1 = time.perf_counter()
-        answer = "".join(answer_parts).strip()
+
+        observe_stage("prompt_build", t_prompt - t0, t0)
+        observe_stage("generation", t_call1 - t_call0, t_call0)
 
         # ---- METRICS ----
         metrics = {
@@ -123,20 +305,14 @@ Instructions:
             "n_chunks_used": len(chunks),
             "prompt_chars": len(prompt),
             "answer_chars": len(answer),
+            **context_stats,
         }
 
-        citations = [
-            {
-                "document_name": c.get("document_name"),
-                "page_or_section": c.get("page_or_section"),
-                "vector_id": c.get("vector_id"),
-                "score": c.get("score"),
-            }
-            for c in chunks
-        ]
-
         return {
             "answer": answer,
-            "citations": citations,
+            "citations": self._citations(chunks),
             "metrics": metrics,
         }
+
+    async def aclose(self):
+        await self.async_client.aclose()
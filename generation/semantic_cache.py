@@ -0,0 +1,98 @@
+# generation/semantic_cache.py
+
+import copy
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+
+class SemanticCache:
+    """
+    In-memory semantic response cache.
+
+    Stores answered queries as normalized embeddings in a fixed-size matrix.
+    A new query whose cosine similarity to a cached one is >= threshold
+    (with the same top_k) reuses that answer. When full, the least
+    recently used entry is replaced.
+    """
+
+    def __init__(self, threshold: float = 0.92, maxsize: int = 512):
+        self.threshold = threshold
+        self.maxsize = maxsize
+
+        self._vectors: Optional[np.ndarray] = None   # (maxsize, dim)
+        self._entries = []                           # slot -> dict
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def lookup(self, embedding: np.ndarray, top_k: int) -> Optional[Tuple[Dict[str, Any], float]]:
+        """
+        Return (deep copy of cached result, similarity) or None.
+        """
+        with self._lock:
+            n = len(self._entries)
+            if n == 0:
+                self.misses += 1
+                return None
+
+            sims = self._vectors[:n] @ np.asarray(embedding, dtype=np.float32)
+            for slot in np.argsort(-sims):
+                if sims[slot] < self.threshold:
+                    break
+                entry = self._entries[slot]
+                if entry["top_k"] == top_k:
+                    entry["last_used"] = time.monotonic()
+                    self.hits += 1
+                    return copy.deepcopy(entry["result"]), float(sims[slot])
+
+            self.misses += 1
+            return None
+
+    def put(self, embedding: np.ndarray, top_k: int, result: Dict[str, Any]):
+        if self.maxsize <= 0:
+            return
+        embedding = np.asarray(embedding, dtype=np.float32)
+
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.maxsize, embedding.shape[0]), dtype=np.float32)
+
+            entry = {
+                "top_k": top_k,
+                "result": copy.deepcopy(result),
+                "last_used": time.monotonic(),
+            }
+
+            if len(self._entries) < self.maxsize:
+                slot = len(self._entries)
+                self._entries.append(entry)
+            else:
+                slot = min(range(self.maxsize), key=lambda i: self._entries[i]["last_used"])
+                self._entries[slot] = entry
+                self.evictions += 1
+
+            self._vectors[slot] = embedding
+
+    def clear(self):
+        with self._lock:
+            self._entries = []
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
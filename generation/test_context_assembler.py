@@ -0,0 +1,81 @@
+# generation/test_context_assembler.py
+#
+# ContextAssembler on hand-built ranked chunks, counting words as tokens:
+# overlapping neighbours merge into one source, a chunk bridging two runs
+# of the same document joins them, duplicates and contained texts are
+# dropped, and a chunk over the token budget is skipped while a smaller,
+# lower-ranked one still fits. Deduplication and budget drops are reported
+# separately.
+
+from generation.context_assembler import ContextAssembler
+
+
+def sentence(doc, i):
+    return f"Sentence {i} of the {doc} covers item {i} in some detail."
+
+
+def chunk(doc, index, vid, text=None):
+    # Consecutive chunks share one sentence, like the chunker's overlap
+    return {
+        "chunk_id": f"{doc}_{index}",
+        "document_name": doc,
+        "vector_id": vid,
+        "chunk_text": text or f"{sentence(doc, index)} {sentence(doc, index + 1)}",
+        "score": 1.0 - vid / 100,
+    }
+
+
+def words(text):
+    return len(text.split())
+
+
+ranked = [
+    chunk("report", 1, 1),
+    chunk("manual", 0, 20),
+    chunk("report", 2, 2),                          # overlaps report_1
+    chunk("report", 1, 1),                          # same vector id again
+    chunk("manual", 2, 22),                         # not adjacent to manual_0 (yet)
+    chunk("other", 0, 30, sentence("report", 2)),   # contained in the report source
+    chunk("big", 0, 40, " ".join(["filler"] * 200)),
+    chunk("manual", 1, 21),                         # bridges manual_0 and manual_2
+    chunk("note", 0, 50, "Short note."),
+]
+naive = sum(words(c["chunk_text"]) for c in ranked)
+
+assembler = ContextAssembler(token_budget=100, count_tokens=words)
+sources, used, stats = assembler.assemble(ranked)
+print(stats)
+
+assert [s["document_name"] for s in sources] == ["report", "manual", "note"]
+assert sources[0]["chunk_text"] == " ".join(sentence("report", i) for i in (1, 2, 3))
+assert sources[0]["vector_ids"] == [1, 2]
+assert sources[1]["chunk_text"] == " ".join(sentence("manual", i) for i in range(4))
+assert sources[1]["vector_ids"] == [20, 21, 22]
+assert sources[1]["vector_id"] == 20                # best-ranked member
+assert sources[2]["chunk_text"] == "Short note."
+
+assert [c["vector_id"] for c in used] == [1, 20, 2, 22, 21, 50]
+assert all("_rank" not in c for c in used)
+
+assert stats["n_sources"] == 3
+assert stats["n_chunks_deduplicated"] == 2
+assert stats["n_chunks_over_budget"] == 1
+assert stats["context_tokens"] == 7 * words(sentence("report", 0)) + 2     # 3 + 4 sentences, note
+assert stats["context_tokens_naive"] == naive
+assert stats["tokens_dropped_by_budget"] == 200
+assert stats["tokens_deduplicated"] == naive - 200 - stats["context_tokens"]
+
+# Unlimited budget: the big chunk is kept and nothing is dropped
+sources, used, stats = ContextAssembler(token_budget=0, count_tokens=words).assemble(ranked)
+assert "big" in [s["document_name"] for s in sources]
+assert stats["tokens_dropped_by_budget"] == 0 and stats["n_chunks_over_budget"] == 0
+assert stats["tokens_deduplicated"] == naive - stats["context_tokens"]
+
+# Adjacent chunks without a shared span are joined with a space
+sources, _, _ = assembler.assemble([
+    chunk("plain", 0, 60, "First part."),
+    chunk("plain", 1, 61, "Second part."),
+])
+assert [s["chunk_text"] for s in sources] == ["First part. Second part."]
+
+print("OK")
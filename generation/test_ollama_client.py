@@ -0,0 +1,111 @@
+# generation/test_ollama_client.py
+#
+# Async generation against a local fake Ollama server that streams NDJSON
+# with controllable delays (no Ollama needed).
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from generation.rag_generator import RAGGenerator
+
+FAKE = {
+    "first_token_delay_s": 0.2,
+    "token_delay_s": 0.01,
+    "n_tokens": 20,
+    "reset_next": 0,        # drop this many connections without answering
+    "requests": 0,
+    "disconnects": 0,
+}
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _write_chunk(self, obj):
+        line = (json.dumps(obj) + "\n").encode()
+        self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        FAKE["requests"] += 1
+
+        if FAKE["reset_next"] > 0:
+            FAKE["reset_next"] -= 1
+            self.close_connection = True
+            self.connection.close()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        try:
+            time.sleep(FAKE["first_token_delay_s"])
+            for i in range(FAKE["n_tokens"]):
+                self._write_chunk({"message": {"content": f"t{i} "}, "done": False})
+                time.sleep(FAKE["token_delay_s"])
+            self._write_chunk({"message": {"content": ""}, "done": True})
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            FAKE["disconnects"] += 1
+
+
+server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOllamaHandler)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+url = f"http://127.0.0.1:{server.server_address[1]}/api/chat"
+
+gen = RAGGenerator(ollama_url=url, max_connections=32, retries=2)
+chunks = [{"document_name": "doc.pdf", "vector_id": 0, "chunk_text": "text"}]
+
+
+async def main():
+    # 1. Single request: answer + time-to-first-token
+    result = await gen.agenerate("q", chunks)
+    assert result["answer"].startswith("t0 t1")
+    ttft = result["metrics"]["time_to_first_token_ms"]
+    assert ttft >= FAKE["first_token_delay_s"] * 1000
+    print("single:", result["metrics"])
+
+    # 2. Concurrency: 32 requests overlap on the shared pool
+    n = 32
+    t0 = time.perf_counter()
+    results = await asyncio.gather(*[gen.agenerate("q", chunks) for _ in range(n)])
+    elapsed = time.perf_counter() - t0
+    serial = n * (FAKE["first_token_delay_s"] + FAKE["n_tokens"] * FAKE["token_delay_s"])
+    assert all(r["answer"] == result["answer"] for r in results)
+    print(f"concurrent: {n} requests in {elapsed:.2f}s (serial would be ~{serial:.1f}s)")
+    assert elapsed < serial / 4
+
+    # 3. Connection reset before any data is retried
+    FAKE["reset_next"] = 1
+    before = FAKE["requests"]
+    result = await gen.agenerate("q", chunks)
+    assert result["answer"].startswith("t0")
+    assert FAKE["requests"] - before == 2
+    print("retry: recovered after connection reset")
+
+    # 4. Cancelling the consumer closes the upstream request
+    FAKE["token_delay_s"] = 0.05
+    events = gen.agenerate_stream("q", chunks)
+    async for event in events:
+        if event["type"] == "token":
+            break
+    await events.aclose()
+    await asyncio.sleep(0.3)
+    assert FAKE["disconnects"] >= 1
+    print("cancel: upstream request closed")
+
+    await gen.aclose()
+
+
+asyncio.run(main())
+server.shutdown()
+print("OK")
@@ -0,0 +1,130 @@
+# indexing/bench_chunker.py
+#
+# Character chunker vs. token chunker on the documents under DATA_DIR:
+# chunk count, chunk sizes (in embedding-model tokens), chunking and embed
+# time, index memory, and retrieval quality.
+#
+# Retrieval quality uses held-out sentences as queries: a sentence is drawn
+# from a document and counts as found if a top-k chunk of that document
+# contains it (hit@k, MRR). No labelled queries are needed.
+#
+#   python -m indexing.bench_chunker --queries 200 --k 5 [--out report.md]
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from indexing.document_loader import DATA_DIR, load_pages
+from indexing.embedding_service import EmbeddingService
+from indexing.text_chunker import TokenChunker, chunk_documents, split_sentences
+from indexing.vector_indexer import VectorIndexer
+
+
+def sample_queries(records, n: int, seed: int = 0):
+    rng = random.Random(seed)
+    candidates = [
+        (r["doc_id"], " ".join(sentence.split()))
+        for r in records
+        for sentence, _ in split_sentences(r["text"])
+        if 60 <= len(sentence) <= 300
+    ]
+    return rng.sample(candidates, min(n, len(candidates)))
+
+
+def evaluate(name, records, embedder, tokenizer, queries, k, **chunk_kwargs):
+    t0 = time.perf_counter()
+    chunks = chunk_documents(records, **chunk_kwargs)
+    chunk_s = time.perf_counter() - t0
+
+    lengths = [len(ids) for ids in tokenizer([c["text"] for c in chunks], add_special_tokens=False)["input_ids"]]
+
+    t0 = time.perf_counter()
+    embeddings = embedder.embed_chunks(chunks, show_progress_bar=False)
+    embed_s = time.perf_counter() - t0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        indexer = VectorIndexer(index_dir=tmp, index_type="flat")
+        indexer.add(embeddings, ids=list(range(len(chunks))))
+
+        query_embeddings = embedder.embed_queries([q for _, q in queries])
+        _, found = indexer.search_many(query_embeddings, k)
+        memory_mb = indexer.memory_bytes() / 2 ** 20
+
+    hits, reciprocal_ranks = 0, []
+    normalized = [" ".join(c["text"].split()) for c in chunks]
+    for (doc_id, sentence), ids in zip(queries, found):
+        rank = next(
+            (
+                r for r, vid in enumerate(ids, start=1)
+                if vid != -1 and chunks[vid]["doc_id"] == doc_id and sentence in normalized[vid]
+            ),
+            None,
+        )
+        hits += rank is not None
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+
+    return {
+        "chunker": name,
+        "chunks": len(chunks),
+        "avg_tokens": float(np.mean(lengths)) if lengths else 0.0,
+        "max_tokens": max(lengths) if lengths else 0,
+        "chunk_s": chunk_s,
+        "embed_s": embed_s,
+        "index_mb": memory_mb,
+        "hit_at_k": hits / len(queries) if queries else 0.0,
+        "mrr": float(np.mean(reciprocal_ranks)) if queries else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--max-tokens", type=int, nargs="+", default=[256, 384, 512])
+    parser.add_argument("--out", type=Path, default=None)
+    args = parser.parse_args()
+
+    records = list(load_pages(args.data_dir))
+    if not records:
+        raise SystemExit(f"No documents found under {args.data_dir}")
+
+    embedder = EmbeddingService()
+    tokenizer = embedder.model.tokenizer
+    queries = sample_queries(records, args.queries)
+
+    results = [evaluate("char 500/100", records, embedder, tokenizer, queries, args.k, mode="char")]
+    for max_tokens in args.max_tokens:
+        chunker = TokenChunker(tokenizer=tokenizer, max_tokens=max_tokens)
+        results.append(
+            evaluate(
+                f"token {max_tokens}/{chunker.overlap_tokens}", records, embedder, tokenizer,
+                queries, args.k, mode="token", token_chunker=chunker,
+            )
+        )
+
+    lines = [
+        f"# Chunker comparison ({len(records)} pages, {len(queries)} queries, k={args.k})",
+        "",
+        "| chunker | chunks | avg tok | max tok | chunk s | embed s | index MB | hit@k | MRR |",
+        "|---|---|---|---|---|---|---|---|---|",
+    ]
+    for r in results:
+        lines.append(
+            f"| {r['chunker']} | {r['chunks']} | {r['avg_tokens']:.0f} | {r['max_tokens']} | "
+            f"{r['chunk_s']:.2f} | {r['embed_s']:.1f} | {r['index_mb']:.1f} | "
+            f"{r['hit_at_k']:.3f} | {r['mrr']:.3f} |"
+        )
+    report = "\n".join(lines)
+
+    print(report)
+    if args.out:
+        args.out.write_text(report + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
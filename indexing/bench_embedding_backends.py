@@ -0,0 +1,116 @@
+# indexing/bench_embedding_backends.py
+#
+# Throughput, latency and parity of the embedding backends against the fp32
+# torch baseline, on chunks of the documents under DATA_DIR.
+#
+# Parity: per-text cosine between backend and baseline vectors, and
+# recall@k of a flat search over baseline chunk vectors using the backend's
+# query vectors (i.e. querying an index built with fp32 torch), against the
+# baseline's own top-k. Non-zero exit if the mean cosine falls below
+# --min-cosine.
+#
+#   python -m indexing.bench_embedding_backends --backends torch-int8 onnx onnx-int8 --threads 8
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from indexing.document_loader import DATA_DIR, load_documents
+from indexing.embedding_backends import EMBED_BACKENDS, load_embedding_model
+from indexing.text_chunker import chunk_documents
+
+BASELINE = "torch"
+
+
+def encode(model, texts, batch_size):
+    return np.asarray(
+        model.encode(texts, batch_size=batch_size, normalize_embeddings=True), dtype=np.float32
+    )
+
+
+def measure(model, chunks, queries, batch_size):
+    encode(model, chunks[:batch_size], batch_size)   # warmup
+
+    t0 = time.perf_counter()
+    chunk_vectors = encode(model, chunks, batch_size)
+    throughput = len(chunks) / (time.perf_counter() - t0)
+
+    latencies = []
+    query_vectors = []
+    for q in queries:
+        t0 = time.perf_counter()
+        query_vectors.append(encode(model, [q], 1)[0])
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    return chunk_vectors, np.stack(query_vectors), throughput, np.array(latencies)
+
+
+def top_k(query_vectors, chunk_vectors, k):
+    scores = query_vectors @ chunk_vectors.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    parser.add_argument("--backends", nargs="+", default=[b for b in EMBED_BACKENDS if b != BASELINE])
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--chunks", type=int, default=512)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--model", default="BAAI/bge-m3")
+    parser.add_argument("--min-cosine", type=float, default=0.98)
+    args = parser.parse_args()
+
+    chunks = [c["text"] for c in chunk_documents(load_documents(args.data_dir))][:args.chunks]
+    if not chunks:
+        sys.exit(f"No documents found under {args.data_dir}")
+    # Queries: the first sentence-sized piece of evenly spaced chunks
+    step = max(1, len(chunks) // args.queries)
+    queries = [c[:160] for c in chunks[::step]][:args.queries]
+
+    results = {}
+    for backend in [BASELINE] + [b for b in args.backends if b != BASELINE]:
+        t0 = time.perf_counter()
+        model = load_embedding_model(args.model, backend, threads=args.threads)
+        load_s = time.perf_counter() - t0
+        results[backend] = (load_s, *measure(model, chunks, queries, args.batch_size))
+        del model
+
+    base_chunks, base_queries = results[BASELINE][1], results[BASELINE][2]
+    base_top = top_k(base_queries, base_chunks, args.k)
+
+    print(
+        f"{len(chunks)} chunks, {len(queries)} queries, batch {args.batch_size}, "
+        f"threads {args.threads or 'default'}\n"
+    )
+    print(
+        f"{'backend':<11} {'load s':>7} {'chunks/s':>9} {'q p50 ms':>9} {'q p95 ms':>9} "
+        f"{'cos mean':>9} {'cos min':>8} {f'recall@{args.k}':>10}"
+    )
+
+    failed = False
+    for backend, (load_s, chunk_vecs, query_vecs, throughput, lat) in results.items():
+        cosines = np.concatenate([
+            np.sum(chunk_vecs * base_chunks, axis=1),
+            np.sum(query_vecs * base_queries, axis=1),
+        ])
+        found = top_k(query_vecs, base_chunks, args.k)
+        recall = np.mean([len(set(f) & set(t)) / args.k for f, t in zip(found, base_top)])
+        print(
+            f"{backend:<11} {load_s:>7.1f} {throughput:>9.1f} "
+            f"{np.percentile(lat, 50):>9.2f} {np.percentile(lat, 95):>9.2f} "
+            f"{cosines.mean():>9.4f} {cosines.min():>8.4f} {recall:>10.3f}"
+        )
+        failed = failed or cosines.mean() < args.min_cosine
+
+    if failed:
+        sys.exit(f"Parity check failed: mean cosine below {args.min_cosine}")
+
+
+if __name__ == "__main__":
+    main()
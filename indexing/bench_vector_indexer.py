@@ -0,0 +1,95 @@
+# indexing/bench_vector_indexer.py
+#
+# Recall@k vs. latency and index memory for the VectorIndexer index types on
+# a synthetic, clustered corpus of normalized vectors. Ground truth is the
+# flat index. Compact types are run with and without exact rescoring.
+#
+#   python -m indexing.bench_vector_indexer --n 100000 --dim 1024
+
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from indexing.vector_indexer import VectorIndexer
+
+
+def synthetic_corpus(n: int, dim: int, n_queries: int, n_clusters: int = 256, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, n_clusters, n + n_queries)
+    data = centers[labels] + 0.6 * rng.standard_normal((n + n_queries, dim)).astype(np.float32)
+    data /= np.linalg.norm(data, axis=1, keepdims=True)
+    return data[:n], data[n:]
+
+
+def run_queries(indexer: VectorIndexer, queries: np.ndarray, k: int):
+    ids = np.empty((len(queries), k), dtype=np.int64)
+    latencies = []
+    for i, q in enumerate(queries):
+        t0 = time.perf_counter()
+        _, ids[i] = indexer.search(q, top_k=k)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return ids, np.array(latencies)
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    corpus, queries = synthetic_corpus(args.n, args.dim, args.queries)
+    ids = list(range(args.n))
+
+    configs = [
+        ("flat", {}, [{}]),
+        ("ivf", {"nlist": int(4 * np.sqrt(args.n))},
+         [{"nprobe": p} for p in (1, 4, 16, 64)]),
+        ("hnsw", {"hnsw_m": 32, "ef_construction": 200},
+         [{"ef_search": e} for e in (16, 64, 128, 256)]),
+        ("fp16", {}, [{"rescore": False}, {"rescore": True, "rescore_factor": 2}]),
+        ("sq8", {}, [{"rescore": False}, {"rescore": True, "rescore_factor": 4}]),
+        ("pq", {"pq_m": args.dim // 16},
+         [{"rescore": False}] + [{"rescore": True, "rescore_factor": f} for f in (4, 10)]),
+    ]
+
+    truth = None
+    print(f"\n=== VECTOR INDEX BENCHMARK (n={args.n}, dim={args.dim}, k={args.k}) ===")
+    print(
+        f"{'index':<6} {'params':<30} {'build_s':>8} {'mem_MB':>8} "
+        f"{'recall@k':>9} {'p50_ms':>8} {'p95_ms':>8}"
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for index_type, build_params, search_params in configs:
+            indexer = VectorIndexer(index_dir=tmp, index_type=index_type, **build_params)
+
+            t0 = time.perf_counter()
+            indexer.add(corpus, ids=ids)
+            build_s = time.perf_counter() - t0
+            mem_mb = indexer.memory_bytes() / 2 ** 20
+
+            for params in search_params:
+                indexer.set_search_params(**params)
+                found, lat = run_queries(indexer, queries, args.k)
+                if truth is None:
+                    truth = found
+                label = ",".join(f"{k}={v}" for k, v in params.items()) or "-"
+                print(
+                    f"{index_type:<6} {label:<30} {build_s:>8.2f} {mem_mb:>8.1f} "
+                    f"{recall_at_k(found, truth):>9.3f} "
+                    f"{np.percentile(lat, 50):>8.3f} {np.percentile(lat, 95):>8.3f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+# indexing/bm25_index.py
+
+import re
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+# Identifiers such as "AB-1234", "v2.1" or "ISO/IEC" are kept whole and also
+# split into their parts, so both "ab-1234" and "1234" match.
+_TOKEN_RE = re.compile(r"\w+(?:[.\-/]\w+)*")
+_PART_RE = re.compile(r"[.\-/]")
+
+MAX_TOKEN_CHARS = 64
+
+# Very frequent words carry almost no BM25 weight but have the longest
+# posting lists, so they are not indexed at all.
+STOPWORDS = frozenset(
+    """
+    a an and are as at be but by for from has have in is it its of on or
+    that the their there these this to was were which will with
+    """.split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for match in _TOKEN_RE.finditer(text.lower()):
+        token = match.group()
+        if len(token) > MAX_TOKEN_CHARS:
+            continue
+        if token not in STOPWORDS:
+            tokens.append(token)
+        parts = _PART_RE.split(token)
+        if len(parts) > 1:
+            tokens.extend(p for p in parts if p and p not in STOPWORDS)
+    return tokens
+
+
+class BM25Index:
+    """
+    Okapi BM25 over chunk texts, keyed by vector_id (same ids as FAISS).
+
+    Postings are stored CSR-style in flat numpy arrays:
+      offsets[t] : offsets[t+1]  -> slice of posting list for term t
+      post_docs                  -> int32 row into doc_ids / doc_lens
+      post_tfs                   -> uint16 term frequency
+    Added documents are buffered in compact arrays and merged into the CSR
+    arrays (vectorized, removed rows dropped) on save() or the next search,
+    so every posting in the CSR arrays belongs to a live document.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+
+        self.vocab: Dict[str, int] = {}
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.post_docs = np.empty(0, dtype=np.int32)
+        self.post_tfs = np.empty(0, dtype=np.uint16)
+        self.doc_ids = np.empty(0, dtype=np.int64)
+        self.doc_lens = np.empty(0, dtype=np.int32)
+        self.live = np.empty(0, dtype=bool)
+
+        # Pending additions, merged lazily
+        self._new_terms = array("i")
+        self._new_docs = array("i")
+        self._new_tfs = array("H")
+        self._new_doc_ids = array("q")
+        self._new_doc_lens = array("i")
+        self._removed: set = set()
+        self._dirty = False
+        self._avgdl = 1.0
+
+    # --------------------------------------------------
+    # Building
+    # --------------------------------------------------
+    def add(self, vector_ids: Iterable[int], texts: Iterable[str]):
+        base = len(self.doc_ids) + len(self._new_doc_ids)
+        for row, (vid, text) in enumerate(zip(vector_ids, texts), start=base):
+            tokens = tokenize(text)
+            counts: Dict[int, int] = {}
+            for token in tokens:
+                term = self.vocab.setdefault(token, len(self.vocab))
+                counts[term] = counts.get(term, 0) + 1
+
+            self._new_doc_ids.append(int(vid))
+            self._new_doc_lens.append(len(tokens))
+            for term, tf in counts.items():
+                self._new_terms.append(term)
+                self._new_docs.append(row)
+                self._new_tfs.append(min(tf, 65535))
+        self._dirty = True
+
+    def remove(self, vector_ids: Iterable[int]) -> int:
+        ids = np.fromiter((int(v) for v in vector_ids), dtype=np.int64)
+        if ids.size == 0:
+            return 0
+        n_removed = 0
+        if self.doc_ids.size:
+            mask = np.isin(self.doc_ids, ids) & self.live
+            n_removed += int(mask.sum())
+            self.live[mask] = False
+        if self._new_doc_ids:
+            pending = np.isin(np.frombuffer(self._new_doc_ids, dtype=np.int64), ids)
+            self._removed.update(np.nonzero(pending)[0].tolist())
+            n_removed += int(pending.sum())
+        self._dirty = self._dirty or n_removed > 0
+        return n_removed
+
+    def _merge(self):
+        """
+        Merge pending documents into the CSR arrays and drop removed rows.
+        """
+        if not self._dirty:
+            return
+
+        n_terms = len(self.vocab)
+
+        old_terms = np.repeat(
+            np.arange(len(self.offsets) - 1, dtype=np.int32), np.diff(self.offsets)
+        )
+        terms = np.concatenate([old_terms, np.frombuffer(self._new_terms, dtype=np.int32)])
+        docs = np.concatenate([self.post_docs, np.frombuffer(self._new_docs, dtype=np.int32)])
+        tfs = np.concatenate([self.post_tfs, np.frombuffer(self._new_tfs, dtype=np.uint16)])
+
+        new_live = np.ones(len(self._new_doc_ids), dtype=bool)
+        if self._removed:
+            new_live[list(self._removed)] = False
+        live = np.concatenate([self.live, new_live])
+        doc_ids = np.concatenate([self.doc_ids, np.frombuffer(self._new_doc_ids, dtype=np.int64)])
+        doc_lens = np.concatenate([self.doc_lens, np.frombuffer(self._new_doc_lens, dtype=np.int32)])
+
+        # Compact away removed documents
+        remap = np.cumsum(live, dtype=np.int64) - 1
+        keep = live[docs]
+        terms, docs, tfs = terms[keep], remap[docs[keep]].astype(np.int32), tfs[keep]
+
+        # Group postings by term; stable sort keeps doc order within a term
+        order = np.argsort(terms, kind="stable")
+        self.post_docs = docs[order]
+        self.post_tfs = tfs[order]
+        self.offsets = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=n_terms), out=self.offsets[1:])
+
+        self.doc_ids = doc_ids[live]
+        self.doc_lens = doc_lens[live]
+        self.live = np.ones(len(self.doc_ids), dtype=bool)
+
+        self._new_terms = array("i")
+        self._new_docs = array("i")
+        self._new_tfs = array("H")
+        self._new_doc_ids = array("q")
+        self._new_doc_lens = array("i")
+        self._removed = set()
+        self._dirty = False
+        self._avgdl = float(self.doc_lens.mean()) if len(self.doc_lens) else 1.0
+
+    # --------------------------------------------------
+    # Search
+    # --------------------------------------------------
+    def search(self, query: str, top_k: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns (scores, vector_ids) of the top_k documents, best first.
+        Only documents containing at least one query term are returned.
+        """
+        self._merge()
+
+        # Repeated query terms count once
+        term_ids = sorted({self.vocab[t] for t in tokenize(query) if t in self.vocab})
+        n_docs = len(self.doc_ids)
+        if not term_ids or n_docs == 0:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+
+        k1, b, avgdl = self.k1, self.b, self._avgdl
+
+        doc_parts, score_parts = [], []
+        for t in term_ids:
+            start, end = self.offsets[t], self.offsets[t + 1]
+            if start == end:
+                continue
+            docs = self.post_docs[start:end]
+            tfs = self.post_tfs[start:end].astype(np.float32)
+            df = end - start
+            idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+            norm = k1 * (1 - b + b * self.doc_lens[docs] / avgdl)
+            doc_parts.append(docs)
+            score_parts.append(idf * tfs * (k1 + 1) / (tfs + norm))
+
+        if not doc_parts:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+
+        docs = np.concatenate(doc_parts)
+        contrib = np.concatenate(score_parts)
+        unique_docs, inverse = np.unique(docs, return_inverse=True)
+        scores = np.bincount(inverse, weights=contrib).astype(np.float32)
+
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return scores[top], self.doc_ids[unique_docs[top]]
+
+    # --------------------------------------------------
+    # Persistence
+    # --------------------------------------------------
+    def save(self, path: Path):
+        self._merge()
+        terms = sorted(self.vocab, key=self.vocab.get)
+        tmp_path = Path(path).with_suffix(".tmp.npz")
+        np.savez(
+            tmp_path,
+            params=np.array([self.k1, self.b]),
+            vocab=np.frombuffer("\n".join(terms).encode("utf-8"), dtype=np.uint8),
+            offsets=self.offsets,
+            post_docs=self.post_docs,
+            post_tfs=self.post_tfs,
+            doc_ids=self.doc_ids,
+            doc_lens=self.doc_lens,
+        )
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "BM25Index":
+        with np.load(path) as data:
+            k1, b = data["params"].tolist()
+            index = cls(k1=k1, b=b)
+            vocab = data["vocab"].tobytes().decode("utf-8")
+            index.vocab = {t: i for i, t in enumerate(vocab.split("\n"))} if vocab else {}
+            index.offsets = data["offsets"]
+            index.post_docs = data["post_docs"]
+            index.post_tfs = data["post_tfs"]
+            index.doc_ids = data["doc_ids"]
+            index.doc_lens = data["doc_lens"]
+        index.live = np.ones(len(index.doc_ids), dtype=bool)
+        if len(index.doc_lens):
+            index._avgdl = float(index.doc_lens.mean())
+        return index
+
+    def memory_bytes(self) -> int:
+        arrays = (self.offsets, self.post_docs, self.post_tfs, self.doc_ids, self.doc_lens)
+        return sum(a.nbytes for a in arrays)
+
+    def stats(self) -> Dict:
+        self._merge()
+        return {
+            "documents": len(self.doc_ids),
+            "terms": len(self.vocab),
+            "postings": len(self.post_docs),
+            "memory_mb": round(self.memory_bytes() / 2 ** 20, 1),
+        }
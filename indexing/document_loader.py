@@ -1,6 +1,12 @@
 # indexing/document_loader.py
 
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
 import fitz  # PyMuPDF
 
 SUPPORTED_EXTENSIONS = {".pdf", ".txt", ".md"}
@@ -9,6 +15,39 @@ PROJECT_ROOT = Path(__file__).resolve().parents[1]
 DATA_DIR = PROJECT_ROOT / "data" / "raw_documents"
 
 
+def iter_document_paths(data_dir: Path = DATA_DIR):
+    """
+    Yields every supported document file under data_dir, in a stable order.
+    """
+    for file_path in sorted(data_dir.rglob("*")):
+        if not file_path.is_file():
+            continue
+        if file_path.suffix.lower() not in SUPPORTED_EXTENSIONS:
+            continue
+        yield file_path
+
+
+def load_document(file_path: Path):
+    """
+    Loads a single PDF/TXT/MD file.
+    Returns a document dict (see load_documents) or None if it has no text.
+    """
+    if file_path.suffix.lower() == ".pdf":
+        with fitz.open(file_path) as doc:
+            text = "".join(page.get_text() for page in doc)
+    else:
+        text = file_path.read_text(encoding="utf-8", errors="ignore")
+
+    if not text.strip():
+        return None
+
+    return {
+        "doc_id": file_path.stem,
+        "text": text,
+        "source": str(file_path),
+    }
+
+
 def load_documents(data_dir: Path = DATA_DIR):
     """
     Loads PDF/TXT/MD documents from the local repository.
@@ -20,32 +59,128 @@ def load_documents(data_dir: Path = DATA_DIR):
     """
     documents = []
 
-    for file_path in data_dir.rglob("*"):
-        if not file_path.is_file():
-            continue
-        if file_path.suffix.lower() not in SUPPORTED_EXTENSIONS:
-            continue
-
-        text = ""
-        if file_path.suffix.lower() == ".pdf":
-            with fitz.open(file_path) as doc:
-                for page in doc:
-                    text += page.get_text()
-        else:
-            text = file_path.read_text(encoding="utf-8", errors="ignore")
-
-        if text.strip():
-            documents.append(
-                {
-                    "doc_id": file_path.stem,
-                    "text": text,
-                    "source": str(file_path),
-                }
-            )
+    for file_path in iter_document_paths(data_dir):
+        doc = load_document(file_path)
+        if doc is not None:
+            documents.append(doc)
 
     return documents
 
 
+# --------------------------------------------------
+# Page-level, parallel extraction
+# --------------------------------------------------
+def _extract_pdf_pages(path: str, start: int, end: int) -> List[str]:
+    """
+    Worker: extract pages [start, end) of one PDF.
+    """
+    with fitz.open(path) as doc:
+        return [doc[i].get_text() for i in range(start, end)]
+
+
+def _page_records(file_path: Path, texts: Iterable[str], first_page: int = 1) -> List[Dict]:
+    return [
+        {
+            "doc_id": file_path.stem,
+            "text": text,
+            "source": str(file_path),
+            "page": page_no,
+        }
+        for page_no, text in enumerate(texts, start=first_page)
+        if text.strip()
+    ]
+
+
+def _text_records(file_path: Path, text: str) -> List[Dict]:
+    if not text.strip():
+        return []
+    return [{"doc_id": file_path.stem, "text": text, "source": str(file_path), "page": None}]
+
+
+def _page_ranges(file_path: Path, pages_per_task: int) -> List[Tuple[int, int]]:
+    with fitz.open(file_path) as doc:
+        n_pages = doc.page_count
+    return [(s, min(s + pages_per_task, n_pages)) for s in range(0, n_pages, pages_per_task)]
+
+
+def iter_file_pages(
+    file_paths: Iterable[Path],
+    workers: Optional[int] = None,
+    pages_per_task: int = 16,
+) -> Iterator[Tuple[Path, List[Dict]]]:
+    """
+    Yields (file_path, page records) per file, in input order.
+
+    PDF pages are extracted in a process pool in slices of pages_per_task,
+    so one large PDF is spread over all workers. Only a bounded number of
+    slices is in flight at once. TXT/MD files become a single record with
+    page=None.
+
+    Page record keys: doc_id, text, source, page (1-based or None).
+
+    Workers are spawned, not forked: this runs from a background thread in
+    the API process, and a fork of a multithreaded process can deadlock on
+    locks other threads held at that moment.
+    """
+    if workers is None:
+        workers = int(os.getenv("LOADER_WORKERS", 0)) or os.cpu_count() or 1
+
+    if workers <= 1:
+        for file_path in file_paths:
+            if file_path.suffix.lower() == ".pdf":
+                with fitz.open(file_path) as doc:
+                    yield file_path, _page_records(file_path, (p.get_text() for p in doc))
+            else:
+                text = file_path.read_text(encoding="utf-8", errors="ignore")
+                yield file_path, _text_records(file_path, text)
+        return
+
+    max_in_flight = workers * 4
+    pending = deque()   # (file_path, [(first_page, future)] or text)
+    in_flight = 0
+
+    def finish(item):
+        file_path, parts = item
+        if isinstance(parts, str):
+            return file_path, _text_records(file_path, parts)
+        records = []
+        for first_page, future in parts:
+            records.extend(_page_records(file_path, future.result(), first_page + 1))
+        return file_path, records
+
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        for file_path in file_paths:
+            if file_path.suffix.lower() == ".pdf":
+                parts = [
+                    (start, executor.submit(_extract_pdf_pages, str(file_path), start, end))
+                    for start, end in _page_ranges(file_path, pages_per_task)
+                ]
+                in_flight += len(parts)
+            else:
+                parts = file_path.read_text(encoding="utf-8", errors="ignore")
+            pending.append((file_path, parts))
+
+            while in_flight > max_in_flight and pending:
+                item = pending.popleft()
+                if not isinstance(item[1], str):
+                    in_flight -= len(item[1])
+                yield finish(item)
+
+        while pending:
+            yield finish(pending.popleft())
+
+
+def load_pages(data_dir: Path = DATA_DIR, workers: Optional[int] = None) -> Iterator[Dict]:
+    """
+    Page-level loader: yields one record per PDF page (with page number)
+    and one per TXT/MD file, extracting PDFs in parallel.
+    """
+    for _, records in iter_file_pages(iter_document_paths(data_dir), workers=workers):
+        yield from records
+
+
 if __name__ == "__main__":
     docs = load_documents(DATA_DIR)
     print(f"Loaded {len(docs)} documents")
@@ -0,0 +1,100 @@
+# indexing/embedding_backends.py
+
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# Inference backends for the embedding model (EMBED_BACKEND):
+#   torch       : SentenceTransformer on PyTorch, fp32 (reference)
+#   torch-int8  : same model with nn.Linear layers dynamically quantized to
+#                 int8 (weights int8, activations quantized per batch)
+#   onnx        : ONNX Runtime, fp32 graph
+#   onnx-int8   : ONNX Runtime, dynamically int8-quantized graph
+# All backends return L2-normalized float32 vectors from the same model,
+# so they can query (and add to) an index built with any of the others.
+EMBED_BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+
+ONNX_DIR = Path("data/models")
+
+# Quantization presets of sentence_transformers.export_dynamic_quantized_onnx_model
+ONNX_QUANT_CONFIGS = ("arm64", "avx2", "avx512", "avx512_vnni")
+
+
+def embed_threads() -> int:
+    # EMBED_THREADS=0 keeps the runtime default (all cores)
+    return int(os.getenv("EMBED_THREADS", 0))
+
+
+def _load_torch(name: str, quantize: bool, threads: int):
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    if threads:
+        torch.set_num_threads(threads)
+
+    model = SentenceTransformer(name, device="cpu", trust_remote_code=True)
+    if quantize:
+        torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return model
+
+
+def _onnx_dir(name: str) -> Path:
+    return Path(os.getenv("EMBED_ONNX_DIR", ONNX_DIR)) / name.replace("/", "--")
+
+
+def _onnx_session_kwargs(threads: int) -> Dict[str, Any]:
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    if threads:
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+    return {"provider": "CPUExecutionProvider", "session_options": options}
+
+
+def _export_onnx(name: str, model_dir: Path, quant_config: Optional[str]):
+    """
+    Export the model to ONNX under model_dir (once), and optionally the
+    dynamically quantized int8 graph next to it.
+    """
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    print(f"Exporting {name} to ONNX in {model_dir} (one-off)")
+    model = SentenceTransformer(name, backend="onnx", trust_remote_code=True)
+    if not (model_dir / "onnx" / "model.onnx").exists():
+        model.save(str(model_dir))
+    if quant_config is not None:
+        export_dynamic_quantized_onnx_model(model, quant_config, str(model_dir))
+
+
+def _load_onnx(name: str, quantize: bool, threads: int):
+    from sentence_transformers import SentenceTransformer
+
+    quant_config = os.getenv("EMBED_ONNX_QUANT", "avx2") if quantize else None
+    if quant_config is not None and quant_config not in ONNX_QUANT_CONFIGS:
+        raise ValueError(f"Unknown EMBED_ONNX_QUANT {quant_config!r}, expected one of {ONNX_QUANT_CONFIGS}")
+
+    model_dir = _onnx_dir(name)
+    file_name = f"onnx/model_qint8_{quant_config}.onnx" if quant_config else "onnx/model.onnx"
+    if not (model_dir / file_name).exists():
+        _export_onnx(name, model_dir, quant_config)
+
+    return SentenceTransformer(
+        str(model_dir),
+        backend="onnx",
+        trust_remote_code=True,
+        model_kwargs={"file_name": file_name, **_onnx_session_kwargs(threads)},
+    )
+
+
+def load_embedding_model(name: str, backend: str, threads: Optional[int] = None):
+    """
+    SentenceTransformer for name on the given backend; encode() behaves the
+    same on all of them.
+    """
+    threads = embed_threads() if threads is None else threads
+    if backend in ("torch", "torch-int8"):
+        return _load_torch(name, backend == "torch-int8", threads)
+    if backend in ("onnx", "onnx-int8"):
+        return _load_onnx(name, backend == "onnx-int8", threads)
+    raise ValueError(f"Unknown EMBED_BACKEND {backend!r}, expected one of {EMBED_BACKENDS}")
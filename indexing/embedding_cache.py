@@ -0,0 +1,281 @@
+# indexing/embedding_cache.py
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+EMBEDDING_CACHE_DIR = Path("data/embedding_cache")
+
+KEY_BYTES = 16
+KEY_DTYPE = np.dtype(f"S{KEY_BYTES}")
+
+# New keys are looked up in a dict and folded into the sorted arrays once
+# there are this many
+MERGE_EVERY = 65536
+
+
+def content_key(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=KEY_BYTES).digest()
+
+
+def _padded(key: bytes) -> bytes:
+    # numpy strips trailing NUL bytes from S16 items
+    return bytes(key).ljust(KEY_BYTES, b"\0")
+
+
+def content_keys(texts: Iterable[str]) -> np.ndarray:
+    return np.array([content_key(t) for t in texts], dtype=KEY_DTYPE)
+
+
+class EmbeddingCache:
+    """
+    Disk-backed cache of chunk embeddings for one model, keyed by a 128-bit
+    BLAKE2b hash of the chunk text.
+
+    Layout under cache_dir:
+      cache.json            model, dim and the current generation
+      vectors.gNNNNNN.f32   float32 rows, append-only, memory-mapped
+      keys.gNNNNNN.bin      16-byte content key of each row, same order
+    Rows are appended vectors first, keys second, so a crash can only
+    leave a partial tail, which is cut off on the next open. gc() writes
+    the surviving rows to a new generation and switches cache.json to it.
+
+    Lookups use the keys sorted once at open (binary search), plus a dict
+    of keys added since. The row-ordered key array grows geometrically, so
+    appends cost amortized O(1) per key.
+    """
+
+    def __init__(self, cache_dir: Path, model: str):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.config_path = self.cache_dir / "cache.json"
+        self.model = model
+
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.gc_runs = 0
+        self.gc_reclaimed = 0
+
+        self.dim: Optional[int] = None
+        self.generation = 0
+        if self.config_path.exists():
+            config = json.loads(self.config_path.read_text(encoding="utf-8"))
+            if config["model"] != model:
+                raise ValueError(f"{self.cache_dir} holds embeddings of {config['model']!r}, not {model!r}")
+            self.dim = config["dim"]
+            self.generation = config["generation"]
+        self._open()
+
+    # --------------------------------------------------
+    # Files
+    # --------------------------------------------------
+    def _paths(self, generation: int) -> Tuple[Path, Path]:
+        return (
+            self.cache_dir / f"vectors.g{generation:06d}.f32",
+            self.cache_dir / f"keys.g{generation:06d}.bin",
+        )
+
+    def _write_config(self):
+        tmp_path = self.config_path.with_suffix(".json.tmp")
+        tmp_path.write_text(
+            json.dumps({"model": self.model, "dim": self.dim, "generation": self.generation}),
+            encoding="utf-8",
+        )
+        os.replace(tmp_path, self.config_path)
+
+    def _open(self):
+        self.vectors_path, self.keys_path = self._paths(self.generation)
+        self._rows = 0
+        self._key_buffer = np.empty(0, dtype=KEY_DTYPE)
+        if self.dim is not None and self.vectors_path.exists() and self.keys_path.exists():
+            row_bytes = self.dim * 4
+            self._rows = min(
+                self.vectors_path.stat().st_size // row_bytes,
+                self.keys_path.stat().st_size // KEY_BYTES,
+            )
+            # Drop a partial tail left by an interrupted append
+            for path, size in ((self.vectors_path, row_bytes), (self.keys_path, KEY_BYTES)):
+                with open(path, "r+b") as f:
+                    f.truncate(self._rows * size)
+            self._key_buffer = np.fromfile(self.keys_path, dtype=KEY_DTYPE, count=self._rows)
+
+        order = np.argsort(self._keys, kind="stable")
+        self._sorted_keys = self._keys[order]
+        self._sorted_rows = order.astype(np.int64)
+        self._pending: Dict[bytes, int] = {}
+        self._vectors: Optional[np.memmap] = None
+        self._mapped_rows = 0
+
+    @property
+    def _keys(self) -> np.ndarray:
+        # Key of each row, in row order
+        return self._key_buffer[:self._rows]
+
+    def _append_keys(self, keys: np.ndarray):
+        end = self._rows + len(keys)
+        if end > len(self._key_buffer):
+            buffer = np.empty(max(end, 2 * len(self._key_buffer), 1024), dtype=KEY_DTYPE)
+            buffer[:self._rows] = self._keys
+            self._key_buffer = buffer
+        self._key_buffer[self._rows:end] = keys
+
+    def _map(self) -> np.ndarray:
+        if self._vectors is None or self._mapped_rows != self._rows:
+            self._vectors = np.memmap(
+                self.vectors_path, dtype=np.float32, mode="r", shape=(self._rows, self.dim)
+            )
+            self._mapped_rows = self._rows
+        return self._vectors
+
+    def _merge_pending(self):
+        keys = np.array(list(self._pending), dtype=KEY_DTYPE)
+        rows = np.fromiter(self._pending.values(), dtype=np.int64, count=len(keys))
+        order = np.argsort(keys)
+        keys, rows = keys[order], rows[order]
+        pos = np.searchsorted(self._sorted_keys, keys)
+        self._sorted_keys = np.insert(self._sorted_keys, pos, keys)
+        self._sorted_rows = np.insert(self._sorted_rows, pos, rows)
+        self._pending = {}
+
+    # --------------------------------------------------
+    # Lookup / insert
+    # --------------------------------------------------
+    def _find(self, keys: np.ndarray) -> np.ndarray:
+        """
+        Row of each key, -1 if absent.
+        """
+        rows = np.full(len(keys), -1, dtype=np.int64)
+        if len(self._sorted_keys):
+            pos = np.searchsorted(self._sorted_keys, keys)
+            pos = np.minimum(pos, len(self._sorted_keys) - 1)
+            found = self._sorted_keys[pos] == keys
+            rows[found] = self._sorted_rows[pos[found]]
+        if self._pending:
+            for i in np.nonzero(rows < 0)[0]:
+                rows[i] = self._pending.get(_padded(keys[i]), -1)
+        return rows
+
+    def get(self, keys: np.ndarray) -> Tuple[Optional[np.ndarray], np.ndarray]:
+        """
+        Returns (vectors, found): an (n, dim) array whose rows are valid
+        where found is True (None if the cache is still empty).
+        """
+        with self._lock:
+            rows = self._find(keys)
+            found = rows >= 0
+            self.hits += int(found.sum())
+            self.misses += int(len(keys) - found.sum())
+            if self.dim is None:
+                return None, found
+
+            vectors = np.zeros((len(keys), self.dim), dtype=np.float32)
+            if found.any():
+                hit_rows = rows[found]
+                # Ascending row order keeps memmap reads sequential
+                order = np.argsort(hit_rows)
+                hit_vectors = np.empty((len(hit_rows), self.dim), dtype=np.float32)
+                hit_vectors[order] = self._map()[hit_rows[order]]
+                vectors[found] = hit_vectors
+            return vectors, found
+
+    def put(self, keys: np.ndarray, vectors: np.ndarray):
+        """
+        Append embeddings for keys not yet cached.
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                self._write_config()
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Expected {self.dim}-dim embeddings, got {vectors.shape[1]}")
+
+            new = self._find(keys) < 0
+            keys, vectors = keys[new], vectors[new]
+            # Identical texts within the batch are stored once
+            _, first = np.unique(keys, return_index=True)
+            first.sort()
+            keys, vectors = keys[first], vectors[first]
+            if not len(keys):
+                return
+
+            with open(self.vectors_path, "ab") as f:
+                f.write(vectors.tobytes())
+            with open(self.keys_path, "ab") as f:
+                f.write(keys.tobytes())
+
+            for row, key in enumerate(keys, start=self._rows):
+                self._pending[_padded(key)] = row
+            self._append_keys(keys)
+            self._rows += len(keys)
+            if len(self._pending) >= MERGE_EVERY:
+                self._merge_pending()
+
+    # --------------------------------------------------
+    # Garbage collection / accounting
+    # --------------------------------------------------
+    def gc(self, live_keys: np.ndarray, block_rows: int = 65536) -> Dict[str, int]:
+        """
+        Keep only rows whose key is in live_keys, compacted into a new
+        generation. Returns the number of rows kept and removed.
+        """
+        with self._lock:
+            keep = np.nonzero(np.isin(self._keys, live_keys))[0]
+            n_removed = self._rows - len(keep)
+            if n_removed == 0:
+                return {"kept": int(len(keep)), "removed": 0}
+
+            old_paths = (self.vectors_path, self.keys_path)
+            new_vectors_path, new_keys_path = self._paths(self.generation + 1)
+            source = self._map()
+            with open(new_vectors_path, "wb") as f:
+                for start in range(0, len(keep), block_rows):
+                    f.write(np.ascontiguousarray(source[keep[start:start + block_rows]]).tobytes())
+            self._keys[keep].tofile(new_keys_path)
+
+            self.generation += 1
+            self._write_config()
+            self._vectors = None
+            for path in old_paths:
+                path.unlink(missing_ok=True)
+            self._open()
+
+            self.gc_runs += 1
+            self.gc_reclaimed += n_removed
+            return {"kept": int(len(keep)), "removed": int(n_removed)}
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def disk_bytes(self) -> int:
+        return sum(p.stat().st_size for p in (self.vectors_path, self.keys_path) if p.exists())
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "model": self.model,
+            "entries": self._rows,
+            "dim": self.dim,
+            "disk_mb": round(self.disk_bytes() / 2 ** 20, 1),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "gc_runs": self.gc_runs,
+            "gc_reclaimed": self.gc_reclaimed,
+        }
+
+
+def open_embedding_cache(model: str, backend: str, cache_dir: Optional[Path] = None) -> EmbeddingCache:
+    """
+    One cache directory per model and inference backend (their vectors are
+    close but not bit-identical).
+    """
+    cache_dir = Path(cache_dir or os.getenv("EMBED_CACHE_DIR", EMBEDDING_CACHE_DIR))
+    name = f"{model}@{backend}".replace("/", "--")
+    return EmbeddingCache(cache_dir / name, f"{model}@{backend}")
@@ -0,0 +1,158 @@
+# indexing/embedding_scheduler.py
+
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+
+class _Request:
+    __slots__ = ("text", "future", "enqueued_at")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.future: Future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class EmbeddingBatcher:
+    """
+    Dynamic micro-batching for query embeddings.
+
+    Concurrent embed() calls are queued; a single worker thread takes
+    everything waiting (up to max_batch_size) and runs it as one encode call.
+    The worker only holds a batch open for max_wait_ms when there is
+    evidence of concurrency (previous batch > 1 or more requests queued),
+    so an isolated request at low load is encoded immediately.
+    """
+
+    def __init__(
+        self,
+        encode_batch: Callable[[List[str]], np.ndarray],
+        max_wait_ms: float = 5.0,
+        max_batch_size: int = 32,
+    ):
+        self.encode_batch = encode_batch
+        self.max_wait_s = max_wait_ms / 1000
+        self.max_batch_size = max_batch_size
+
+        self._queue: "queue.Queue[Optional[_Request]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._last_batch_size = 0
+
+        self.n_requests = 0
+        self.n_batches = 0
+        self.max_queue_depth = 0
+        self.batch_sizes = Counter()      # power-of-two buckets
+        self.total_queue_wait_s = 0.0
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="embedding-batcher", daemon=True
+                )
+                self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        self._ensure_started()
+        request = _Request(text)
+        self._queue.put(request)
+        self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        return request.future
+
+    def embed(self, text: str, timeout: Optional[float] = None) -> np.ndarray:
+        return self.submit(text).result(timeout=timeout)
+
+    def _collect(self, first: _Request) -> List[_Request]:
+        batch = [first]
+
+        # Take whatever is already waiting
+        while len(batch) < self.max_batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                return batch
+            batch.append(item)
+
+        concurrent = len(batch) > 1 or self._last_batch_size > 1
+        if not concurrent:
+            return batch
+
+        # Under load: hold the batch open briefly for stragglers
+        deadline = time.perf_counter() + self.max_wait_s
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+
+            batch = self._collect(first)
+            t_start = time.perf_counter()
+
+            # Identical concurrent queries are encoded once
+            unique = list(dict.fromkeys(r.text for r in batch))
+            try:
+                vectors = dict(zip(unique, self.encode_batch(unique)))
+                for r in batch:
+                    r.future.set_result(vectors[r.text])
+            except Exception as e:
+                for r in batch:
+                    if not r.future.done():
+                        r.future.set_exception(e)
+
+            self._last_batch_size = len(batch)
+            self.n_requests += len(batch)
+            self.n_batches += 1
+            self.batch_sizes[1 << (len(batch) - 1).bit_length()] += 1
+            self.total_queue_wait_s += sum(t_start - r.enqueued_at for r in batch)
+
+    def close(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "max_queue_depth": self.max_queue_depth,
+            "requests": self.n_requests,
+            "batches": self.n_batches,
+            "avg_batch_size": (
+                round(self.n_requests / self.n_batches, 2) if self.n_batches else None
+            ),
+            "avg_queue_wait_ms": (
+                round(self.total_queue_wait_s / self.n_requests * 1000, 2)
+                if self.n_requests else None
+            ),
+            # bucket upper bound -> number of batches, e.g. {"1": 10, "4": 3}
+            "batch_size_histogram": {
+                str(k): v for k, v in sorted(self.batch_sizes.items())
+            },
+        }
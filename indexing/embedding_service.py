@@ -1,44 +1,184 @@
 # indexing/embedding_service.py
 
-from sentence_transformers import SentenceTransformer
+import os
+import unicodedata
+from typing import List, Optional
+
+from dotenv import load_dotenv
 import numpy as np
 
+from indexing.lru_cache import LRUCache
+from indexing.embedding_scheduler import EmbeddingBatcher
+from indexing.embedding_cache import EmbeddingCache, content_keys
+from indexing.model_registry import (
+    embedding_backend,
+    embedding_model_name,
+    get_embedding_cache,
+    get_embedding_model,
+)
+
+load_dotenv()
+
+
+def normalize_query(query: str) -> str:
+    """
+    Cache key normalization: Unicode NFKC + collapsed whitespace.
+    Case is kept, since the embedding model is case-sensitive.
+    """
+    return " ".join(unicodedata.normalize("NFKC", query).split())
+
 
 class EmbeddingService:
     """
     Vector Embedding Service
     Converts text chunks and queries into dense embeddings.
+    Query embeddings are memoized in a bounded LRU cache.
+
+    The model itself comes from the shared model registry and is loaded on
+    first use, so creating a service is cheap and all services for the
+    same model (retrieval, ingestion) share one copy. backend
+    (EMBED_BACKEND) picks the inference runtime; see embedding_backends.
+
+    Chunk embeddings go through a persistent cache keyed by chunk text
+    (EMBED_CACHE=0 disables), so re-embedding unchanged text is a disk read.
     """
 
-    def __init__(self, model_name: str = "BAAI/bge-m3"):
-        self.model = SentenceTransformer(
-            model_name,
-            trust_remote_code=True
-        )
+    def __init__(
+        self,
+        model_name: Optional[str] = None,
+        backend: Optional[str] = None,
+        query_cache_size: Optional[int] = None,
+        query_cache_ttl_s: Optional[float] = None,
+        embedding_cache: Optional[EmbeddingCache] = None,
+    ):
+        self.model_name = embedding_model_name(model_name)
+        self.backend = embedding_backend(backend)
+        self._embedding_cache = embedding_cache
 
-    def embed_chunks(self, chunks):
-        """
-        Generate embeddings for document chunks.
-        chunks: List[dict] with key 'text'
-        """
-        texts = [c["text"] for c in chunks]
+        if query_cache_size is None:
+            query_cache_size = int(os.getenv("QUERY_CACHE_SIZE", 1024))
+        if query_cache_ttl_s is None:
+            query_cache_ttl_s = float(os.getenv("QUERY_CACHE_TTL_S", 3600)) or None
+
+        self.query_cache = LRUCache(maxsize=query_cache_size, ttl_s=query_cache_ttl_s)
 
+        # Micro-batching of concurrent query embeddings (EMBED_BATCHING=0 disables)
+        self.batcher = None
+        if os.getenv("EMBED_BATCHING", "1") == "1":
+            self.batcher = EmbeddingBatcher(
+                self._encode_queries,
+                max_wait_ms=float(os.getenv("EMBED_BATCH_WAIT_MS", 5)),
+                max_batch_size=int(os.getenv("EMBED_MAX_BATCH", 32)),
+            )
+
+    @property
+    def model(self):
+        return get_embedding_model(self.model_name, self.backend)
+
+    @property
+    def embedding_cache(self) -> Optional[EmbeddingCache]:
+        # One shared instance per model/backend in the process, opened on first use
+        if self._embedding_cache is None and os.getenv("EMBED_CACHE", "1") == "1":
+            self._embedding_cache = get_embedding_cache(self.model_name, self.backend)
+        return self._embedding_cache
+
+    def _encode_chunks(self, texts: List[str], show_progress_bar: bool) -> np.ndarray:
         embeddings = self.model.encode(
             texts,
             batch_size=16,
-            show_progress_bar=True,
+            show_progress_bar=show_progress_bar,
             normalize_embeddings=True
         )
 
         return np.array(embeddings)
 
-    def embed_query(self, query: str):
+    def embed_chunks(self, chunks, show_progress_bar: bool = True):
         """
-        Generate embedding for a user query.
+        Generate embeddings for document chunks.
+        chunks: List[dict] with key 'text'
+        Only texts missing from the embedding cache are encoded (each once).
         """
-        embedding = self.model.encode(
-            query,
-            normalize_embeddings=True
+        texts = [c["text"] for c in chunks]
+
+        cache = self.embedding_cache
+        if cache is None or not texts:
+            return self._encode_chunks(texts, show_progress_bar)
+
+        keys = content_keys(texts)
+        embeddings, found = cache.get(keys)
+        missing = np.nonzero(~found)[0]
+        if embeddings is not None and len(missing) == 0:
+            return embeddings
+
+        _, first, inverse = np.unique(keys[missing], return_index=True, return_inverse=True)
+        encoded = self._encode_chunks([texts[missing[i]] for i in first], show_progress_bar)
+        cache.put(keys[missing[first]], encoded)
+
+        if embeddings is None:
+            embeddings = np.empty((len(texts), encoded.shape[1]), dtype=np.float32)
+        embeddings[missing] = encoded[inverse]
+        return embeddings
+
+    def _encode_queries(self, texts: List[str]) -> np.ndarray:
+        return np.asarray(
+            self.model.encode(
+                texts,
+                batch_size=len(texts),
+                normalize_embeddings=True
+            )
         )
 
+    def embed_query(self, query: str):
+        """
+        Generate embedding for a user query (cached).
+        """
+        text = normalize_query(query)
+        key = (self.model_name, text)
+
+        embedding = self.query_cache.get(key)
+        if embedding is not None:
+            return embedding
+
+        if self.batcher is not None:
+            embedding = self.batcher.embed(text)
+        else:
+            embedding = self.model.encode(
+                text,
+                normalize_embeddings=True
+            )
+
+        # Shared between callers, so make it immutable
+        embedding = np.array(embedding)
+        embedding.flags.writeable = False
+        self.query_cache.put(key, embedding)
+
         return embedding
+
+    def embed_queries(self, queries: List[str], batch_size: int = 64) -> np.ndarray:
+        """
+        Embed many queries at once: cached ones are reused, the distinct
+        misses go through a single batched encode call.
+        Returns an (n_queries, dim) array in input order.
+        """
+        texts = [normalize_query(q) for q in queries]
+        vectors = {}
+
+        for text in set(texts):
+            embedding = self.query_cache.get((self.model_name, text))
+            if embedding is not None:
+                vectors[text] = embedding
+
+        misses = [t for t in dict.fromkeys(texts) if t not in vectors]
+        if misses:
+            embeddings = self.model.encode(
+                misses,
+                batch_size=batch_size,
+                normalize_embeddings=True
+            )
+            for text, embedding in zip(misses, np.asarray(embeddings)):
+                embedding = embedding.copy()
+                embedding.flags.writeable = False
+                self.query_cache.put((self.model_name, text), embedding)
+                vectors[text] = embedding
+
+        return np.stack([vectors[t] for t in texts])
@@ -1,59 +1,587 @@
 # indexing/indexing_pipeline.py
 
+import os
+import threading
+import time
 from pathlib import Path
+from typing import Callable, Dict, Any, Iterator, List, Optional
 
-from indexing.document_loader import load_documents, DATA_DIR
+import numpy as np
+
+from indexing.document_loader import (
+    iter_document_paths,
+    iter_file_pages,
+    load_document,
+    DATA_DIR,
+)
 from indexing.text_chunker import chunk_documents
+from indexing.embedding_cache import EmbeddingCache, content_keys
 from indexing.embedding_service import EmbeddingService
 from indexing.vector_indexer import VectorIndexer
-from database.metadata_store import MetadataStore
+from indexing.ingest_manifest import IngestManifest
+from indexing.bm25_index import BM25Index
+from indexing.ingest_lock import IngestLock
+from indexing.metrics import record_ingest, update_ingest_throughput
+from indexing.stream_pipeline import PipelineCancelled, StreamPipeline
+from database.metadata_backend import MetadataBackend, open_metadata_store
+
+INDEX_DIR = Path("data/vector_index")
+# Manifests are published with the index version they describe
+# (index_config.json "manifest_file"); this name is only read for indexes
+# written before that
+MANIFEST_FILENAME = "ingest_manifest.json"
+
+
+class IngestRemovalError(RuntimeError):
+    """
+    The run would drop all or most of the indexed documents; usually
+    data_dir points at the wrong place or an unmounted volume.
+    """
+
+
+def run_indexing_pipeline(
+    incremental: bool = True,
+    data_dir: Path = DATA_DIR,
+    index_dir: Path = INDEX_DIR,
+    metadata_batch_size: int = 1000,
+    loader_mode: Optional[str] = None,
+    loader_workers: Optional[int] = None,
+    embed_batch_size: Optional[int] = None,
+    checkpoint_chunks: Optional[int] = None,
+    queue_size: Optional[int] = None,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    cancel_event: Optional[threading.Event] = None,
+    allow_remove_all: bool = False,
+) -> Dict[str, Any]:
+    """
+    Index documents under data_dir.
+
+    data_dir must exist. A run that would remove every indexed document, or
+    more than INGEST_MAX_REMOVE_RATIO of them (default 0.5), raises
+    IngestRemovalError before anything is deleted, unless allow_remove_all
+    is set.
+
+    Only one ingest per index_dir runs at a time: the writer lock is taken
+    for the whole run, and IngestLockError is raised if another process or
+    thread holds it.
+
+    Stages (load -> chunk -> embed -> index + metadata) run concurrently and
+    are connected by bounded queues of queue_size items, so memory does not
+    grow with the corpus. Embedding runs in batches of embed_batch_size
+    chunks; progress is committed every checkpoint_chunks chunks.
 
+    loader_mode="page" (default, LOADER_MODE) extracts PDFs page by page in a
+    process pool and records page numbers; "document" loads whole files.
 
-def run_indexing_pipeline():
+    incremental=True  : only new/changed files are chunked and embedded,
+                        using the ingest manifest published with the index.
+                        This is also how an interrupted run resumes.
+    incremental=False : full rebuild (fresh index, metadata table cleared).
+                        Also used when files changed or were removed and
+                        the index type cannot remove vectors (HNSW).
+
+    Chunk embeddings are served from the embedding cache where the chunk
+    text is unchanged. Cache entries no live chunk uses are dropped after a
+    full rebuild; after an incremental run only if EMBED_CACHE_GC_INCREMENTAL=1,
+    the run added vectors and the cache holds more than EMBED_CACHE_GC_RATIO
+    entries per indexed vector. A run that leaves the index empty never
+    collects, so re-ingesting after a bad run stays a disk read.
+
+    progress, if given, is called about once a second with files/chunks
+    done, per-stage throughput and an ETA. Setting cancel_event stops the
+    run and raises PipelineCancelled; checkpoints committed before that
+    stay, and the next incremental run continues from them.
+
+    Per-stage throughput and run outcomes are exported as metrics (see
+    indexing.metrics).
+    """
+    with IngestLock(index_dir):
+        try:
+            stats = _run_indexing_pipeline(
+                incremental,
+                data_dir,
+                index_dir,
+                metadata_batch_size,
+                loader_mode,
+                loader_workers,
+                embed_batch_size,
+                checkpoint_chunks,
+                queue_size,
+                progress,
+                cancel_event,
+                allow_remove_all,
+            )
+        except PipelineCancelled:
+            record_ingest("cancelled")
+            raise
+        except Exception:
+            record_ingest("failed")
+            raise
+    record_ingest("succeeded", stats["stages"])
+    return stats
+
+
+def _run_indexing_pipeline(
+    incremental: bool,
+    data_dir: Path,
+    index_dir: Path,
+    metadata_batch_size: int,
+    loader_mode: Optional[str],
+    loader_workers: Optional[int],
+    embed_batch_size: Optional[int],
+    checkpoint_chunks: Optional[int],
+    queue_size: Optional[int],
+    progress: Optional[Callable[[Dict[str, Any]], None]],
+    cancel_event: Optional[threading.Event],
+    allow_remove_all: bool,
+) -> Dict[str, Any]:
     print("=== STARTING INDEXING PIPELINE ===")
+    t_start = time.perf_counter()
+
+    # A missing data_dir would look like every document was deleted
+    data_dir = Path(data_dir)
+    if not data_dir.exists():
+        raise FileNotFoundError(f"data_dir {data_dir} does not exist")
+    if not data_dir.is_dir():
+        raise NotADirectoryError(f"data_dir {data_dir} is not a directory")
+
+    loader_mode = loader_mode or os.getenv("LOADER_MODE", "page")
+    embed_batch_size = embed_batch_size or int(os.getenv("INGEST_EMBED_BATCH", 256))
+    checkpoint_chunks = checkpoint_chunks or int(os.getenv("INGEST_CHECKPOINT_CHUNKS", 5000))
+    queue_size = queue_size or int(os.getenv("INGEST_QUEUE_SIZE", 4))
+
+    indexer = VectorIndexer(index_dir=index_dir)
+    manifest = IngestManifest(Path(index_dir) / MANIFEST_FILENAME, data_dir=data_dir)
 
-    # 1. Load documents
-    documents = load_documents(DATA_DIR)
-    print(f"Loaded {len(documents)} documents")
+    if incremental and indexer.exists():
+        indexer.load()
+        if "manifest_file" in indexer.extra_files:
+            manifest.path = Path(index_dir) / indexer.extra_files["manifest_file"]
 
-    # 2. Chunk documents
-    chunks = chunk_documents(documents)
-    print(f"Generated {len(chunks)} chunks")
+    if incremental and indexer.exists() and manifest.exists():
+        manifest.load()
+    elif incremental:
+        print("No ingest manifest found, falling back to full rebuild")
+        indexer = VectorIndexer(index_dir=index_dir)
+        incremental = False
 
-    # 3. Embed chunks
+    # 1. Scan files against the manifest
+    to_index, stale_by_path, seen_keys, n_skipped, removed_keys = _scan_files(manifest, data_dir)
+
+    if not allow_remove_all:
+        if incremental:
+            _check_removals(len(removed_keys), len(manifest.files))
+        elif not seen_keys and indexer.saved_ntotal():
+            raise IngestRemovalError(
+                f"Full rebuild found no documents in {data_dir} but the published index "
+                f"holds {indexer.saved_ntotal()} vectors; pass allow_remove_all=True to clear it"
+            )
+
+    # Index types that cannot remove vectors (HNSW) can only take new files
+    if incremental and (stale_by_path or removed_keys) and not indexer.supports_remove:
+        print(
+            f"{indexer.params['index_type']} index cannot remove vectors of changed or "
+            "removed files, falling back to full rebuild"
+        )
+        incremental = False
+        indexer = VectorIndexer(index_dir=index_dir)
+        manifest = IngestManifest(Path(index_dir) / MANIFEST_FILENAME, data_dir=data_dir)
+        to_index, stale_by_path, seen_keys, n_skipped, removed_keys = _scan_files(manifest, data_dir)
+
+    removed_ids = [vid for key in removed_keys for vid in manifest.vector_ids(key)]
+
+    print(
+        f"Scanned {len(seen_keys)} files: {len(to_index)} to index, "
+        f"{n_skipped} unchanged, {len(removed_keys)} removed"
+    )
+
+    # BM25 index over the same chunks, for hybrid retrieval (BM25_ENABLED=0 disables)
+    bm25 = None
+    if os.getenv("BM25_ENABLED", "1") == "1":
+        if not incremental:
+            bm25 = BM25Index()
+        elif "bm25_file" in indexer.extra_files:
+            bm25 = BM25Index.load(Path(index_dir) / indexer.extra_files["bm25_file"])
+        else:
+            print("Existing index has no BM25 index; run a full rebuild to enable it")
+
+    # 2-6. Stream: load -> chunk -> embed -> index + metadata, with checkpoints
+    def load_stage(paths):
+        if loader_mode == "page":
+            # Per-page records (real page numbers), PDFs extracted in parallel
+            yield from iter_file_pages(paths, workers=loader_workers)
+        else:
+            for file_path in paths:
+                doc = load_document(file_path)
+                yield file_path, [doc] if doc is not None else []
+
+    def chunk_stage(items):
+        for file_path, docs in items:
+            yield file_path, chunk_documents(docs)
+
+    # The model is shared with retrieval and only loaded if something has to
+    # be encoded
     embedder = EmbeddingService()
-    embeddings = embedder.embed_chunks(chunks)
-    print(f"Generated embeddings with shape {embeddings.shape}")
 
-    # 4. Create FAISS index
-    index_dir = Path("data/vector_index")
-    indexer = VectorIndexer(index_dir=index_dir)
+    def embed_stage(items):
+        # Batches span files, so many small files still fill a batch
+        buffer, n_buffered = [], 0
 
-    vector_ids = list(range(len(chunks)))
-    indexer.add(embeddings, ids=vector_ids)
-    indexer.save()
-    print("FAISS index saved")
-
-    # 5. Store metadata in MySQL
-    db = MetadataStore()
-
-    inserted = 0
-    for chunk, vid in zip(chunks, vector_ids):
-        metadata = {
-            "chunk_id": chunk["chunk_id"],
-            "vector_id": vid,
-            "document_name": chunk["doc_id"],
-            "page_or_section": None,
-            "chunk_text": chunk["text"],
-        }
-        db.insert_chunk_metadata(metadata)
-        inserted += 1
-
-    db.close()
-    print(f"Inserted {inserted} metadata rows")
+        def flush():
+            chunks = [c for _, file_chunks in buffer for c in file_chunks]
+            embeddings = None
+            if chunks:
+                embeddings = embedder.embed_chunks(chunks, show_progress_bar=False)
+            offset = 0
+            for file_path, file_chunks in buffer:
+                n = len(file_chunks)
+                file_embeddings = embeddings[offset:offset + n] if n else None
+                offset += n
+                yield file_path, file_chunks, file_embeddings
+
+        for file_path, chunks in items:
+            buffer.append((file_path, chunks))
+            n_buffered += len(chunks)
+            if n_buffered >= embed_batch_size:
+                yield from flush()
+                buffer, n_buffered = [], 0
+        yield from flush()
+
+    writer = _CheckpointWriter(
+        indexer,
+        manifest,
+        bm25=bm25,
+        sha_by_path=dict(to_index),
+        stale_by_path=stale_by_path,
+        incremental=incremental,
+        checkpoint_chunks=checkpoint_chunks,
+        metadata_batch_size=metadata_batch_size,
+    )
+    # Removed files are dropped in the first checkpoint
+    writer.remove_files(removed_keys, removed_ids)
+
+    pipeline = (
+        StreamPipeline(queue_size=queue_size)
+        .add_stage("load", load_stage, unit="pages", count=lambda item: len(item[1]))
+        .add_stage("chunk", chunk_stage, unit="chunks", count=lambda item: len(item[1]))
+        .add_stage("embed", embed_stage, unit="chunks", count=lambda item: len(item[1]))
+        .add_stage("write", writer.write, unit="chunks", count=lambda n: n)
+    )
+
+    def report(stage_stats: Dict[str, Dict[str, Any]]):
+        update_ingest_throughput(stage_stats)
+        if progress is None:
+            return
+        files_done = stage_stats["write"]["items"]
+        elapsed = time.perf_counter() - t_start
+        remaining = len(to_index) - files_done
+        progress({
+            "files_total": len(to_index),
+            "files_done": files_done,
+            "chunks_done": writer.n_chunks,
+            "checkpoints": writer.n_checkpoints,
+            "pages_per_s": stage_stats["load"]["units_per_s"],
+            "embeddings_per_s": stage_stats["embed"]["units_per_s"],
+            "elapsed_s": round(elapsed, 1),
+            "eta_s": round(elapsed / files_done * remaining, 1) if files_done else None,
+            "stages": stage_stats,
+        })
+
+    cache = embedder.embedding_cache
+    try:
+        stage_stats = pipeline.run(
+            [file_path for file_path, _ in to_index],
+            cancel=cancel_event,
+            on_progress=report,
+        )
+        writer.finish()
+        if cache is not None:
+            _collect_embedding_cache(cache, writer, incremental)
+    finally:
+        writer.close()
+
+    if writer.n_checkpoints:
+        print(f"Inserted {writer.inserted} metadata rows in {writer.n_checkpoints} checkpoint(s)")
+    else:
+        print("Nothing changed since last run")
+
+    for name, st in stage_stats.items():
+        print(f"  {name:<6} {st['units']:>8} {st['unit']:<7} {st['units_per_s'] or '-':>9} /s")
 
     print("=== INDEXING PIPELINE COMPLETED ===")
 
+    return {
+        "mode": "incremental" if incremental else "full",
+        "documents_scanned": len(seen_keys),
+        "documents_indexed": len(to_index),
+        "documents_skipped": n_skipped,
+        "documents_removed": len(removed_keys),
+        "chunks": writer.n_chunks,
+        "embedding_dim": writer.dim,
+        "vectors_added": writer.n_added,
+        "vectors_removed": writer.n_removed,
+        "total_vectors": indexer.ntotal,
+        "metadata_rows_inserted": writer.inserted,
+        "checkpoints": writer.n_checkpoints,
+        "bm25": bm25.stats() if bm25 is not None else None,
+        "embedding_cache": cache.stats() if cache is not None else None,
+        "stages": stage_stats,
+    }
+
+
+def _scan_files(manifest: IngestManifest, data_dir: Path):
+    """
+    Classify every file under data_dir against the manifest. Returns
+    (to_index [(file_path, sha256)], stale_by_path {changed file: vector
+    ids of its previous version}, seen_keys, n_skipped, removed_keys).
+    """
+    to_index = []
+    stale_by_path = {}
+    seen_keys = set()
+    n_skipped = 0
+
+    for file_path in iter_document_paths(data_dir):
+        key = manifest.key_for(file_path)
+        seen_keys.add(key)
+
+        status, sha = manifest.classify(file_path)
+        if status == "unchanged":
+            n_skipped += 1
+            continue
+        if status == "changed":
+            stale_by_path[file_path] = manifest.vector_ids(key)
+        to_index.append((file_path, sha))
+
+    removed_keys = [k for k in manifest.files if k not in seen_keys]
+    return to_index, stale_by_path, seen_keys, n_skipped, removed_keys
+
+
+def _check_removals(n_removed: int, n_indexed: int):
+    """
+    Refuse to drop every indexed document, or more than
+    INGEST_MAX_REMOVE_RATIO of them.
+    """
+    if not n_removed:
+        return
+    max_ratio = float(os.getenv("INGEST_MAX_REMOVE_RATIO", 0.5))
+    if n_removed == n_indexed or n_removed > max_ratio * n_indexed:
+        raise IngestRemovalError(
+            f"Ingest would remove {n_removed} of {n_indexed} indexed documents; check "
+            "data_dir, or pass allow_remove_all=True if they were really deleted"
+        )
+
+
+def _collect_embedding_cache(cache: EmbeddingCache, writer: "_CheckpointWriter", incremental: bool):
+    """
+    Drop cache entries that no chunk in the index uses any more.
+    """
+    if writer.indexer.ntotal == 0:
+        return
+    if not incremental:
+        # Every live chunk went through this run
+        if not writer.n_checkpoints:
+            return
+        live = np.concatenate(writer.chunk_keys) if writer.chunk_keys else content_keys([])
+    else:
+        # Opt-in: a run that only removed documents would take the
+        # embeddings needed to restore them
+        if os.getenv("EMBED_CACHE_GC_INCREMENTAL", "0") != "1" or not writer.n_added:
+            return
+        ratio = float(os.getenv("EMBED_CACHE_GC_RATIO", 1.5))
+        if len(cache) <= ratio * max(writer.indexer.ntotal, 1):
+            return
+        if writer.db is None:
+            writer.db = open_metadata_store()
+        live = content_keys(writer.db.iter_chunk_texts())
+
+    result = cache.gc(live)
+    if result["removed"]:
+        print(f"Embedding cache: dropped {result['removed']} unused entries, kept {result['kept']}")
+
+
+class _CheckpointWriter:
+    """
+    Sink stage of the streaming pipeline: adds each file's vectors to the
+    in-memory index and buffers its metadata rows. Every checkpoint_chunks
+    chunks it commits a checkpoint: metadata rows and the index save in one
+    metadata transaction. The manifest (file ranges, next vector id) is
+    published with the index version, so the two never disagree after a
+    crash and vector ids are never handed out twice. An interrupted run
+    therefore resumes from the last checkpoint; the next incremental run
+    skips the files already committed.
+
+    The BM25 index, if any, gets the same additions and removals and is
+    published with each index version.
+
+    Trained index types (IVF, SQ, PQ) are created from the first
+    checkpoint_chunks vectors rather than from the first small file.
+    """
+
+    def __init__(
+        self,
+        indexer: VectorIndexer,
+        manifest: IngestManifest,
+        bm25: Optional[BM25Index],
+        sha_by_path: Dict[Path, str],
+        stale_by_path: Dict[Path, List[int]],
+        incremental: bool,
+        checkpoint_chunks: int,
+        metadata_batch_size: int,
+    ):
+        self.indexer = indexer
+        self.manifest = manifest
+        self.bm25 = bm25
+        self.sha_by_path = sha_by_path
+        self.stale_by_path = stale_by_path
+        self.incremental = incremental
+        self.checkpoint_chunks = checkpoint_chunks
+        self.metadata_batch_size = metadata_batch_size
+        self.db: Optional[MetadataBackend] = None
+
+        self._train_buffer = []     # (file_path, chunks, embeddings) until trained
+        self._n_train_buffered = 0
+        self._rows = []
+        self._stale_ids = []
+        self._n_pending = 0
+        self._dirty = not incremental  # a full rebuild always commits once
+
+        self.dim = None
+        self.n_chunks = 0
+        self.n_added = 0
+        self.n_removed = 0
+        self.inserted = 0
+        self.n_checkpoints = 0
+        # Content keys of every chunk written by a full rebuild (for cache GC)
+        self.chunk_keys: List[np.ndarray] = []
+
+    def remove_files(self, keys: List[str], stale_ids: List[int]):
+        for key in keys:
+            self.manifest.remove(key)
+        self._remove_ids(stale_ids)
+        self._dirty = self._dirty or bool(keys)
+
+    def _remove_ids(self, stale_ids: List[int]):
+        self.n_removed += self.indexer.remove(stale_ids)
+        if self.bm25 is not None:
+            self.bm25.remove(stale_ids)
+        self._stale_ids.extend(stale_ids)
+
+    def write(self, items) -> Iterator[int]:
+        for file_path, chunks, embeddings in items:
+            self.n_chunks += len(chunks)
+            if embeddings is not None and self.dim is None:
+                self.dim = int(embeddings.shape[1])
+
+            if self.indexer.needs_training:
+                self._train_buffer.append((file_path, chunks, embeddings))
+                self._n_train_buffered += len(chunks)
+                if self._n_train_buffered >= self.checkpoint_chunks:
+                    self._flush_train_buffer()
+            else:
+                self._add_file(file_path, chunks, embeddings)
+
+            if self._n_pending >= self.checkpoint_chunks:
+                self.checkpoint()
+            yield len(chunks)
+
+    def _flush_train_buffer(self):
+        buffered, self._train_buffer = self._train_buffer, []
+        self._n_train_buffered = 0
+        sample = [e for _, _, e in buffered if e is not None]
+        if sample and self.indexer.needs_training:
+            self.indexer.train(np.vstack(sample))
+        for file_path, chunks, embeddings in buffered:
+            self._add_file(file_path, chunks, embeddings)
+
+    def _add_file(self, file_path: Path, chunks: List[Dict], embeddings):
+        # Fresh, never-reused vector IDs per file
+        ids = self.manifest.allocate_ids(len(chunks))
+        if not self.incremental:
+            self.chunk_keys.append(content_keys(chunk["text"] for chunk in chunks))
+        self.manifest.record(file_path, self.sha_by_path[file_path], file_path.stem, ids)
+
+        self._remove_ids(self.stale_by_path.get(file_path, []))
+        if embeddings is not None:
+            self.indexer.add(embeddings, ids=ids)
+            self.n_added += len(ids)
+        if self.bm25 is not None:
+            self.bm25.add(ids, (chunk["text"] for chunk in chunks))
+
+        self._rows.extend(
+            {
+                "chunk_id": chunk["chunk_id"],
+                "vector_id": vid,
+                "document_name": chunk["doc_id"],
+                "page_or_section": chunk.get("page_or_section"),
+                "chunk_text": chunk["text"],
+            }
+            for chunk, vid in zip(chunks, ids)
+        )
+        self._n_pending += len(chunks)
+        self._dirty = True
+
+    def checkpoint(self):
+        """
+        Commit everything written since the last checkpoint. The index is
+        saved inside the metadata transaction, so a failure on either side
+        rolls the rows back; the manifest is a companion file of the index
+        version.
+        """
+        if not self._dirty:
+            return
+        if self.db is None:
+            self.db = open_metadata_store()
+
+        with self.db.transaction():
+            if not self.incremental and self.n_checkpoints == 0:
+                self.db.delete_all_chunks()
+            else:
+                self.db.delete_by_vector_ids(self._stale_ids)
+
+            self.inserted += self.db.insert_chunk_metadata_batch(
+                self._rows, batch_size=self.metadata_batch_size
+            )
+
+            # Always publish, even without an index: after a rebuild of an
+            # empty data_dir the old version must not outlive its rows
+            self.indexer.save(extra_files={**self._save_bm25(), **self._save_manifest()})
+
+        self.n_checkpoints += 1
+        print(
+            f"Checkpoint {self.n_checkpoints}: {self.n_chunks} chunks, "
+            f"{self.indexer.ntotal} vectors in index"
+        )
+        self._rows, self._stale_ids = [], []
+        self._n_pending = 0
+        self._dirty = False
+
+    def _save_bm25(self) -> Dict[str, str]:
+        # Written under the version the index is about to be saved as
+        if self.bm25 is None:
+            return {}
+        name = f"bm25.v{self.indexer.saved_version() + 1:06d}.npz"
+        self.bm25.save(self.indexer.index_dir / name)
+        return {"bm25_file": name}
+
+    def _save_manifest(self) -> Dict[str, str]:
+        name = f"ingest_manifest.v{self.indexer.saved_version() + 1:06d}.json"
+        self.manifest.save(self.indexer.index_dir / name)
+        return {"manifest_file": name}
+
+    def finish(self):
+        if self._train_buffer:
+            self._flush_train_buffer()
+        self.checkpoint()
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+
 
 if __name__ == "__main__":
-    run_indexing_pipeline()
+    import sys
+
+    run_indexing_pipeline(
+        incremental="--full" not in sys.argv,
+        allow_remove_all="--allow-remove-all" in sys.argv,
+    )
@@ -0,0 +1,79 @@
+# indexing/ingest_lock.py
+
+import os
+from pathlib import Path
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:     # Windows
+    fcntl = None
+    import msvcrt
+
+LOCK_FILENAME = "ingest.lock"
+
+
+class IngestLockError(RuntimeError):
+    """
+    Another ingest holds the writer lock for this index.
+    """
+
+
+class IngestLock:
+    """
+    Exclusive, non-blocking writer lock on an index directory, held for a
+    whole ingest. It is an OS file lock, so it covers other API workers and
+    the command-line pipeline too, and it is released by the OS if the
+    holding process dies. The lock file records the holder's pid.
+    """
+
+    def __init__(self, index_dir: Path):
+        self.path = Path(index_dir) / LOCK_FILENAME
+        self._file = None
+
+    def holder_pid(self) -> Optional[int]:
+        try:
+            return int(self.path.read_text().strip() or 0) or None
+        except (OSError, ValueError):
+            return None
+
+    def acquire(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        f = open(self.path, "a+")
+        try:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            f.close()
+            raise IngestLockError(
+                f"Another ingest is running on {self.path.parent} (pid {self.holder_pid()})"
+            )
+        f.seek(0)
+        f.truncate()
+        f.write(str(os.getpid()))
+        f.flush()
+        self._file = f
+
+    def release(self):
+        if self._file is None:
+            return
+        f, self._file = self._file, None
+        f.seek(0)
+        f.truncate()
+        f.flush()
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        f.close()
+
+    def __enter__(self) -> "IngestLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
@@ -0,0 +1,119 @@
+# indexing/ingest_manifest.py
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+MANIFEST_VERSION = 1
+
+
+def file_sha256(file_path: Path, block_size: int = 1 << 20) -> str:
+    """
+    Content hash of a file, read in blocks so large PDFs are not loaded at once.
+    """
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class IngestManifest:
+    """
+    Persistent per-file record of what is already in the vector index.
+
+    Each entry keeps size, mtime, content hash and the vector-id range
+    [vector_id_start, vector_id_end) assigned to the file's chunks.
+    Vector IDs are handed out from a monotonically increasing counter,
+    so they are never reused across runs.
+    """
+
+    def __init__(self, path: Path, data_dir: Path):
+        self.path = Path(path)
+        self.data_dir = Path(data_dir)
+        self.files: Dict[str, Dict] = {}
+        self.next_vector_id = 0
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def load(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.files = data.get("files", {})
+        self.next_vector_id = int(data.get("next_vector_id", 0))
+
+    def save(self, path: Optional[Path] = None):
+        """
+        Write atomically so a crash never leaves a truncated manifest.
+        path defaults to the path it was loaded from.
+        """
+        path = Path(path) if path is not None else self.path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        data = {
+            "version": MANIFEST_VERSION,
+            "next_vector_id": self.next_vector_id,
+            "files": self.files,
+        }
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, path)
+
+    def key_for(self, file_path: Path) -> str:
+        try:
+            return Path(file_path).resolve().relative_to(self.data_dir.resolve()).as_posix()
+        except ValueError:
+            return Path(file_path).resolve().as_posix()
+
+    def classify(self, file_path: Path) -> Tuple[str, Optional[str]]:
+        """
+        Compare a file against its manifest entry.
+        Returns (status, sha256) where status is "new", "changed" or "unchanged".
+        The hash is only computed when size or mtime differ.
+        """
+        entry = self.files.get(self.key_for(file_path))
+        st = file_path.stat()
+
+        if entry is None:
+            return "new", file_sha256(file_path)
+
+        if entry["size"] == st.st_size and entry["mtime"] == st.st_mtime:
+            return "unchanged", entry["sha256"]
+
+        sha = file_sha256(file_path)
+        if sha == entry["sha256"]:
+            # Touched but identical: refresh stat info, keep vectors
+            entry["size"] = st.st_size
+            entry["mtime"] = st.st_mtime
+            return "unchanged", sha
+
+        return "changed", sha
+
+    def allocate_ids(self, n: int) -> List[int]:
+        start = self.next_vector_id
+        self.next_vector_id += n
+        return list(range(start, self.next_vector_id))
+
+    def vector_ids(self, key: str) -> List[int]:
+        entry = self.files.get(key)
+        if entry is None:
+            return []
+        return list(range(entry["vector_id_start"], entry["vector_id_end"]))
+
+    def record(self, file_path: Path, sha256: str, doc_id: str, vector_ids: List[int]):
+        st = file_path.stat()
+        start = vector_ids[0] if vector_ids else self.next_vector_id
+        self.files[self.key_for(file_path)] = {
+            "doc_id": doc_id,
+            "size": st.st_size,
+            "mtime": st.st_mtime,
+            "sha256": sha256,
+            "vector_id_start": start,
+            "vector_id_end": start + len(vector_ids),
+        }
+
+    def remove(self, key: str):
+        self.files.pop(key, None)
@@ -0,0 +1,422 @@
+# indexing/metrics.py
+
+import bisect
+import contextvars
+import math
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds; covers sub-millisecond cache hits up to long generations
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+
+def _format_labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [
+        f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for name, value in zip(names, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+class Histogram:
+    """
+    Prometheus-style histogram (cumulative buckets, sum, count), one series
+    per combination of label values. observe() is a bisect and a few
+    additions under a lock, cheap enough for per-request use.
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], List] = {}    # labels -> [counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def quantile(self, q: float, *label_values: str) -> Optional[float]:
+        """
+        Estimated quantile, interpolated within the bucket (as PromQL's
+        histogram_quantile does). None without observations.
+        """
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None or series[2] == 0:
+                return None
+            counts, _, total = list(series[0]), series[1], series[2]
+
+        rank = q * total
+        cumulative = 0
+        for i, count in enumerate(counts):
+            if cumulative + count >= rank and count:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """
+        {label value(s): {count, mean_ms, p50_ms, p95_ms, p99_ms}} for the dashboard.
+        """
+        out = {}
+        for labels in list(self._series):
+            _, total_s, count = self._series[labels]
+            out["/".join(labels) or self.name] = {
+                "count": count,
+                "mean_ms": round(total_s / count * 1000, 2) if count else None,
+                **{
+                    f"p{int(q * 100)}_ms": round(self.quantile(q, *labels) * 1000, 2)
+                    for q in (0.5, 0.95, 0.99)
+                },
+            }
+        return out
+
+    def collect(self) -> List[str]:
+        lines = []
+        with self._lock:
+            snapshot = [(labels, list(s[0]), s[1], s[2]) for labels, s in self._series.items()]
+        for labels, counts, total_s, count in sorted(snapshot):
+            cumulative = 0
+            for bound, n in zip(self.buckets + (math.inf,), counts):
+                cumulative += n
+                le = _format_labels(self.labelnames, labels, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            label_str = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_str} {_format_value(total_s)}")
+            lines.append(f"{self.name}_count{label_str} {count}")
+        return lines
+
+
+class Counter:
+    """
+    Monotonic counter, one series per combination of label values.
+    """
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, *label_values: str):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in items
+        ]
+
+
+class Gauge(Counter):
+    """
+    Last-set value per combination of label values.
+    """
+
+    type = "gauge"
+
+    def set(self, value: float, *label_values: str):
+        with self._lock:
+            self._values[label_values] = value
+
+
+class CallbackMetric:
+    """
+    Values read at scrape time from existing counters (cache stats etc.),
+    so nothing is added to the code paths that update them.
+    fn() returns {label values tuple: value}.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        type: str,
+        labelnames: Sequence[str],
+        fn: Callable[[], Dict[Tuple[str, ...], float]],
+    ):
+        self.name = name
+        self.help = help
+        self.type = type
+        self.labelnames = tuple(labelnames)
+        self.fn = fn
+
+    def collect(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in sorted(self.fn().items())
+            if value is not None
+        ]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """
+        Register (or replace, e.g. when a controller is recreated) a metric.
+        """
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """
+        All metrics in the Prometheus text exposition format (0.0.4).
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                samples = metric.collect()
+            except Exception as e:      # a broken callback must not break the scrape
+                lines.append(f"# {metric.name} unavailable: {type(e).__name__}")
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_LATENCY = REGISTRY.register(Histogram(
+    "rag_stage_duration_seconds",
+    "Duration of one query-path stage (embedding, search, fetch, rerank, prompt, generation).",
+    labelnames=("stage",),
+))
+REQUEST_LATENCY = REGISTRY.register(Histogram(
+    "rag_request_duration_seconds",
+    "End-to-end controller latency per request.",
+    labelnames=("endpoint",),
+))
+INGEST_RUNS = REGISTRY.register(Counter(
+    "rag_ingest_runs_total", "Ingest runs by outcome.", labelnames=("status",),
+))
+INGEST_UNITS = REGISTRY.register(Counter(
+    "rag_ingest_units_total", "Units processed by each ingest stage.", labelnames=("stage", "unit"),
+))
+INGEST_THROUGHPUT = REGISTRY.register(Gauge(
+    "rag_ingest_stage_units_per_second",
+    "Throughput of each ingest stage in the current or last run.",
+    labelnames=("stage", "unit"),
+))
+
+
+# --------------------------------------------------
+# Per-request traces
+# --------------------------------------------------
+_current_trace: "contextvars.ContextVar[Optional[Trace]]" = contextvars.ContextVar(
+    "rag_trace", default=None
+)
+
+
+class Trace:
+    """
+    Spans of one request: stage, start offset and duration in ms. Spans are
+    added by stage timers while the trace is active (see tracing()); the
+    context is copied into asyncio.to_thread workers, so their spans land
+    here too.
+    """
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+
+    def add(self, stage: str, start: float, duration_s: float):
+        self.spans.append({
+            "stage": stage,
+            "start_ms": round((start - self.t0) * 1000, 3),
+            "duration_ms": round(duration_s * 1000, 3),
+        })
+
+
+class tracing:
+    """
+    with tracing(trace): ... makes trace the active trace (no-op for None).
+    Enter and exit must happen in the same context, so don't keep it open
+    across a generator's yield.
+    """
+
+    __slots__ = ("trace", "_token")
+
+    def __init__(self, trace: Optional[Trace]):
+        self.trace = trace
+        self._token = None
+
+    def __enter__(self):
+        if self.trace is not None:
+            self._token = _current_trace.set(self.trace)
+        return self.trace
+
+    def __exit__(self, *exc):
+        if self._token is not None:
+            _current_trace.reset(self._token)
+
+
+def traced_iter(events: Iterator, trace: Optional[Trace]) -> Iterator:
+    """
+    Iterate a generator with trace active while it runs, but not while
+    the consumer holds a yielded item. Closing the wrapper closes events.
+    """
+    if trace is None:
+        return events
+
+    def wrapper():
+        try:
+            while True:
+                with tracing(trace):
+                    event = next(events, None)
+                if event is None:
+                    return
+                yield event
+        finally:
+            events.close()
+
+    return wrapper()
+
+
+def atraced_iter(events: AsyncIterator, trace: Optional[Trace]) -> AsyncIterator:
+    """
+    Async variant of traced_iter.
+    """
+    if trace is None:
+        return events
+
+    async def wrapper():
+        try:
+            while True:
+                with tracing(trace):
+                    try:
+                        event = await events.__anext__()
+                    except StopAsyncIteration:
+                        return
+                yield event
+        finally:
+            await events.aclose()
+
+    return wrapper()
+
+
+def observe_stage(stage: str, duration_s: float, start: Optional[float] = None):
+    """
+    Record an already measured stage duration (histogram and active trace).
+    """
+    STAGE_LATENCY.observe(duration_s, stage)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(stage, start if start is not None else time.perf_counter() - duration_s, duration_s)
+
+
+class stage_timer:
+    """
+    with stage_timer("faiss_search"): ... times the block into
+    rag_stage_duration_seconds{stage=...} and the active trace, if any.
+    """
+
+    __slots__ = ("stage", "t0")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe_stage(self.stage, time.perf_counter() - self.t0, self.t0)
+
+
+def update_ingest_throughput(stage_stats: Dict[str, Dict[str, Any]]):
+    """
+    Set the per-stage throughput gauges from StreamPipeline stage stats.
+    """
+    for stage, st in stage_stats.items():
+        if st["units_per_s"] is not None:
+            INGEST_THROUGHPUT.set(st["units_per_s"], stage, st["unit"])
+
+
+def record_ingest(status: str, stage_stats: Optional[Dict[str, Dict[str, Any]]] = None):
+    """
+    Count a finished ingest run and fold its per-stage stats into the
+    ingest metrics.
+    """
+    INGEST_RUNS.inc(1, status)
+    for stage, st in (stage_stats or {}).items():
+        INGEST_UNITS.inc(st["units"], stage, st["unit"])
+    if stage_stats:
+        update_ingest_throughput(stage_stats)
+
+
+def cache_metrics(caches: Callable[[], Dict[str, Any]]) -> List[CallbackMetric]:
+    """
+    Hit / miss counters and hit ratio for every object with a stats() dict
+    holding "hits" and "misses"; caches() returns {name: cache or None}.
+    """
+    def read(key: str):
+        def fn():
+            out = {}
+            for name, cache in caches().items():
+                if cache is None:
+                    continue
+                st = cache.stats()
+                lookups = st["hits"] + st["misses"]
+                if key == "ratio":
+                    out[(name,)] = st["hits"] / lookups if lookups else None
+                else:
+                    out[(name,)] = st[key]
+            return out
+        return fn
+
+    return [
+        CallbackMetric("rag_cache_hits_total", "Cache hits.", "counter", ("cache",), read("hits")),
+        CallbackMetric("rag_cache_misses_total", "Cache misses.", "counter", ("cache",), read("misses")),
+        CallbackMetric("rag_cache_hit_ratio", "Cache hit ratio since start.", "gauge", ("cache",), read("ratio")),
+    ]
+
+
+def latency_summary() -> Dict[str, Dict[str, Any]]:
+    return {
+        "stages": STAGE_LATENCY.summary(),
+        "requests": REQUEST_LATENCY.summary(),
+    }
@@ -0,0 +1,186 @@
+# indexing/model_registry.py
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from indexing.embedding_backends import load_embedding_model
+from indexing.embedding_cache import open_embedding_cache
+
+DEFAULT_EMBED_MODEL = "BAAI/bge-m3"
+DEFAULT_RERANK_MODEL = "BAAI/bge-reranker-v2-m3"
+
+# Representative passage for warmup encodes (first-call kernel selection and
+# allocator growth depend on batch shape and length, not on the text itself)
+_WARMUP_TEXT = (
+    "Retrieval-augmented generation answers a question from passages "
+    "retrieved out of a local document collection."
+)
+
+
+def rss_bytes() -> int:
+    """
+    Current resident set size of this process (peak RSS where /proc is
+    not available).
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+class ModelRegistry:
+    """
+    Process-wide registry of loaded models, keyed by (kind, name, variant);
+    variant distinguishes e.g. the inference backends of one model.
+
+    Each model is loaded at most once, on first get() or on preload, and
+    the same instance is handed to every caller (query embedding,
+    ingestion, reranking). Concurrent first calls for the same model wait
+    for a single load. Load time, warmup time and the RSS growth seen
+    across the load are kept for the dashboard; the RSS figure is
+    approximate when other threads allocate at the same time.
+    """
+
+    def __init__(self):
+        self._models: Dict[Tuple[str, str, str], Any] = {}
+        self._stats: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        self._locks: Dict[Tuple[str, str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        kind: str,
+        name: str,
+        loader: Callable[[str], Any],
+        warmup: Optional[Callable[[Any], None]] = None,
+        variant: str = "",
+    ) -> Any:
+        key = (kind, name, variant)
+        model = self._models.get(key)
+        if model is not None:
+            return model
+
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+
+        with lock:
+            model = self._models.get(key)
+            if model is not None:
+                return model
+
+            rss_before = rss_bytes()
+            t0 = time.perf_counter()
+            model = loader(name)
+            t1 = time.perf_counter()
+            if warmup is not None:
+                warmup(model)
+            t2 = time.perf_counter()
+
+            self._stats[key] = {
+                "kind": kind,
+                "name": name,
+                "variant": variant,
+                "load_s": round(t1 - t0, 3),
+                "warmup_s": round(t2 - t1, 3),
+                "rss_delta_mb": round((rss_bytes() - rss_before) / 2 ** 20, 1),
+                "loaded_at": time.time(),
+            }
+            self._models[key] = model
+        return model
+
+    def is_loaded(self, kind: str, name: str, variant: str = "") -> bool:
+        return (kind, name, variant) in self._models
+
+    def clear(self):
+        """
+        Drop all references; models are freed once no caller holds them.
+        """
+        with self._lock:
+            self._models.clear()
+            self._stats.clear()
+            self._locks.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "models": [dict(s) for s in self._stats.values()],
+            "rss_mb": round(rss_bytes() / 2 ** 20, 1),
+        }
+
+
+registry = ModelRegistry()
+
+
+def _warmup_batch() -> int:
+    # MODEL_WARMUP_BATCH=0 disables the warmup encode
+    return int(os.getenv("MODEL_WARMUP_BATCH", 8))
+
+
+def _load_cross_encoder(name: str):
+    # Imports torch; deferred so importing the API does not pay for it
+    from sentence_transformers import CrossEncoder
+
+    return CrossEncoder(name, trust_remote_code=True)
+
+
+def _warmup_embedding(model):
+    n = _warmup_batch()
+    if n > 0:
+        model.encode([_WARMUP_TEXT] * n, batch_size=n, normalize_embeddings=True)
+
+
+def _warmup_cross_encoder(model):
+    n = _warmup_batch()
+    if n > 0:
+        model.predict([("warmup query", _WARMUP_TEXT)] * n, batch_size=n)
+
+
+def embedding_model_name(model_name: Optional[str] = None) -> str:
+    return model_name or os.getenv("EMBED_MODEL", DEFAULT_EMBED_MODEL)
+
+
+def embedding_backend(backend: Optional[str] = None) -> str:
+    return backend or os.getenv("EMBED_BACKEND", "torch")
+
+
+def get_embedding_model(model_name: Optional[str] = None, backend: Optional[str] = None):
+    """
+    Shared SentenceTransformer for model_name (EMBED_MODEL by default) on
+    the given inference backend (EMBED_BACKEND by default).
+    """
+    backend = embedding_backend(backend)
+    return registry.get(
+        "embedding",
+        embedding_model_name(model_name),
+        lambda name: load_embedding_model(name, backend),
+        _warmup_embedding,
+        variant=backend,
+    )
+
+
+def get_cross_encoder(model_name: Optional[str] = None):
+    """
+    Shared CrossEncoder for model_name (RERANK_MODEL by default).
+    """
+    name = model_name or os.getenv("RERANK_MODEL", DEFAULT_RERANK_MODEL)
+    return registry.get("cross_encoder", name, _load_cross_encoder, _warmup_cross_encoder)
+
+
+def get_embedding_cache(model_name: Optional[str] = None, backend: Optional[str] = None):
+    """
+    Shared on-disk chunk embedding cache for a model and backend; a single
+    instance per process keeps its appends consistent.
+    """
+    backend = embedding_backend(backend)
+    return registry.get(
+        "embedding_cache",
+        embedding_model_name(model_name),
+        lambda name: open_embedding_cache(name, backend),
+        variant=backend,
+    )
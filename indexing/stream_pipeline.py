@@ -0,0 +1,200 @@
+# indexing/stream_pipeline.py
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+_DONE = object()
+
+
+class PipelineCancelled(Exception):
+    """
+    Raised by StreamPipeline.run() when the run was cancelled.
+    """
+
+
+class StageStats:
+    """
+    Counters for one stage. busy_s excludes time spent blocked on the
+    input or output queue, so units_per_s is the stage's own throughput.
+    """
+
+    def __init__(self, name: str, unit: str):
+        self.name = name
+        self.unit = unit
+        self.items = 0
+        self.units = 0
+        self.wall_s = 0.0
+        self.wait_in_s = 0.0
+        self.wait_out_s = 0.0
+        self.started_at: Optional[float] = None
+        self.running = False
+
+    @property
+    def busy_s(self) -> float:
+        # Live while the stage runs (a wait in progress counts as busy)
+        wall = time.perf_counter() - self.started_at if self.running else self.wall_s
+        return max(0.0, wall - self.wait_in_s - self.wait_out_s)
+
+    def as_dict(self) -> Dict[str, Any]:
+        busy = self.busy_s
+        return {
+            "unit": self.unit,
+            "items": self.items,
+            "units": self.units,
+            "busy_s": round(busy, 3),
+            "wait_in_s": round(self.wait_in_s, 3),
+            "wait_out_s": round(self.wait_out_s, 3),
+            "units_per_s": round(self.units / busy, 1) if busy > 0 else None,
+        }
+
+
+class _Stage:
+    def __init__(self, name, fn, unit, count):
+        self.name = name
+        self.fn = fn
+        self.count = count
+        self.stats = StageStats(name, unit)
+
+
+class StreamPipeline:
+    """
+    Runs generator stages concurrently, one thread each, connected by
+    bounded queues.
+
+    Each stage is a function taking an iterator of inputs and yielding
+    outputs; the first stage receives the source iterable. Because every
+    queue holds at most queue_size items, a slow stage back-pressures the
+    ones before it and memory stays bounded by the queue sizes, not by the
+    size of the input.
+
+    If a stage raises, all stages are stopped and run() re-raises it.
+    Setting the cancel event passed to run() stops all stages the same way
+    and run() raises PipelineCancelled.
+    """
+
+    def __init__(self, queue_size: int = 4, poll_s: float = 0.1):
+        self.queue_size = queue_size
+        self.poll_s = poll_s
+        self.stages: List[_Stage] = []
+        self._stop = threading.Event()
+        self._errors: List[BaseException] = []
+
+    def add_stage(
+        self,
+        name: str,
+        fn: Callable[[Iterator[Any]], Iterable[Any]],
+        unit: str = "items",
+        count: Optional[Callable[[Any], int]] = None,
+    ) -> "StreamPipeline":
+        """
+        count(output) gives the number of units in one output item
+        (e.g. chunks in a batch); defaults to 1.
+        """
+        self.stages.append(_Stage(name, fn, unit, count))
+        return self
+
+    def _get(self, q: queue.Queue, stats: StageStats) -> Iterator[Any]:
+        while True:
+            t0 = time.perf_counter()
+            while True:
+                try:
+                    item = q.get(timeout=self.poll_s)
+                    break
+                except queue.Empty:
+                    if self._stop.is_set():
+                        stats.wait_in_s += time.perf_counter() - t0
+                        return
+            stats.wait_in_s += time.perf_counter() - t0
+            if item is _DONE:
+                return
+            yield item
+
+    def _put(self, q: Optional[queue.Queue], item: Any, stats: StageStats) -> bool:
+        if q is None:
+            return not self._stop.is_set()
+        t0 = time.perf_counter()
+        try:
+            while not self._stop.is_set():
+                try:
+                    q.put(item, timeout=self.poll_s)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        finally:
+            stats.wait_out_s += time.perf_counter() - t0
+
+    def _run_stage(self, stage: _Stage, inputs: Iterable[Any], out_q: Optional[queue.Queue]):
+        stats = stage.stats
+        t0 = time.perf_counter()
+        stats.started_at, stats.running = t0, True
+        outputs = iter(stage.fn(inputs))
+        try:
+            for item in outputs:
+                stats.items += 1
+                stats.units += stage.count(item) if stage.count else 1
+                if not self._put(out_q, item, stats):
+                    break
+            else:
+                self._put(out_q, _DONE, stats)
+        except BaseException as e:
+            self._errors.append(e)
+            self._stop.set()
+        finally:
+            # Let generator stages clean up (e.g. shut down a process pool)
+            close = getattr(outputs, "close", None)
+            if close is not None:
+                close()
+            stats.wall_s = time.perf_counter() - t0
+            stats.running = False
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {stage.name: stage.stats.as_dict() for stage in self.stages}
+
+    def run(
+        self,
+        source: Iterable[Any],
+        cancel: Optional[threading.Event] = None,
+        on_progress: Optional[Callable[[Dict[str, Dict[str, Any]]], None]] = None,
+        progress_every_s: float = 1.0,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Run all stages to completion. Outputs of the last stage are
+        discarded (it is expected to be a sink). Returns per-stage stats.
+
+        While waiting, the calling thread passes live stats to on_progress
+        every progress_every_s seconds and watches the cancel event.
+        """
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages[1:]]
+        threads = []
+
+        for i, stage in enumerate(self.stages):
+            inputs = source if i == 0 else self._get(queues[i - 1], stage.stats)
+            out_q = queues[i] if i < len(queues) else None
+            thread = threading.Thread(
+                target=self._run_stage,
+                args=(stage, inputs, out_q),
+                name=f"ingest-{stage.name}",
+                daemon=True,
+            )
+            thread.start()
+            threads.append(thread)
+
+        cancelled = False
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(timeout=progress_every_s if on_progress else self.poll_s)
+                if cancel is not None and cancel.is_set() and not cancelled:
+                    cancelled = True
+                    self._stop.set()
+                if on_progress is not None and thread.is_alive():
+                    on_progress(self.stats())
+
+        if self._errors:
+            raise self._errors[0]
+        if cancelled:
+            raise PipelineCancelled("pipeline cancelled")
+
+        return self.stats()
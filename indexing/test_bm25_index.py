@@ -0,0 +1,104 @@
+# indexing/test_bm25_index.py
+#
+# BM25Index on a hand-built corpus: identifier tokenization, rankings equal
+# to a direct Okapi BM25 computation, removals of merged and still-pending
+# documents, and a save/load round trip that keeps rankings and accepts
+# further additions.
+
+import math
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from indexing.bm25_index import BM25Index, tokenize
+
+tokens = tokenize("Error AB-1234 in v2.1 of the ISO/IEC spec")
+print(tokens)
+assert tokens == [
+    "error", "ab-1234", "ab", "1234", "v2.1", "v2", "1", "iso/iec", "iso", "iec", "spec",
+], tokens
+assert tokenize("The and of") == []
+assert tokenize("x" * 65 + " ok") == ["ok"]
+
+CORPUS = {
+    10: "Transformer AB-1234 tripped during the storm.",
+    11: "Transformer maintenance schedule for substation AB-1234 and AB-1240.",
+    12: "Grid frequency dropped after the transformer trip; frequency recovered in seconds.",
+    13: "Solar output forecast for the region.",
+    14: "Frequency regulation market report.",
+}
+
+
+def reference_bm25(query, corpus, k1=1.2, b=0.75):
+    """
+    Okapi BM25 straight from the formula, for comparison.
+    """
+    docs = {vid: tokenize(text) for vid, text in corpus.items()}
+    avgdl = sum(len(t) for t in docs.values()) / len(docs)
+    scores = {}
+    for term in set(tokenize(query)):
+        df = sum(term in t for t in docs.values())
+        if df == 0:
+            continue
+        idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+        for vid, t in docs.items():
+            tf = t.count(term)
+            if tf:
+                norm = k1 * (1 - b + b * len(t) / avgdl)
+                scores[vid] = scores.get(vid, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+    return sorted(scores.items(), key=lambda item: -item[1])
+
+
+def ranking(index, query, top_k=10):
+    scores, ids = index.search(query, top_k)
+    return [(int(v), float(s)) for s, v in zip(scores, ids)]
+
+
+def assert_matches_reference(index, corpus, query):
+    got = ranking(index, query)
+    expected = reference_bm25(query, corpus)
+    assert [v for v, _ in got] == [v for v, _ in expected], (query, got, expected)
+    assert np.allclose([s for _, s in got], [s for _, s in expected], rtol=1e-5), (got, expected)
+
+
+index = BM25Index()
+index.add(CORPUS.keys(), CORPUS.values())
+
+QUERIES = ["transformer AB-1234", "1234", "frequency", "frequency frequency report", "hydro"]
+for query in QUERIES:
+    assert_matches_reference(index, CORPUS, query)
+
+# The exact identifier beats its parts; the rarer term dominates
+assert [v for v, _ in ranking(index, "AB-1234")] == [10, 11]
+assert [v for v, _ in ranking(index, "ab-1240")] == [11, 10]     # 10 only shares "ab"
+assert ranking(index, "frequency")[0][0] == 12
+assert ranking(index, "hydro") == []
+assert len(ranking(index, "transformer", top_k=2)) == 2
+
+# Remove a merged document and one still pending
+index.add([15], ["Transformer AB-1234 replaced."])
+assert ranking(index, "replaced")[0][0] == 15
+assert index.remove([11, 15, 999]) == 2
+live = {vid: text for vid, text in CORPUS.items() if vid != 11}
+for query in QUERIES:
+    assert_matches_reference(index, live, query)
+assert index.stats()["documents"] == len(live)
+
+# Save / load round trip
+with tempfile.TemporaryDirectory() as tmp:
+    path = Path(tmp) / "bm25.npz"
+    index.save(path)
+    loaded = BM25Index.load(path)
+
+for query in QUERIES:
+    assert ranking(loaded, query) == ranking(index, query)
+assert loaded.stats() == index.stats()
+
+loaded.add([16], ["Hydro storage frequency support."])
+live[16] = "Hydro storage frequency support."
+for query in QUERIES:
+    assert_matches_reference(loaded, live, query)
+
+print(loaded.stats())
+print("OK")
@@ -0,0 +1,59 @@
+# indexing/test_embedding_cache.py
+#
+# EmbeddingCache on random vectors: hits return the stored vectors, repeated
+# puts are ignored, a torn append is cut off on reopen, and gc() keeps
+# exactly the live keys.
+
+import tempfile
+
+import numpy as np
+
+from indexing.embedding_cache import EmbeddingCache, content_keys
+
+N, DIM = 1000, 32
+
+rng = np.random.default_rng(0)
+texts = [f"chunk {i} " * (i % 7 + 1) for i in range(N)]
+keys = content_keys(texts)
+vectors = rng.standard_normal((N, DIM)).astype(np.float32)
+
+with tempfile.TemporaryDirectory() as cache_dir:
+    cache = EmbeddingCache(cache_dir, "test-model")
+    found_vectors, found = cache.get(keys)
+    assert found_vectors is None and not found.any()
+
+    for start in range(0, N, 128):
+        cache.put(keys[start:start + 128], vectors[start:start + 128])
+    cache.put(keys, vectors * 2)          # already cached, ignored
+    assert len(cache) == N
+
+    order = rng.permutation(N)
+    found_vectors, found = cache.get(keys[order])
+    assert found.all()
+    assert np.array_equal(found_vectors, vectors[order])
+
+    # Torn append: partial vector row without its key
+    with open(cache.vectors_path, "ab") as f:
+        f.write(b"\0" * 10)
+    cache = EmbeddingCache(cache_dir, "test-model")
+    assert len(cache) == N
+
+    live = keys[::3]
+    result = cache.gc(live)
+    assert result == {"kept": len(live), "removed": N - len(live)}, result
+
+    cache = EmbeddingCache(cache_dir, "test-model")
+    found_vectors, found = cache.get(keys)
+    assert found[::3].all() and found.sum() == len(live)
+    assert np.array_equal(found_vectors[::3], vectors[::3])
+
+    print(cache.stats())
+
+    try:
+        EmbeddingCache(cache_dir, "other-model")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("cache of another model must not open")
+
+print("OK")
@@ -0,0 +1,110 @@
+# indexing/test_indexing_pipeline.py
+#
+# run_indexing_pipeline on a few text files with a stub embedding model and
+# the SQLite backend: a missing data_dir, or one that lost all its files
+# (unmounted volume), must fail before anything is deleted; removing one
+# file in four goes through, and allow_remove_all clears the index while
+# the embedding cache keeps every entry for the re-ingest.
+
+import os
+import tempfile
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+tmp_dir = tempfile.TemporaryDirectory()
+tmp = Path(tmp_dir.name)
+os.environ["METADATA_BACKEND"] = "sqlite"
+os.environ["SQLITE_PATH"] = str(tmp / "metadata.db")
+os.environ["EMBED_CACHE_DIR"] = str(tmp / "embedding_cache")
+os.environ["EMBED_MODEL"] = "stub-embedding"
+os.environ["INDEX_TYPE"] = "flat"
+os.environ["LOADER_MODE"] = "document"
+
+from database.metadata_backend import open_metadata_store
+from indexing.indexing_pipeline import IngestRemovalError, run_indexing_pipeline
+from indexing.model_registry import embedding_backend, get_embedding_cache, registry
+from indexing.vector_indexer import VectorIndexer
+
+DIM = 64
+
+
+class StubEmbeddingModel:
+    """
+    Hashed bag of words, normalized: texts sharing words are similar.
+    """
+
+    def encode(self, texts, batch_size=None, normalize_embeddings=True, **kwargs):
+        single = isinstance(texts, str)
+        vectors = np.zeros((1 if single else len(texts), DIM), dtype=np.float32)
+        for row, text in zip(vectors, [texts] if single else texts):
+            for word in text.lower().split():
+                row[zlib.crc32(word.encode()) % DIM] += 1
+            row /= max(np.linalg.norm(row), 1e-6)
+        return vectors[0] if single else vectors
+
+
+registry.get("embedding", "stub-embedding", lambda name: StubEmbeddingModel(), variant=embedding_backend())
+
+data_dir = tmp / "documents"
+index_dir = tmp / "vector_index"
+data_dir.mkdir()
+for i in range(4):
+    (data_dir / f"doc{i}.txt").write_text(
+        " ".join(f"Document {i} sentence {j} about topic {j % 5}." for j in range(200))
+    )
+
+
+def state():
+    db = open_metadata_store()
+    stats = db.get_system_stats()
+    db.close()
+    return stats, VectorIndexer(index_dir=index_dir).saved_ntotal()
+
+
+stats = run_indexing_pipeline(incremental=False, data_dir=data_dir, index_dir=index_dir)
+populated = state()
+print(populated)
+assert populated[0]["documents"] == 4 and populated[1] == stats["total_vectors"] > 0
+
+# Missing / mistyped data_dir
+for incremental in (True, False):
+    try:
+        run_indexing_pipeline(incremental=incremental, data_dir=tmp / "missing", index_dir=index_dir)
+    except FileNotFoundError as e:
+        print("refused:", e)
+    else:
+        raise AssertionError("ran against a missing data_dir")
+    assert state() == populated, "documents deleted"
+
+# Empty mount point
+empty_dir = tmp / "unmounted"
+empty_dir.mkdir()
+for incremental in (True, False):
+    try:
+        run_indexing_pipeline(incremental=incremental, data_dir=empty_dir, index_dir=index_dir)
+    except IngestRemovalError as e:
+        print("refused:", e)
+    else:
+        raise AssertionError("removed every document")
+    assert state() == populated, "documents deleted"
+
+# A real deletion of one file in four
+(data_dir / "doc3.txt").unlink()
+stats = run_indexing_pipeline(incremental=True, data_dir=data_dir, index_dir=index_dir)
+assert stats["documents_removed"] == 1 and state()[0]["documents"] == 3, stats
+
+# Three of three needs the flag
+for path in data_dir.iterdir():
+    path.unlink()
+stats = run_indexing_pipeline(
+    incremental=True, data_dir=data_dir, index_dir=index_dir, allow_remove_all=True
+)
+assert stats["documents_removed"] == 3 and stats["total_vectors"] == 0, stats
+assert state() == ({"documents": 0, "chunks": 0, "vectors": 0}, 0)
+assert len(get_embedding_cache()) == populated[1], "embedding cache collected"
+
+tmp_dir.cleanup()
+
+print("OK")
@@ -0,0 +1,88 @@
+# indexing/test_metrics.py
+#
+# Histogram buckets and quantiles, the Prometheus text rendering, and trace
+# spans recorded by stage timers, including through traced generators and
+# asyncio.to_thread workers.
+
+import asyncio
+import time
+
+from indexing.metrics import (
+    Counter,
+    Histogram,
+    MetricsRegistry,
+    Trace,
+    cache_metrics,
+    stage_timer,
+    traced_iter,
+    tracing,
+)
+
+h = Histogram("test_duration_seconds", "Test.", labelnames=("stage",), buckets=(0.1, 1.0, 10.0))
+for value in (0.05, 0.5, 0.5, 5.0, 50.0):
+    h.observe(value, "a")
+h.observe(0.05, "b")
+
+assert h.quantile(0.5, "a") is not None and 0.1 <= h.quantile(0.5, "a") <= 1.0
+assert h.quantile(0.5, "missing") is None
+assert h.summary()["a"]["count"] == 5
+
+registry = MetricsRegistry()
+registry.register(h)
+c = registry.register(Counter("test_total", "Test counter.", labelnames=("status",)))
+c.inc(2, 'say "hi"')
+
+
+class FakeCache:
+    def stats(self):
+        return {"hits": 3, "misses": 1}
+
+
+for metric in cache_metrics(lambda: {"lru": FakeCache(), "off": None}):
+    registry.register(metric)
+
+text = registry.render()
+assert "# TYPE test_duration_seconds histogram" in text
+assert 'test_duration_seconds_bucket{stage="a",le="0.1"} 1' in text
+assert 'test_duration_seconds_bucket{stage="a",le="1.0"} 3' in text
+assert 'test_duration_seconds_bucket{stage="a",le="+Inf"} 5' in text
+assert 'test_duration_seconds_count{stage="a"} 5' in text
+assert 'test_total{status="say \\"hi\\""} 2.0' in text
+assert 'rag_cache_hit_ratio{cache="lru"} 0.75' in text
+assert 'cache="off"' not in text
+
+# Spans: only while a trace is active
+with stage_timer("outside"):
+    pass
+
+trace = Trace()
+with tracing(trace):
+    with stage_timer("embed"):
+        time.sleep(0.01)
+
+
+def gen():
+    with stage_timer("generate"):
+        yield 1
+    with stage_timer("generate"):
+        yield 2
+
+
+items = list(traced_iter(gen(), trace))
+assert items == [1, 2]
+
+
+async def main():
+    with tracing(trace):
+        await asyncio.to_thread(lambda: stage_timer("worker").__enter__().__exit__())
+
+
+asyncio.run(main())
+
+stages = [span["stage"] for span in trace.spans]
+assert stages == ["embed", "generate", "generate", "worker"], trace.spans
+assert trace.spans[0]["duration_ms"] >= 10
+
+print(text)
+print(trace.spans)
+print("OK")
@@ -0,0 +1,51 @@
+# indexing/test_model_registry.py
+#
+# ModelRegistry with a slow fake loader: concurrent first calls must share a
+# single load, warmup must run once, and stats must report it.
+
+import threading
+import time
+
+from indexing.model_registry import ModelRegistry
+
+loads = 0
+warmups = 0
+
+
+def load(name):
+    global loads
+    loads += 1
+    time.sleep(0.2)
+    return {"name": name, "weights": bytearray(16 * 2 ** 20)}
+
+
+def warmup(model):
+    global warmups
+    warmups += 1
+
+
+registry = ModelRegistry()
+results = []
+threads = [
+    threading.Thread(target=lambda: results.append(registry.get("embedding", "fake", load, warmup)))
+    for _ in range(8)
+]
+for t in threads:
+    t.start()
+for t in threads:
+    t.join()
+
+assert loads == 1 and warmups == 1, (loads, warmups)
+assert all(r is results[0] for r in results)
+assert registry.is_loaded("embedding", "fake")
+
+other = registry.get("embedding", "other", load)
+assert other is not results[0] and loads == 2
+
+stats = registry.stats()
+print(stats)
+assert len(stats["models"]) == 2
+assert stats["models"][0]["load_s"] >= 0.2
+assert stats["rss_mb"] > 0
+
+print("OK")
@@ -0,0 +1,81 @@
+# indexing/test_stream_pipeline.py
+#
+# StreamPipeline with sleeping fake stages: stages must overlap, the number
+# of items alive between source and sink must stay bounded by the queues,
+# and a failing stage must stop the pipeline and surface its error.
+
+import threading
+import time
+
+from indexing.stream_pipeline import StreamPipeline
+
+N_ITEMS = 200
+STAGE_S = 0.002
+QUEUE_SIZE = 2
+
+alive = 0
+max_alive = 0
+lock = threading.Lock()
+
+
+def produce(n):
+    global alive, max_alive
+    for i in n:
+        time.sleep(STAGE_S)
+        with lock:
+            alive += 1
+            max_alive = max(max_alive, alive)
+        yield i
+
+
+def work(items):
+    for i in items:
+        time.sleep(STAGE_S)
+        yield i
+
+
+def sink(items):
+    global alive
+    for i in items:
+        time.sleep(STAGE_S)
+        with lock:
+            alive -= 1
+        yield 1
+
+
+t0 = time.perf_counter()
+stats = (
+    StreamPipeline(queue_size=QUEUE_SIZE)
+    .add_stage("load", produce)
+    .add_stage("work", work)
+    .add_stage("write", sink)
+    .run(range(N_ITEMS))
+)
+elapsed = time.perf_counter() - t0
+serial = 3 * N_ITEMS * STAGE_S
+print(f"elapsed={elapsed:.2f}s serial={serial:.2f}s max_alive={max_alive}")
+print(stats)
+
+assert stats["write"]["items"] == N_ITEMS
+assert elapsed < 0.7 * serial, "stages did not overlap"
+# 2 queues of QUEUE_SIZE, plus at most one item held by each stage
+assert max_alive <= 2 * QUEUE_SIZE + 3, max_alive
+
+
+def failing(items):
+    for i in items:
+        if i == 50:
+            raise ValueError("bad item")
+        yield i
+
+
+try:
+    StreamPipeline(queue_size=QUEUE_SIZE).add_stage("load", work).add_stage(
+        "fail", failing
+    ).run(range(10 ** 9))
+except ValueError as e:
+    print("error propagated:", e)
+else:
+    raise AssertionError("error was swallowed")
+
+print("OK")
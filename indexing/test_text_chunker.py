@@ -0,0 +1,53 @@
+# indexing/test_text_chunker.py
+#
+# chunk_documents in char mode on page records: a page shorter than
+# min_chunk_length is kept when its document is longer, so page-level
+# chunking keeps every sentence that whole-document chunking keeps; a
+# document shorter than that is still dropped, as are short page tails
+# that only repeat the previous chunk's overlap.
+
+from indexing.text_chunker import chunk_documents, chunk_text
+
+
+def page(doc_id, n, text):
+    return {"doc_id": doc_id, "text": text, "source": f"/docs/{doc_id}.pdf", "page": n}
+
+
+def sentences(tag, n):
+    return [f"{tag} sentence {i} on transmission losses." for i in range(n)]
+
+
+long_1 = sentences("first", 20)       # ~830 chars: a short tail after two windows
+short_2 = ["Closing remark on page two."]
+long_3 = sentences("third", 14)
+pages = [
+    page("report", 1, " ".join(long_1)),
+    page("report", 2, " ".join(short_2)),
+    page("report", 3, " ".join(long_3)),
+]
+
+chunks = chunk_documents(pages, mode="char")
+by_page = {}
+for c in chunks:
+    by_page.setdefault(c["page_or_section"], []).append(c)
+print({p: [len(c["text"]) for c in cs] for p, cs in by_page.items()})
+
+assert [c["text"] for c in by_page["Page 2"]] == short_2
+assert by_page["Page 2"][0]["chunk_id"] == "report_p2_0"
+# Short tail of page 1 dropped: it is inside the previous chunk
+assert len(chunk_text(pages[0]["text"])) == 3 and len(by_page["Page 1"]) == 2
+
+whole = chunk_documents(
+    [{"doc_id": "report", "text": " ".join(p["text"] for p in pages), "source": "/docs/report.pdf"}],
+    mode="char",
+)
+for sentence in long_1 + short_2 + long_3:
+    assert any(sentence in c["text"] for c in whole), sentence
+    assert any(sentence in c["text"] for c in chunks), f"page mode lost {sentence!r}"
+
+# Short pages adding up to a long document are kept; a short document is not
+two_short = [page("memo", 1, "A" * 60), page("memo", 2, "B" * 60)]
+assert [c["chunk_id"] for c in chunk_documents(two_short, mode="char")] == ["memo_p1_0", "memo_p2_0"]
+assert chunk_documents([page("note", 1, "Too short to index.")], mode="char") == []
+
+print("OK")
@@ -1,7 +1,12 @@
 # indexing/text_chunker.py
 
-from typing import List, Dict
+import math
+import os
+import re
+from typing import List, Dict, Optional, Tuple
+
 from indexing.document_loader import load_documents, DATA_DIR
+from indexing.model_registry import embedding_model_name, registry
 
 
 def chunk_text(text: str, chunk_size: int = 500, overlap: int = 100) -> List[str]:
@@ -28,26 +33,208 @@ def chunk_text(text: str, chunk_size: int = 500, overlap: int = 100) -> List[str
     return chunks
 
 
-def chunk_documents(documents: List[Dict], min_chunk_length: int = 100) -> List[Dict]:
+# --------------------------------------------------
+# Token-aware, boundary-respecting chunking
+# --------------------------------------------------
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+# Whitespace after ., ! or ?, optionally followed by a closing quote/bracket
+_SENTENCE_RE = re.compile(r"(?:(?<=[.!?])|(?<=[.!?][\"')\]]))\s+")
+
+
+def split_sentences(text: str) -> List[Tuple[str, bool]]:
+    """
+    Split text into (sentence, starts_paragraph) pairs. Paragraphs are
+    separated by blank lines; single line breaks (PDF line wrapping) are
+    treated as spaces.
+    """
+    sentences = []
+    for paragraph in _PARAGRAPH_RE.split(text):
+        paragraph = " ".join(paragraph.split())
+        if not paragraph:
+            continue
+        for i, sentence in enumerate(s for s in _SENTENCE_RE.split(paragraph) if s):
+            sentences.append((sentence, i == 0))
+    return sentences
+
+
+class TokenChunker:
+    """
+    Packs whole sentences into chunks of at most max_tokens tokens of the
+    embedding model's tokenizer.
+
+    - a chunk is closed early at a paragraph start once it is at least
+      paragraph_snap full, so chunks tend to follow the document structure
+    - the last sentences (up to overlap_tokens) are repeated at the start
+      of the next chunk
+    - a sentence longer than max_tokens is split between words
+    - all sentences of a batch of documents are tokenized in one call
+    """
+
+    def __init__(
+        self,
+        tokenizer=None,
+        max_tokens: Optional[int] = None,
+        overlap_tokens: Optional[int] = None,
+        paragraph_snap: float = 0.75,
+    ):
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens or int(os.getenv("CHUNK_MAX_TOKENS", 384))
+        self.overlap_tokens = (
+            overlap_tokens if overlap_tokens is not None
+            else int(os.getenv("CHUNK_OVERLAP_TOKENS", 48))
+        )
+        self.paragraph_snap = paragraph_snap
+
+    def _count_tokens(self, sentences: List[str]) -> List[int]:
+        if self.tokenizer is None:
+            self.tokenizer = load_tokenizer()
+        if not sentences:
+            return []
+        ids = self.tokenizer(sentences, add_special_tokens=False)["input_ids"]
+        return [len(x) for x in ids]
+
+    def _split_long(self, sentence: str, n_tokens: int) -> List[Tuple[str, int]]:
+        # Word-level split, assuming tokens are spread evenly over words
+        words = sentence.split()
+        per_word = n_tokens / max(1, len(words))
+        words_per_piece = max(1, int(self.max_tokens / per_word))
+        pieces = []
+        for i in range(0, len(words), words_per_piece):
+            piece = words[i:i + words_per_piece]
+            pieces.append((" ".join(piece), math.ceil(len(piece) * per_word)))
+        return pieces
+
+    def _pack(self, sentences: List[Tuple[str, bool, int]]) -> List[str]:
+        chunks = []
+        current: List[Tuple[str, int]] = []
+        current_tokens = 0
+        n_fresh = 0          # pieces in current that are not overlap
+
+        def close():
+            nonlocal current, current_tokens, n_fresh
+            chunks.append(" ".join(s for s, _ in current))
+            # Carry trailing sentences over as overlap (never the whole chunk)
+            carry, carry_tokens = [], 0
+            for sentence, n in reversed(current[1:]):
+                if carry_tokens + n > self.overlap_tokens:
+                    break
+                carry.insert(0, (sentence, n))
+                carry_tokens += n
+            current, current_tokens, n_fresh = carry, carry_tokens, 0
+
+        for sentence, starts_paragraph, n_tokens in sentences:
+            pieces = (
+                self._split_long(sentence, n_tokens) if n_tokens > self.max_tokens
+                else [(sentence, n_tokens)]
+            )
+            for piece, n in pieces:
+                if n_fresh and (
+                    current_tokens + n > self.max_tokens
+                    or (starts_paragraph and current_tokens >= self.paragraph_snap * self.max_tokens)
+                ):
+                    close()
+                    # Overlap plus this piece may still not fit
+                    while current and current_tokens + n > self.max_tokens:
+                        current_tokens -= current.pop(0)[1]
+                current.append((piece, n))
+                current_tokens += n
+                n_fresh += 1
+                starts_paragraph = False
+
+        if n_fresh:
+            chunks.append(" ".join(s for s, _ in current))
+        return chunks
+
+    def chunk_texts(self, texts: List[str]) -> List[List[str]]:
+        """
+        Chunk many texts; returns one list of chunk strings per text.
+        """
+        split = [split_sentences(t) for t in texts]
+        flat = [sentence for sentences in split for sentence, _ in sentences]
+        counts = iter(self._count_tokens(flat))
+        return [
+            self._pack([(sentence, starts, next(counts)) for sentence, starts in sentences])
+            for sentences in split
+        ]
+
+
+def _load_auto_tokenizer(name: str):
+    from transformers import AutoTokenizer   # heavy import, only in token mode
+
+    return AutoTokenizer.from_pretrained(name)
+
+
+def load_tokenizer(model_name: Optional[str] = None):
+    """
+    Tokenizer of the embedding model (fast Rust tokenizer, no model weights),
+    shared through the model registry.
+    """
+    return registry.get("tokenizer", embedding_model_name(model_name), _load_auto_tokenizer)
+
+
+_token_chunker: Optional[TokenChunker] = None
+
+
+def _default_token_chunker() -> TokenChunker:
+    global _token_chunker
+    if _token_chunker is None:
+        _token_chunker = TokenChunker()
+    return _token_chunker
+
+
+def chunk_documents(
+    documents: List[Dict],
+    min_chunk_length: int = 100,
+    mode: Optional[str] = None,
+    token_chunker: Optional[TokenChunker] = None,
+) -> List[Dict]:
     """
     Convert loaded documents into chunk objects.
     Each chunk keeps traceability fields needed later for metadata storage (FR-12).
+    Page records (from load_pages) also carry their page number.
+
+    min_chunk_length applies per document, not per page: the first chunk of
+    a short page is kept unless the whole document is that short, so page
+    mode loses no more text than chunking whole documents did. Short tails
+    after a record's first chunk are dropped (in char mode they lie inside
+    the previous chunk's overlap).
+
+    mode (CHUNKER_MODE):
+      - "char"  : fixed 500-character windows with 100 characters overlap
+      - "token" : sentence/paragraph-aligned chunks sized in embedding-model
+                  tokens (TokenChunker); the whole list is tokenized in one batch
     """
-    all_chunks = []
+    mode = mode or os.getenv("CHUNKER_MODE", "char")
 
+    if mode == "token":
+        chunker = token_chunker or _default_token_chunker()
+        pieces_per_doc = chunker.chunk_texts([doc["text"] for doc in documents])
+    elif mode == "char":
+        pieces_per_doc = [chunk_text(doc["text"]) for doc in documents]
+    else:
+        raise ValueError(f"Unknown CHUNKER_MODE {mode!r}, expected 'char' or 'token'")
+
+    doc_chars: Dict[str, int] = {}
     for doc in documents:
-        pieces = chunk_text(doc["text"])
+        doc_chars[doc["source"]] = doc_chars.get(doc["source"], 0) + len(doc["text"].strip())
+
+    all_chunks = []
+
+    for doc, pieces in zip(documents, pieces_per_doc):
+        page = doc.get("page")
+        prefix = f"{doc['doc_id']}_p{page}" if page is not None else doc["doc_id"]
 
         for i, piece in enumerate(pieces):
-            if len(piece) < min_chunk_length:
+            if len(piece) < min_chunk_length and (i > 0 or doc_chars[doc["source"]] < min_chunk_length):
                 continue
 
             all_chunks.append(
                 {
                     "doc_id": doc["doc_id"],
-                    "chunk_id": f"{doc['doc_id']}_{i}",
+                    "chunk_id": f"{prefix}_{i}",
                     "text": piece,
                     "source": doc["source"],
+                    "page_or_section": f"Page {page}" if page is not None else None,
                 }
             )
 
@@ -1,62 +1,501 @@
 
 # indexing/vector_indexer.py
 
+import json
+import os
 import faiss
 import numpy as np
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
+
+INDEX_TYPES = ("flat", "ivf", "hnsw", "sq8", "fp16", "pq")
+
+# Index types that store compressed codes and rescore from the side file
+COMPACT_INDEX_TYPES = ("sq8", "fp16", "pq")
+
+# Index types whose first add() trains on the vectors it is given
+TRAINED_INDEX_TYPES = ("ivf", "sq8", "fp16", "pq")
+
+# Rule of thumb from FAISS: at least ~39 training points per IVF centroid
+MIN_POINTS_PER_CENTROID = 39
 
 
 class VectorIndexer:
     """
     FAISS-based vector similarity index (cosine similarity).
     Uses explicit vector IDs for metadata alignment.
+
+    index_type:
+      - "flat": exact brute-force inner product
+      - "ivf" : inverted file, trained k-means coarse quantizer (nlist, nprobe)
+      - "hnsw": graph index (hnsw_m, ef_construction, ef_search)
+      - "sq8" / "fp16" / "pq": compressed codes (int8 / fp16 scalar
+        quantization, product quantization with pq_m x pq_nbits).
+        A shortlist of top_k * rescore_factor is rescored exactly against
+        full-precision vectors in a memory-mapped side file (vectors.f32).
+    The chosen parameters are saved to index_config.json next to faiss.index.
     """
 
-    def __init__(self, index_dir: Path):
+    def __init__(
+        self,
+        index_dir: Path,
+        index_type: Optional[str] = None,
+        nlist: Optional[int] = None,
+        nprobe: Optional[int] = None,
+        hnsw_m: Optional[int] = None,
+        ef_construction: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        pq_m: Optional[int] = None,
+        pq_nbits: Optional[int] = None,
+        rescore: Optional[bool] = None,
+        rescore_factor: Optional[int] = None,
+    ):
         self.index_dir = Path(index_dir)
         self.index_dir.mkdir(parents=True, exist_ok=True)
 
+        # index_config.json is the atomic pointer to the current versioned
+        # index file; faiss.index is only used for pre-versioning indexes.
+        self.config_path = self.index_dir / "index_config.json"
         self.index_path = self.index_dir / "faiss.index"
+        self.vectors_path = self.index_dir / "vectors.f32"
+        self.vector_ids_path = self.index_dir / "vector_ids.i64"
         self.index = None
+        self.version = 0
+        # Companion files published with this version (e.g. "bm25_file")
+        self.extra_files: Dict[str, str] = {}
+        self.read_only = False
 
-    def _create_index(self, dim: int):
+        # Full-precision side file for rescoring (compact index types)
+        self._side_rows = 0
+        self._side_vectors = None     # memmap (rows, dim)
+        self._side_sorted_ids = None  # ids sorted ascending
+        self._side_sorted_rows = None # row of each sorted id
+        self._side_dirty = False
+
+        self.params: Dict[str, Any] = {
+            "index_type": index_type or os.getenv("INDEX_TYPE", "flat"),
+            "nlist": nlist or int(os.getenv("IVF_NLIST", 1024)),
+            "nprobe": nprobe or int(os.getenv("IVF_NPROBE", 16)),
+            "hnsw_m": hnsw_m or int(os.getenv("HNSW_M", 32)),
+            "ef_construction": ef_construction or int(os.getenv("HNSW_EF_CONSTRUCTION", 200)),
+            "ef_search": ef_search or int(os.getenv("HNSW_EF_SEARCH", 64)),
+            "pq_m": pq_m or int(os.getenv("PQ_M", 64)),
+            "pq_nbits": pq_nbits or int(os.getenv("PQ_NBITS", 8)),
+            "rescore": (
+                rescore if rescore is not None else os.getenv("INDEX_RESCORE", "1") == "1"
+            ),
+            "rescore_factor": rescore_factor or int(os.getenv("INDEX_RESCORE_FACTOR", 4)),
+        }
+        if self.params["index_type"] not in INDEX_TYPES:
+            raise ValueError(
+                f"Unknown index_type {self.params['index_type']!r}, expected one of {INDEX_TYPES}"
+            )
+
+        # Search-time knobs passed explicitly win over the saved config
+        self._search_overrides = {
+            k: v
+            for k, v in (
+                ("nprobe", nprobe),
+                ("ef_search", ef_search),
+                ("rescore", rescore),
+                ("rescore_factor", rescore_factor),
+            )
+            if v is not None
+        }
+
+    def _create_index(self, embeddings: np.ndarray):
         """
         Create FAISS index with explicit ID mapping.
         Assumes embeddings are L2-normalized.
+        IVF is trained on the given embeddings.
+        """
+        dim = embeddings.shape[1]
+        index_type = self.params["index_type"]
+
+        if index_type == "ivf":
+            nlist = min(self.params["nlist"], max(1, len(embeddings) // MIN_POINTS_PER_CENTROID))
+            if nlist != self.params["nlist"]:
+                print(f"IVF nlist reduced to {nlist} for {len(embeddings)} training vectors")
+                self.params["nlist"] = nlist
+            quantizer = faiss.IndexFlatIP(dim)
+            # IVF supports add_with_ids / remove_ids natively
+            self.index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+            self.index.train(embeddings)
+        elif index_type == "hnsw":
+            base_index = faiss.IndexHNSWFlat(dim, self.params["hnsw_m"], faiss.METRIC_INNER_PRODUCT)
+            base_index.hnsw.efConstruction = self.params["ef_construction"]
+            self.index = faiss.IndexIDMap(base_index)
+        elif index_type in ("sq8", "fp16"):
+            qtype = (
+                faiss.ScalarQuantizer.QT_8bit if index_type == "sq8"
+                else faiss.ScalarQuantizer.QT_fp16
+            )
+            base_index = faiss.IndexScalarQuantizer(dim, qtype, faiss.METRIC_INNER_PRODUCT)
+            base_index.train(embeddings)
+            self.index = faiss.IndexIDMap(base_index)
+        elif index_type == "pq":
+            if dim % self.params["pq_m"] != 0:
+                raise ValueError(f"pq_m={self.params['pq_m']} must divide dim={dim}")
+            nbits = min(self.params["pq_nbits"], max(1, int(np.log2(len(embeddings)))))
+            if nbits != self.params["pq_nbits"]:
+                print(f"PQ nbits reduced to {nbits} for {len(embeddings)} training vectors")
+                self.params["pq_nbits"] = nbits
+            base_index = faiss.IndexPQ(dim, self.params["pq_m"], nbits, faiss.METRIC_INNER_PRODUCT)
+            base_index.train(embeddings)
+            self.index = faiss.IndexIDMap(base_index)
+        else:
+            base_index = faiss.IndexFlatIP(dim)
+            self.index = faiss.IndexIDMap(base_index)
+
+        if self.is_compact:
+            # Fresh index: start a fresh side file. It gets a new name, so
+            # readers of the previous version keep their own mapping.
+            side_version = self._saved_config().get("version", 0) + 1
+            self.vectors_path = self.index_dir / f"vectors.v{side_version:06d}.f32"
+            self.vector_ids_path = self.index_dir / f"vector_ids.v{side_version:06d}.i64"
+            for path in (self.vectors_path, self.vector_ids_path):
+                path.unlink(missing_ok=True)
+            self._side_rows = 0
+            self._map_side_file(dim)
+
+        self._apply_search_params()
+
+    @property
+    def is_compact(self) -> bool:
+        return self.params["index_type"] in COMPACT_INDEX_TYPES
+
+    @property
+    def supports_remove(self) -> bool:
+        """HNSW graphs cannot drop vectors; a full rebuild replaces them."""
+        return self.params["index_type"] != "hnsw"
+
+    @property
+    def needs_training(self) -> bool:
+        """True until a trained index type has been created."""
+        return self.index is None and self.params["index_type"] in TRAINED_INDEX_TYPES
+
+    # --------------------------------------------------
+    # Full-precision side file (compact index types)
+    # --------------------------------------------------
+    def _append_side_vectors(self, embeddings: np.ndarray, ids: np.ndarray):
+        with open(self.vectors_path, "ab") as f:
+            f.write(embeddings.tobytes())
+        with open(self.vector_ids_path, "ab") as f:
+            f.write(ids.astype(np.int64).tobytes())
+        self._side_rows += len(ids)
+        # Re-mapped lazily on the next search
+        self._side_dirty = True
+
+    def _map_side_file(self, dim: int):
         """
-        base_index = faiss.IndexFlatIP(dim)
-        self.index = faiss.IndexIDMap(base_index)
+        Memory-map the first _side_rows rows and build the id -> row lookup.
+        Later rows win if an id was written more than once.
+        """
+        self._side_dirty = False
+        if self._side_rows == 0:
+            self._side_vectors = None
+            self._side_sorted_ids = np.empty(0, dtype=np.int64)
+            self._side_sorted_rows = np.empty(0, dtype=np.int64)
+            return
+
+        self._side_vectors = np.memmap(
+            self.vectors_path, dtype=np.float32, mode="r", shape=(self._side_rows, dim)
+        )
+        ids = np.fromfile(self.vector_ids_path, dtype=np.int64, count=self._side_rows)
+        order = np.argsort(ids, kind="stable")
+        self._side_sorted_ids = ids[order]
+        self._side_sorted_rows = order
+
+    def _truncate_side_file(self, dim: int):
+        # Drop rows appended after the last save (e.g. by an interrupted run)
+        for path, row_bytes in ((self.vectors_path, dim * 4), (self.vector_ids_path, 8)):
+            if path.exists():
+                with open(path, "r+b") as f:
+                    f.truncate(self._side_rows * row_bytes)
+
+    def _fetch_side_vectors(self, ids: np.ndarray) -> np.ndarray:
+        if self._side_dirty:
+            self._map_side_file(self.index.d)
+        pos = np.searchsorted(self._side_sorted_ids, ids, side="right") - 1
+        rows = self._side_sorted_rows[pos]
+        # Sorted row order keeps reads sequential on the memmap
+        order = np.argsort(rows)
+        vectors = np.empty((len(ids), self._side_vectors.shape[1]), dtype=np.float32)
+        vectors[order] = self._side_vectors[rows[order]]
+        return vectors
+
+    def _rescore(self, queries: np.ndarray, cand_ids: np.ndarray, top_k: int):
+        """
+        Exact inner product over the shortlist, keeping the best top_k.
+        Pads with id -1 like FAISS when fewer candidates exist.
+        """
+        n = len(queries)
+        out_scores = np.full((n, top_k), -np.finfo(np.float32).max, dtype=np.float32)
+        out_ids = np.full((n, top_k), -1, dtype=np.int64)
+
+        for i in range(n):
+            ids = cand_ids[i][cand_ids[i] != -1]
+            if len(ids) == 0:
+                continue
+            exact = self._fetch_side_vectors(ids) @ queries[i]
+            best = np.argsort(-exact, kind="stable")[:top_k]
+            out_scores[i, :len(best)] = exact[best]
+            out_ids[i, :len(best)] = ids[best]
+
+        return out_scores, out_ids
+
+    def _apply_search_params(self):
+        index_type = self.params["index_type"]
+        if index_type == "ivf":
+            faiss.extract_index_ivf(self.index).nprobe = self.params["nprobe"]
+        elif index_type == "hnsw":
+            faiss.downcast_index(self.index.index).hnsw.efSearch = self.params["ef_search"]
+
+    def set_search_params(
+        self,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        rescore: Optional[bool] = None,
+        rescore_factor: Optional[int] = None,
+    ):
+        """
+        Tune recall vs. latency on a loaded index (no rebuild needed).
+        """
+        for key, value in (
+            ("nprobe", nprobe),
+            ("ef_search", ef_search),
+            ("rescore", rescore),
+            ("rescore_factor", rescore_factor),
+        ):
+            if value is not None:
+                self.params[key] = value
+        if self.index is not None:
+            self._apply_search_params()
+
+    def train(self, embeddings: np.ndarray):
+        """
+        Create (and for IVF, train) the index from a representative sample
+        before the first add(). Optional: add() does this on first use.
+        """
+        self._create_index(np.ascontiguousarray(embeddings, dtype=np.float32))
 
     def add(self, embeddings: np.ndarray, ids: Optional[List[int]] = None):
         if not isinstance(embeddings, np.ndarray):
             embeddings = np.array(embeddings)
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
 
+        if self.read_only:
+            raise RuntimeError("Index was loaded read-only (mmap).")
         if self.index is None:
-            self._create_index(embeddings.shape[1])
+            self._create_index(embeddings)
+
+        if self.is_compact and ids is None:
+            ids = np.arange(self.ntotal, self.ntotal + len(embeddings))
+            self.index.add_with_ids(embeddings, np.array(ids, dtype=np.int64))
+            self._append_side_vectors(embeddings, np.array(ids, dtype=np.int64))
+            return None
 
         if ids is not None:
             ids = np.array(ids, dtype=np.int64)
             self.index.add_with_ids(embeddings, ids)
+            if self.is_compact:
+                self._append_side_vectors(embeddings, ids)
             return ids.tolist()
         else:
             self.index.add(embeddings)
             return None
 
-    def save(self):
-        faiss.write_index(self.index, str(self.index_path))
+    def remove(self, ids: List[int]) -> int:
+        """
+        Remove vectors by ID. Returns the number of vectors removed.
+        """
+        if self.index is None or not ids:
+            return 0
+        if self.read_only:
+            raise RuntimeError("Index was loaded read-only (mmap).")
+        if not self.supports_remove:
+            raise RuntimeError(
+                "HNSW index does not support removing vectors; run a full re-index."
+            )
+        return int(self.index.remove_ids(np.array(ids, dtype=np.int64)))
+
+    def memory_bytes(self) -> int:
+        """
+        In-RAM size of the FAISS index (the side file is mmap'd, not counted).
+        """
+        if self.index is None:
+            return 0
+        return int(faiss.serialize_index(self.index).nbytes)
+
+    @property
+    def ntotal(self) -> int:
+        return 0 if self.index is None else int(self.index.ntotal)
+
+    def exists(self) -> bool:
+        return self.config_path.exists() or self.index_path.exists()
+
+    def _saved_config(self) -> Dict[str, Any]:
+        if not self.config_path.exists():
+            return {}
+        with open(self.config_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def saved_version(self) -> int:
+        """
+        Version currently published on disk (0 if none).
+        """
+        return int(self._saved_config().get("version", 0))
+
+    def saved_ntotal(self) -> int:
+        """
+        Number of vectors in the published version (0 if none).
+        """
+        return int(self._saved_config().get("ntotal", 0))
+
+    def save(self, extra_files: Optional[Dict[str, str]] = None):
+        """
+        Write a new versioned index file, then atomically repoint
+        index_config.json at it. Readers never see a partial index.
+
+        extra_files ({"<name>_file": filename}) names companion files in
+        index_dir, already written for this version, that are published
+        and cleaned up together with the index.
+
+        Without an index (nothing was added, e.g. a full rebuild of an
+        empty data_dir) an empty version is published, so readers stop
+        serving the previous one.
+        """
+        if self.read_only:
+            raise RuntimeError("Index was loaded read-only (mmap).")
+
+        saved = self._saved_config()
+        version = int(saved.get("version", 0)) + 1
+        index_file = None
+        if self.index is not None:
+            index_file = f"faiss.v{version:06d}.index"
+            faiss.write_index(self.index, str(self.index_dir / index_file))
+        has_side_file = self.is_compact and self.index is not None
+
+        files = {
+            "version": version,
+            "index_file": index_file,
+            "vectors_file": self.vectors_path.name if has_side_file else None,
+            "vector_ids_file": self.vector_ids_path.name if has_side_file else None,
+            **(extra_files or {}),
+        }
+        keep = int(os.getenv("INDEX_KEEP_VERSIONS", 2))
+        history = ([files] + saved.get("history", []))[:max(1, keep)]
+
+        config = dict(
+            self.params,
+            dim=int(self.index.d) if self.index is not None else None,
+            ntotal=self.ntotal,
+            side_rows=self._side_rows,
+            history=history,
+            **files,
+        )
+        tmp_path = self.config_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(config, f, indent=1)
+        os.replace(tmp_path, self.config_path)
 
-    def load(self):
-        if not self.index_path.exists():
+        self.version = version
+        if index_file is not None:
+            self.index_path = self.index_dir / index_file
+        self.extra_files = dict(extra_files or {})
+        self._cleanup_versions(history)
+
+    def _cleanup_versions(self, history: List[Dict[str, Any]]):
+        """
+        Delete versioned files no longer referenced by the kept history.
+        Processes that still map a deleted file keep reading it safely.
+        """
+        live = {v for f in history for k, v in f.items() if k.endswith("_file") and v}
+        # faiss.vNNNNNN.index, vectors.vNNNNNN.f32, companion files, ...
+        for path in self.index_dir.glob("*.v[0-9][0-9][0-9][0-9][0-9][0-9].*"):
+            if path.name not in live:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass  # e.g. still open on Windows; retried next save
+
+    def _read_flags(self, mmap: bool) -> int:
+        if not mmap:
+            return 0
+        if self.params["index_type"] == "ivf":
+            return faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+        # Flat-code indexes (flat, sq, pq, hnsw storage) map their codes
+        return getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+    def load(self, mmap: bool = False):
+        """
+        Load the current index version.
+        mmap=True opens it read-only and memory-mapped, so processes share
+        the OS page cache instead of each holding a private copy.
+        """
+        saved = self._saved_config()
+        # Published empty version: no index file, searches return no hits
+        empty = bool(saved) and not saved.get("index_file")
+
+        if saved.get("index_file"):
+            self.index_path = self.index_dir / saved["index_file"]
+        if not empty and not self.index_path.exists():
             raise FileNotFoundError("FAISS index not found.")
-        self.index = faiss.read_index(str(self.index_path))
 
-    def search(self, query_embedding: np.ndarray, top_k: int = 5):
+        if saved:
+            self.params.update({k: saved[k] for k in self.params if k in saved})
+        else:
+            # Index written before index_config.json existed
+            self.params["index_type"] = "flat"
+
+        self.index = None if empty else faiss.read_index(str(self.index_path), self._read_flags(mmap))
+        self.version = int(saved.get("version", 0))
+        self.read_only = mmap
+        self.extra_files = {
+            k: v for k, v in saved.items()
+            if k.endswith("_file") and v and k not in ("index_file", "vectors_file", "vector_ids_file")
+        }
+
+        self.params.update(self._search_overrides)
+        if empty:
+            return
+        self._apply_search_params()
+
+        if self.is_compact:
+            self.vectors_path = self.index_dir / saved.get("vectors_file", "vectors.f32")
+            self.vector_ids_path = self.index_dir / saved.get("vector_ids_file", "vector_ids.i64")
+            self._side_rows = int(saved.get("side_rows", 0))
+            if not mmap:
+                self._truncate_side_file(self.index.d)
+            self._map_side_file(self.index.d)
+
+    def search_many(self, query_embeddings: np.ndarray, top_k: int = 5):
+        """
+        Search a batch of queries with one FAISS call.
+        Returns (scores, ids), each of shape (n_queries, top_k).
+        """
+        if query_embeddings.ndim == 1:
+            query_embeddings = query_embeddings.reshape(1, -1)
+
         if self.index is None:
-            raise RuntimeError("Index not loaded.")
+            if not self.version:
+                raise RuntimeError("Index not loaded.")
+            # Empty published version
+            n = len(query_embeddings)
+            return (
+                np.full((n, top_k), -np.finfo(np.float32).max, dtype=np.float32),
+                np.full((n, top_k), -1, dtype=np.int64),
+            )
+        query_embeddings = np.ascontiguousarray(query_embeddings, dtype=np.float32)
 
-        if query_embedding.ndim == 1:
-            query_embedding = query_embedding.reshape(1, -1)
+        if self.is_compact and self.params["rescore"]:
+            # Stage 1: shortlist over compressed codes, stage 2: exact rescoring
+            shortlist = top_k * self.params["rescore_factor"]
+            _, cand_ids = self.index.search(query_embeddings, shortlist)
+            return self._rescore(query_embeddings, cand_ids, top_k)
 
-        scores, ids = self.index.search(query_embedding, top_k)
-        return scores[0], ids[0]
\ No newline at end of file
+        return self.index.search(query_embeddings, top_k)
+
+    def search(self, query_embedding: np.ndarray, top_k: int = 5):
+        scores, ids = self.search_many(query_embedding, top_k)
+        return scores[0], ids[0]
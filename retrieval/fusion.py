@@ -0,0 +1,36 @@
+# retrieval/fusion.py
+
+from typing import Dict, List, Sequence, Tuple
+
+# A ranking is a list of (vector_id, score), best first
+Ranking = Sequence[Tuple[int, float]]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Ranking], k: int = 60) -> List[Tuple[int, float]]:
+    """
+    RRF: score(d) = sum over rankings of 1 / (k + rank(d)), rank from 1.
+    Only ranks are used, so dense and BM25 scores need no calibration.
+    """
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, (vid, _) in enumerate(ranking, start=1):
+            fused[vid] = fused.get(vid, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+def weighted_fusion(rankings: Sequence[Ranking], weights: Sequence[float]) -> List[Tuple[int, float]]:
+    """
+    Weighted sum of min-max normalized scores; a document missing from a
+    ranking contributes 0 for it.
+    """
+    fused: Dict[int, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        if not ranking:
+            continue
+        scores = [score for _, score in ranking]
+        lo, hi = min(scores), max(scores)
+        span = hi - lo
+        for vid, score in ranking:
+            norm = (score - lo) / span if span > 0 else 1.0
+            fused[vid] = fused.get(vid, 0.0) + weight * norm
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,115 @@
+# retrieval/reranker.py
+
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from indexing.model_registry import DEFAULT_RERANK_MODEL, get_cross_encoder
+
+
+class CrossEncoderReranker:
+    """
+    Second-stage reranking of retrieved chunks with a local cross-encoder.
+
+    Candidates are scored as (query, chunk_text) pairs in batches, in
+    first-stage order, and the best top_n are kept. The stage has a latency
+    budget: each batch is cut to the number of pairs expected (running
+    average per pair) to fit in what is left, so reranking is truncated, or
+    skipped entirely, rather than overrunning. Unscored candidates keep
+    their first-stage order after the scored ones.
+
+    A skipped call halves the estimate, so one slow outlier batch cannot
+    switch reranking off for good: a later call scores a small batch and
+    measures again. budget_ms=0 switches reranking off.
+    """
+
+    def __init__(
+        self,
+        model_name: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        budget_ms: Optional[float] = None,
+        max_chars: Optional[int] = None,
+    ):
+        self.model_name = model_name or os.getenv("RERANK_MODEL", DEFAULT_RERANK_MODEL)
+        self.batch_size = (
+            batch_size if batch_size is not None else int(os.getenv("RERANK_BATCH_SIZE", 16))
+        )
+        if self.batch_size < 1:
+            raise ValueError(f"batch_size must be at least 1, got {self.batch_size}")
+        self.budget_ms = (
+            budget_ms if budget_ms is not None else float(os.getenv("RERANK_BUDGET_MS", 200))
+        )
+        # Longer chunks are cut before scoring; pair cost grows with length
+        self.max_chars = (
+            max_chars if max_chars is not None else int(os.getenv("RERANK_MAX_CHARS", 1500))
+        )
+
+        # Running estimate of scoring cost, refined on every batch
+        self._ms_per_pair: Optional[float] = None
+
+    @property
+    def model(self):
+        # Loaded (and warmed up) by the model registry on first use
+        return get_cross_encoder(self.model_name)
+
+    def _score(self, model, query: str, chunks: List[Dict]) -> List[float]:
+        pairs = [(query, c["chunk_text"][:self.max_chars]) for c in chunks]
+        return [float(s) for s in model.predict(pairs, batch_size=len(pairs))]
+
+    def rerank(
+        self,
+        query: str,
+        chunks: List[Dict],
+        top_n: int,
+        budget_ms: Optional[float] = None,
+    ) -> Tuple[List[Dict], Dict[str, Any]]:
+        """
+        Returns (best top_n chunks with "rerank_score", metrics).
+        """
+        budget_ms = self.budget_ms if budget_ms is None else budget_ms
+        skipped = budget_ms <= 0
+        # A cold model is loaded here, outside the budget and the cost estimate
+        model = self.model if not skipped else None
+        t0 = time.perf_counter()
+
+        scored: List[Tuple[float, Dict]] = []
+        n_batches = 0
+
+        while not skipped and len(scored) < len(chunks):
+            size = min(self.batch_size, len(chunks) - len(scored))
+            if self._ms_per_pair is not None:
+                elapsed_ms = (time.perf_counter() - t0) * 1000
+                fit = int((budget_ms - elapsed_ms) / max(self._ms_per_pair, 1e-6))
+                if fit < 1:
+                    skipped = n_batches == 0
+                    if skipped:
+                        self._ms_per_pair /= 2
+                    break
+                size = min(size, fit)
+
+            batch = chunks[len(scored):len(scored) + size]
+            t_batch = time.perf_counter()
+            scores = self._score(model, query, batch)
+            ms_per_pair = (time.perf_counter() - t_batch) * 1000 / len(batch)
+            self._ms_per_pair = (
+                ms_per_pair if self._ms_per_pair is None
+                else 0.8 * self._ms_per_pair + 0.2 * ms_per_pair
+            )
+
+            scored.extend(
+                (score, dict(chunk, rerank_score=score)) for score, chunk in zip(scores, batch)
+            )
+            n_batches += 1
+
+        scored.sort(key=lambda item: item[0], reverse=True)
+        ranked = [chunk for _, chunk in scored] + chunks[len(scored):]
+
+        metrics = {
+            "rerank_ms": round((time.perf_counter() - t0) * 1000, 2),
+            "rerank_candidates": len(chunks),
+            "rerank_scored": len(scored),
+            "rerank_batches": n_batches,
+            "rerank_truncated": len(scored) < len(chunks),
+            "rerank_skipped": skipped,
+        }
+        return ranked[:top_n], metrics
@@ -1,55 +1,286 @@
 # retrieval/retrieval_engine.py
 
+import os
+import threading
 from pathlib import Path
-from typing import List, Dict
+from typing import Iterable, List, Dict, Optional, Tuple
 
+import numpy as np
+
+from indexing.bm25_index import BM25Index
 from indexing.embedding_service import EmbeddingService
+from indexing.lru_cache import LRUCache
+from indexing.metrics import stage_timer
 from indexing.vector_indexer import VectorIndexer
-from database.metadata_store import MetadataStore
+from database.metadata_backend import open_metadata_store
+from retrieval.fusion import reciprocal_rank_fusion, weighted_fusion
+
+RETRIEVAL_MODES = ("dense", "hybrid")
 
 
 class RetrievalEngine:
     """
     Handles query-time retrieval for RAG.
+
+    The FAISS index is opened read-only and memory-mapped. When ingestion
+    publishes a new index version, the engine swaps to it between
+    requests; in-flight queries finish on the index they started with.
+
+    Chunk rows are kept in an LRU cache keyed by vector_id
+    (CHUNK_CACHE_SIZE, 0 disables), which is cleared whenever a new index
+    version is swapped in.
+
+    Query embedding, FAISS / BM25 search and metadata fetch are timed into
+    rag_stage_duration_seconds (see indexing.metrics).
+
+    Retrieval modes (RETRIEVAL_MODE, or per call):
+      - "dense" : FAISS only
+      - "hybrid": FAISS and the BM25 index published with it, fused by
+                  reciprocal rank (HYBRID_FUSION=rrf) or by normalized
+                  weighted scores (HYBRID_FUSION=weighted, HYBRID_ALPHA is
+                  the dense weight). Each side contributes
+                  top_k * HYBRID_CANDIDATES candidates.
     """
 
     def __init__(self, index_dir: Path = Path("data/vector_index")):
+        self.index_dir = Path(index_dir)
+
+        self.mode = os.getenv("RETRIEVAL_MODE", "dense")
+        self.fusion = os.getenv("HYBRID_FUSION", "rrf")
+        self.hybrid_alpha = float(os.getenv("HYBRID_ALPHA", 0.5))
+        self.hybrid_candidates = int(os.getenv("HYBRID_CANDIDATES", 4))
+        self.rrf_k = int(os.getenv("RRF_K", 60))
+        if self.mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown RETRIEVAL_MODE {self.mode!r}, expected one of {RETRIEVAL_MODES}")
+
         # Embedding model (query-time)
         self.embedder = EmbeddingService()
 
         # FAISS index (load existing index)
-        self.indexer = VectorIndexer(index_dir=index_dir)
-        self.indexer.load()   # 🔑 REQUIRED
+        self._reload_lock = threading.Lock()
+        self._config_stamp = self._read_config_stamp()
+        self.indexer = self._open_index()
+        self.bm25 = self._open_bm25(self.indexer)
+
+        # Metadata store (METADATA_BACKEND: MySQL or embedded SQLite)
+        self.db = open_metadata_store()
+
+        # Hot chunk rows, keyed by vector_id
+        self.chunk_cache = LRUCache(maxsize=int(os.getenv("CHUNK_CACHE_SIZE", 4096)))
+        self._cache_generation = 0
+
+    # --------------------------------------------------
+    # Index hot reload
+    # --------------------------------------------------
+    def _open_index(self) -> VectorIndexer:
+        indexer = VectorIndexer(index_dir=self.index_dir)
+        indexer.load(mmap=os.getenv("INDEX_MMAP", "1") == "1")   # 🔑 REQUIRED
+        return indexer
 
-        # Metadata store (MySQL)
-        self.db = MetadataStore()
+    def _open_bm25(self, indexer: VectorIndexer) -> Optional[BM25Index]:
+        name = indexer.extra_files.get("bm25_file")
+        if not name or os.getenv("BM25_ENABLED", "1") != "1":
+            return None
+        try:
+            return BM25Index.load(self.index_dir / name)
+        except FileNotFoundError:
+            print(f"BM25 index {name} not found; hybrid retrieval falls back to dense")
+            return None
+
+    def _read_config_stamp(self) -> Optional[Tuple[int, int]]:
+        # index_config.json is replaced atomically on every save
+        try:
+            st = os.stat(self.index_dir / "index_config.json")
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns
+
+    def maybe_reload(self) -> bool:
+        """
+        Cheap per-request check (one stat call) for a newer index version.
+        """
+        stamp = self._read_config_stamp()
+        if stamp == self._config_stamp:
+            return False
+        return self.reload_index()
+
+    def reload_index(self) -> bool:
+        """
+        Open the latest published index and swap it in atomically.
+        Returns True if a new version was loaded.
+        """
+        with self._reload_lock:
+            stamp = self._read_config_stamp()
+            current = self.indexer
+            if current.saved_version() == current.version:
+                self._config_stamp = stamp
+                return False
+
+            new_indexer = self._open_index()
+            new_bm25 = self._open_bm25(new_indexer)
+            # Reference assignments: readers see old or new, never a half-built index
+            self.bm25 = new_bm25
+            self.indexer = new_indexer
+            self._config_stamp = stamp
+            self.invalidate_chunk_cache()
+            print(f"Switched to FAISS index version {new_indexer.version}")
+            return True
+
+    # --------------------------------------------------
+    # Chunk row cache
+    # --------------------------------------------------
+    def invalidate_chunk_cache(self):
+        """
+        Drop all cached chunk rows (a full rebuild reuses vector ids).
+        """
+        self._cache_generation += 1
+        self.chunk_cache.clear()
 
-    def retrieve(self, query: str, top_k: int = 5) -> List[Dict]:
+    def _fetch_chunks(self, vector_ids: Iterable[int]) -> Dict[int, Dict]:
         """
-        Retrieve top-k relevant document chunks for a user query.
+        vector_id -> chunk row. Cached rows are served from memory; all
+        misses are resolved with a single metadata query.
         """
+        rows = {}
+        misses = []
+        for vid in dict.fromkeys(vector_ids):
+            row = self.chunk_cache.get(vid)
+            if row is None:
+                misses.append(vid)
+            else:
+                rows[vid] = row
+
+        if misses:
+            generation = self._cache_generation
+            fetched = self.db.fetch_by_vector_ids(misses)
+            # Rows fetched across an index swap may be stale; don't cache them
+            cacheable = generation == self._cache_generation
+            for row in fetched:
+                rows[row["vector_id"]] = row
+                if cacheable:
+                    self.chunk_cache.put(row["vector_id"], row)
+
+        return rows
+
+    # --------------------------------------------------
+    # Ranking
+    # --------------------------------------------------
+    def _search_plan(self, mode: Optional[str], top_k: int) -> Tuple[Optional[BM25Index], int]:
+        """
+        (BM25 index to fuse with or None, number of dense candidates).
+        """
+        mode = mode or self.mode
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode {mode!r}, expected one of {RETRIEVAL_MODES}")
+        bm25 = self.bm25 if mode == "hybrid" else None
+        if bm25 is None:
+            return None, top_k
+        return bm25, top_k * self.hybrid_candidates
+
+    def _rank(self, query: str, scores, vector_ids, top_k: int, bm25: Optional[BM25Index]):
+        """
+        Final ranking for one query as [(vector_id, score, extra fields)].
+        """
+        dense = [(int(v), float(s)) for s, v in zip(scores, vector_ids) if v != -1]
+        if bm25 is None:
+            return [(vid, score, {}) for vid, score in dense[:top_k]]
+
+        with stage_timer("lexical_search"):
+            lex_scores, lex_ids = bm25.search(query, len(vector_ids))
+        lexical = [(int(v), float(s)) for s, v in zip(lex_scores, lex_ids)]
+
+        if self.fusion == "weighted":
+            fused = weighted_fusion([dense, lexical], [self.hybrid_alpha, 1 - self.hybrid_alpha])
+        else:
+            fused = reciprocal_rank_fusion([dense, lexical], k=self.rrf_k)
+
+        dense_map, lexical_map = dict(dense), dict(lexical)
+        return [
+            (vid, score, {"dense_score": dense_map.get(vid), "lexical_score": lexical_map.get(vid)})
+            for vid, score in fused[:top_k]
+        ]
+
+    def retrieve(
+        self,
+        query: str,
+        top_k: int = 5,
+        mode: Optional[str] = None,
+        query_embedding: Optional[np.ndarray] = None,
+    ) -> List[Dict]:
+        """
+        Retrieve top-k relevant document chunks for a user query,
+        best chunk first. Pass query_embedding if the caller already
+        embedded the query.
+        """
+        self.maybe_reload()
+        indexer = self.indexer
+        bm25, n_candidates = self._search_plan(mode, top_k)
+
         # 1. Embed query
-        query_embedding = self.embedder.embed_query(query)
+        if query_embedding is None:
+            with stage_timer("query_embedding"):
+                query_embedding = self.embedder.embed_query(query)
+
+        # 2. Search FAISS index (and BM25 in hybrid mode)
+        with stage_timer("faiss_search"):
+            scores, vector_ids = indexer.search(query_embedding, n_candidates)
+        hits = self._rank(query, scores, vector_ids, top_k, bm25)
 
-        # 2. Search FAISS index
-        scores, vector_ids = self.indexer.search(query_embedding, top_k)
+        if not hits:
+            return []
+
+        # 3. Fetch metadata (cache, then one query for the misses)
+        with stage_timer("metadata_fetch"):
+            row_map = self._fetch_chunks(vid for vid, _, _ in hits)
 
-        # Convert numpy types to Python ints
-        vector_ids = [int(v) for v in vector_ids if v != -1]
+        # 4. Attach scores, in ranking order. Cached rows are shared,
+        #    so each caller gets its own copy.
+        return [
+            dict(row_map[vid], score=score, **extra)
+            for vid, score, extra in hits
+            if vid in row_map
+        ]
 
-        if not vector_ids:
+    def retrieve_many(
+        self, queries: List[str], top_k: int = 5, mode: Optional[str] = None
+    ) -> List[List[Dict]]:
+        """
+        Retrieve top-k chunks for many queries at once:
+        one batched embed, one matrix FAISS search, one metadata lookup.
+        Returns one list per query, in input order, best chunk first.
+        """
+        if not queries:
             return []
 
-        # 3. Fetch metadata from MySQL
-        chunks = self.db.fetch_by_vector_ids(vector_ids)
+        self.maybe_reload()
+        indexer = self.indexer
+        bm25, n_candidates = self._search_plan(mode, top_k)
+
+        # 1. Embed all queries in one batch
+        with stage_timer("query_embedding"):
+            query_embeddings = self.embedder.embed_queries(queries)
 
-        # 4. Attach similarity scores
-        score_map = dict(zip(vector_ids, scores))
+        # 2. Search FAISS with the whole matrix, then rank per query
+        with stage_timer("faiss_search"):
+            scores, vector_ids = indexer.search_many(query_embeddings, n_candidates)
+        ranked = [
+            self._rank(query, q_scores, q_ids, top_k, bm25)
+            for query, q_scores, q_ids in zip(queries, scores, vector_ids)
+        ]
 
-        for chunk in chunks:
-            chunk["score"] = score_map.get(chunk["vector_id"])
+        # 3. One deduplicated metadata lookup (cache misses only)
+        with stage_timer("metadata_fetch"):
+            row_map = self._fetch_chunks(vid for hits in ranked for vid, _, _ in hits)
 
-        return chunks
+        # 4. Regroup per query, in ranking order
+        return [
+            [
+                dict(row_map[vid], score=score, **extra)
+                for vid, score, extra in hits
+                if vid in row_map
+            ]
+            for hits in ranked
+        ]
 
     def close(self):
         self.db.close()
@@ -0,0 +1,123 @@
+# retrieval/test_chunk_cache.py
+#
+# RetrievalEngine chunk-row cache with the SQLite backend and a stub
+# embedding model: repeated queries are served without a metadata query,
+# callers get their own copies (mutating a result leaves the cache intact),
+# and rows fetched while an index swap invalidates the cache are returned
+# but not cached.
+
+import os
+import tempfile
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+tmp_dir = tempfile.TemporaryDirectory()
+tmp = Path(tmp_dir.name)
+os.environ["METADATA_BACKEND"] = "sqlite"
+os.environ["SQLITE_PATH"] = str(tmp / "metadata.db")
+os.environ["EMBED_MODEL"] = "stub-embedding"
+os.environ["RETRIEVAL_MODE"] = "dense"
+os.environ["CHUNK_CACHE_SIZE"] = "64"
+
+from database.metadata_backend import open_metadata_store
+from indexing.model_registry import embedding_backend, registry
+from indexing.vector_indexer import VectorIndexer
+from retrieval.retrieval_engine import RetrievalEngine
+
+DIM = 64
+
+
+class StubEmbeddingModel:
+    """
+    Hashed bag of words, normalized: texts sharing words are similar.
+    """
+
+    def encode(self, texts, batch_size=None, normalize_embeddings=True, **kwargs):
+        single = isinstance(texts, str)
+        vectors = np.zeros((1 if single else len(texts), DIM), dtype=np.float32)
+        for row, text in zip(vectors, [texts] if single else texts):
+            for word in text.lower().split():
+                row[zlib.crc32(word.encode()) % DIM] += 1
+            row /= max(np.linalg.norm(row), 1e-6)
+        return vectors[0] if single else vectors
+
+
+model = registry.get("embedding", "stub-embedding", lambda name: StubEmbeddingModel(), variant=embedding_backend())
+
+texts = [f"battery storage site {i} capacity" for i in range(8)]
+index_dir = tmp / "vector_index"
+indexer = VectorIndexer(index_dir=index_dir, index_type="flat")
+indexer.add(model.encode(texts), ids=list(range(len(texts))))
+indexer.save()
+
+db = open_metadata_store()
+db.insert_chunk_metadata_batch(
+    {
+        "chunk_id": f"storage_{vid}",
+        "vector_id": vid,
+        "document_name": "storage",
+        "page_or_section": None,
+        "chunk_text": text,
+    }
+    for vid, text in enumerate(texts)
+)
+db.close()
+
+engine = RetrievalEngine(index_dir=index_dir)
+
+fetches = []
+fetch_by_vector_ids = engine.db.fetch_by_vector_ids
+
+
+def counting_fetch(vector_ids):
+    fetches.append(list(vector_ids))
+    return fetch_by_vector_ids(vector_ids)
+
+
+engine.db.fetch_by_vector_ids = counting_fetch
+
+first = engine.retrieve("battery storage", top_k=3)
+assert len(fetches) == 1 and len(engine.chunk_cache) == 3
+expected = [(r["vector_id"], r["chunk_text"]) for r in first]
+
+# Callers own their results
+for r in first:
+    r["chunk_text"] = "overwritten"
+    r["note"] = "added by caller"
+
+second = engine.retrieve("battery storage", top_k=3)
+assert len(fetches) == 1, "cached rows were fetched again"
+assert [(r["vector_id"], r["chunk_text"]) for r in second] == expected
+assert all("note" not in r for r in second)
+for batch in engine.retrieve_many(["battery storage", "battery storage"], top_k=3):
+    assert [(r["vector_id"], r["chunk_text"]) for r in batch] == expected
+    batch[0]["chunk_text"] = "overwritten"
+assert len(fetches) == 1
+assert engine.chunk_cache.get(expected[0][0])["chunk_text"] == expected[0][1]
+
+# An index swap lands while rows are being fetched
+engine.invalidate_chunk_cache()
+
+
+def fetch_across_swap(vector_ids):
+    rows = counting_fetch(vector_ids)
+    engine.invalidate_chunk_cache()
+    return rows
+
+
+engine.db.fetch_by_vector_ids = fetch_across_swap
+results = engine.retrieve("battery storage", top_k=3)
+assert [(r["vector_id"], r["chunk_text"]) for r in results] == expected
+assert len(engine.chunk_cache) == 0, "rows fetched across a swap were cached"
+
+engine.db.fetch_by_vector_ids = counting_fetch
+engine.retrieve("battery storage", top_k=3)
+assert len(engine.chunk_cache) == 3
+print(engine.chunk_cache.stats())
+
+engine.close()
+tmp_dir.cleanup()
+
+print("OK")
@@ -0,0 +1,49 @@
+# retrieval/test_fusion.py
+#
+# Reciprocal rank and weighted score fusion on hand-built dense / BM25
+# rankings: exact fused scores, documents found by both retrievers ahead of
+# single-list hits, and the weight deciding between the two lists.
+
+import math
+
+from retrieval.fusion import reciprocal_rank_fusion, weighted_fusion
+
+# (vector_id, score), best first; scores on very different scales
+dense = [(1, 0.91), (2, 0.88), (3, 0.80), (4, 0.52)]
+lexical = [(3, 14.2), (5, 9.7), (1, 3.1)]
+
+fused = reciprocal_rank_fusion([dense, lexical], k=60)
+print(fused)
+expected = {
+    1: 1 / 61 + 1 / 63,
+    2: 1 / 62,
+    3: 1 / 63 + 1 / 61,
+    4: 1 / 64,
+    5: 1 / 62,
+}
+assert {vid for vid, _ in fused} == set(expected)
+assert all(math.isclose(score, expected[vid]) for vid, score in fused)
+# In both lists first; ties keep first-seen order (sorted is stable)
+assert [vid for vid, _ in fused] == [1, 3, 2, 5, 4]
+assert [vid for vid, _ in reciprocal_rank_fusion([lexical, dense], k=60)] == [3, 1, 5, 2, 4]
+
+assert reciprocal_rank_fusion([[(7, 1.0)], []]) == [(7, 1 / 61)]
+assert reciprocal_rank_fusion([]) == []
+
+# Min-max normalized per list: dense 1 -> 1.0, 4 -> 0.0; lexical 3 -> 1.0, 1 -> 0.0
+fused = dict(weighted_fusion([dense, lexical], [0.5, 0.5]))
+print(fused)
+assert math.isclose(fused[1], 0.5 * 1.0 + 0.5 * 0.0)
+assert math.isclose(fused[3], 0.5 * (0.80 - 0.52) / (0.91 - 0.52) + 0.5 * 1.0)
+assert math.isclose(fused[5], 0.5 * (9.7 - 3.1) / (14.2 - 3.1))
+assert math.isclose(fused[4], 0.0)
+
+ordering = lambda alpha: [vid for vid, _ in weighted_fusion([dense, lexical], [alpha, 1 - alpha])]
+assert ordering(0.5) == [3, 1, 2, 5, 4]
+assert ordering(1.0)[:4] == [1, 2, 3, 4]          # dense only
+assert ordering(0.0)[:3] == [3, 5, 1]             # lexical only
+
+# A list with equal scores counts fully; empty lists are skipped
+assert weighted_fusion([[(8, 2.0), (9, 2.0)], []], [0.3, 0.7]) == [(8, 0.3), (9, 0.3)]
+
+print("OK")
@@ -0,0 +1,108 @@
+# retrieval/test_hot_reload.py
+#
+# RetrievalEngine hot swap on a flat index with the SQLite backend and a
+# stub embedding model: a second index version published while the engine
+# is open is picked up by exactly one maybe_reload(), the chunk cache is
+# cleared, and results come from the new version, including the vector ids
+# the rebuild reused for different chunks.
+
+import os
+import tempfile
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+tmp_dir = tempfile.TemporaryDirectory()
+tmp = Path(tmp_dir.name)
+os.environ["METADATA_BACKEND"] = "sqlite"
+os.environ["SQLITE_PATH"] = str(tmp / "metadata.db")
+os.environ["EMBED_MODEL"] = "stub-embedding"
+os.environ["RETRIEVAL_MODE"] = "dense"
+
+from database.metadata_backend import open_metadata_store
+from indexing.model_registry import embedding_backend, registry
+from indexing.vector_indexer import VectorIndexer
+from retrieval.retrieval_engine import RetrievalEngine
+
+DIM = 64
+
+
+class StubEmbeddingModel:
+    """
+    Hashed bag of words, normalized: texts sharing words are similar.
+    """
+
+    def encode(self, texts, batch_size=None, normalize_embeddings=True, **kwargs):
+        single = isinstance(texts, str)
+        vectors = np.zeros((1 if single else len(texts), DIM), dtype=np.float32)
+        for row, text in zip(vectors, [texts] if single else texts):
+            for word in text.lower().split():
+                row[zlib.crc32(word.encode()) % DIM] += 1
+            row /= max(np.linalg.norm(row), 1e-6)
+        return vectors[0] if single else vectors
+
+
+model = registry.get("embedding", "stub-embedding", lambda name: StubEmbeddingModel(), variant=embedding_backend())
+index_dir = tmp / "vector_index"
+
+
+def publish(texts, document_name):
+    """
+    Full rebuild: fresh index and metadata, vector ids from 0.
+    """
+    indexer = VectorIndexer(index_dir=index_dir, index_type="flat")
+    indexer.add(model.encode(texts), ids=list(range(len(texts))))
+    db = open_metadata_store()
+    with db.transaction():
+        db.delete_all_chunks()
+        db.insert_chunk_metadata_batch(
+            {
+                "chunk_id": f"{document_name}_{vid}",
+                "vector_id": vid,
+                "document_name": document_name,
+                "page_or_section": None,
+                "chunk_text": text,
+            }
+            for vid, text in enumerate(texts)
+        )
+        indexer.save()
+    db.close()
+    return indexer.version
+
+
+v1 = publish([f"wind turbine blade report {i}" for i in range(6)], "old")
+engine = RetrievalEngine(index_dir=index_dir)
+assert engine.indexer.version == v1
+
+results = engine.retrieve("wind turbine", top_k=3)
+assert {r["document_name"] for r in results} == {"old"}
+assert len(engine.chunk_cache) == 3
+assert engine.maybe_reload() is False
+
+v2 = publish([f"wind turbine gearbox inspection {i}" for i in range(4)], "new")
+assert v2 == v1 + 1
+
+# The old index keeps serving until the next request checks for a new version
+assert engine.indexer.version == v1
+assert engine.maybe_reload() is True
+assert engine.maybe_reload() is False
+assert engine.indexer.version == v2
+assert len(engine.chunk_cache) == 0, "chunk rows of the old version survived the swap"
+
+# Ids 0-2 were cached for the old version and now name different chunks
+results = engine.retrieve("wind turbine gearbox", top_k=3)
+print([(r["vector_id"], r["chunk_text"]) for r in results])
+assert {r["document_name"] for r in results} == {"new"}
+assert all("gearbox" in r["chunk_text"] for r in results)
+assert all(r["vector_id"] < 4 for r in results)
+
+# retrieve() reloads by itself too
+v3 = publish(["solar inverter firmware notes"], "newest")
+assert engine.retrieve("solar inverter", top_k=3)[0]["document_name"] == "newest"
+assert engine.indexer.version == v3 and engine.maybe_reload() is False
+
+engine.close()
+tmp_dir.cleanup()
+
+print("OK")
@@ -0,0 +1,56 @@
+# retrieval/test_reranker.py
+#
+# CrossEncoderReranker latency budget with a stub model whose first call is
+# slow (cold caches, a noisy neighbour): later calls must still rerank
+# instead of skipping forever on the inflated cost estimate. An explicit
+# budget of 0 turns reranking off.
+
+import time
+
+from retrieval.reranker import CrossEncoderReranker
+
+BUDGET_MS = 50
+
+
+class StubCrossEncoder:
+    def __init__(self):
+        self.calls = 0
+
+    def predict(self, pairs, batch_size=None):
+        self.calls += 1
+        # First batch: 100 ms per pair, far over the budget; then 1 ms per pair
+        time.sleep(len(pairs) * (0.1 if self.calls == 1 else 0.001))
+        return [len(text) for _, text in pairs]
+
+
+class StubReranker(CrossEncoderReranker):
+    stub = StubCrossEncoder()
+
+    @property
+    def model(self):
+        return self.stub
+
+
+reranker = StubReranker(batch_size=4, budget_ms=BUDGET_MS)
+chunks = [{"vector_id": i, "chunk_text": "x" * (i + 1)} for i in range(8)]
+
+ranked, metrics = reranker.rerank("query", chunks, top_n=3)
+assert metrics["rerank_scored"] == 4 and metrics["rerank_truncated"], metrics
+
+history = []
+for _ in range(10):
+    ranked, metrics = reranker.rerank("query", chunks, top_n=3)
+    history.append(metrics)
+    assert metrics["rerank_ms"] < BUDGET_MS * 2, metrics
+
+print([(m["rerank_scored"], m["rerank_skipped"]) for m in history])
+assert history[0]["rerank_skipped"], "estimate after the slow batch is over budget"
+assert history[-1]["rerank_scored"] == len(chunks), "reranking never recovered"
+assert [c["vector_id"] for c in ranked] == [7, 6, 5]
+
+calls = StubReranker.stub.calls
+ranked, metrics = StubReranker(batch_size=4, budget_ms=0).rerank("query", chunks, top_n=3)
+assert metrics["rerank_skipped"] and metrics["rerank_scored"] == 0, metrics
+assert [c["vector_id"] for c in ranked] == [0, 1, 2]
+assert StubReranker.stub.calls == calls
+print("OK")
@@ -0,0 +1,104 @@
+# retrieval/test_retrieve_many.py
+#
+# RetrievalEngine.retrieve_many on a small flat index with the SQLite
+# backend and a stub embedding model: one result list per query, in input
+# order, each equal to retrieve() for that query alone, including repeated
+# queries, chunks shared across queries and top_k beyond the index size
+# (FAISS pads with -1).
+
+import os
+import tempfile
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+tmp_dir = tempfile.TemporaryDirectory()
+tmp = Path(tmp_dir.name)
+os.environ["METADATA_BACKEND"] = "sqlite"
+os.environ["SQLITE_PATH"] = str(tmp / "metadata.db")
+os.environ["EMBED_MODEL"] = "stub-embedding"
+os.environ["RETRIEVAL_MODE"] = "dense"
+
+from database.metadata_backend import open_metadata_store
+from indexing.model_registry import embedding_backend, registry
+from indexing.vector_indexer import VectorIndexer
+from retrieval.retrieval_engine import RetrievalEngine
+
+DIM = 64
+
+
+class StubEmbeddingModel:
+    """
+    Hashed bag of words, normalized: texts sharing words are similar.
+    """
+
+    def encode(self, texts, batch_size=None, normalize_embeddings=True, **kwargs):
+        single = isinstance(texts, str)
+        vectors = np.zeros((1 if single else len(texts), DIM), dtype=np.float32)
+        for row, text in zip(vectors, [texts] if single else texts):
+            for word in text.lower().split():
+                row[zlib.crc32(word.encode()) % DIM] += 1
+            row /= max(np.linalg.norm(row), 1e-6)
+        return vectors[0] if single else vectors
+
+
+model = registry.get("embedding", "stub-embedding", lambda name: StubEmbeddingModel(), variant=embedding_backend())
+
+topics = ["solar panels", "wind turbines", "grid storage", "transmission losses"]
+texts = [f"{topics[i % 4]} report section {i}" for i in range(12)]
+vector_ids = [100 + 7 * i for i in range(12)]     # sparse ids, not row numbers
+
+index_dir = tmp / "vector_index"
+indexer = VectorIndexer(index_dir=index_dir, index_type="flat")
+indexer.add(model.encode(texts), ids=vector_ids)
+indexer.save()
+
+db = open_metadata_store()
+db.insert_chunk_metadata_batch(
+    {
+        "chunk_id": f"doc_{vid}",
+        "vector_id": vid,
+        "document_name": f"doc{i % 3}",
+        "page_or_section": None,
+        "chunk_text": text,
+    }
+    for i, (vid, text) in enumerate(zip(vector_ids, texts))
+)
+db.close()
+
+engine = RetrievalEngine(index_dir=index_dir)
+queries = [
+    "wind turbines",
+    "grid storage",
+    "wind turbines",            # repeated query
+    "storage of wind power",    # shares chunks with the two above
+    "solar panels report",
+]
+
+
+def ranking(results):
+    return [(r["vector_id"], round(r["score"], 5)) for r in results]
+
+
+for top_k in (3, 20):           # 20 > 12 vectors: -1 padding
+    batched = engine.retrieve_many(queries, top_k=top_k)
+    assert len(batched) == len(queries)
+    for query, results in zip(queries, batched):
+        single = engine.retrieve(query, top_k=top_k)
+        assert ranking(results) == ranking(single), (query, ranking(results), ranking(single))
+        assert len(results) == min(top_k, len(texts))
+        assert all(r["vector_id"] != -1 for r in results)
+        assert all(r["chunk_text"] == texts[vector_ids.index(r["vector_id"])] for r in results)
+
+    # Shared chunks are separate dicts per query
+    assert batched[0][0]["vector_id"] == batched[2][0]["vector_id"]
+    assert batched[0][0] is not batched[2][0]
+
+print([ranking(r)[:2] for r in engine.retrieve_many(queries, top_k=2)])
+assert engine.retrieve_many([]) == []
+
+engine.close()
+tmp_dir.cleanup()
+
+print("OK")